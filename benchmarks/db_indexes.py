@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""热点查询索引基准测试.
+
+在填充了大量数据的表上，对比有/无复合索引时热点查询的执行计划和延迟::
+
+    python -m benchmarks.db_indexes --rows 2000000
+    python -m benchmarks.db_indexes --database-url mysql+pymysql://... --rows 5000000
+
+已有数据时不会重复填充；``--json`` 可把结果保存下来用于对比。
+"""
+import argparse
+import datetime as dt
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import func, select, text
+
+from psyas.app import create_app
+from psyas.database import db
+from psyas.models.analysis import Analysis
+from psyas.models.conversation import Conversation
+from psyas.models.emotion_timeline import DailyEmotionCount
+from psyas.models.guide_question import GuideQuestion
+from psyas.user.models import Role, User
+
+DEFAULT_DATABASE_URL = "sqlite:////tmp/psyas_bench.db"
+BATCH_SIZE = 10000
+SCENES = ["焦虑", "抑郁", "愤怒", "压力", "快乐", "孤独", "通用"]
+EMOTIONS = ["焦虑", "抑郁", "愤怒", "压力", "快乐", "孤独", "中性"]
+ISSUES = ["家庭关系", "工作压力", "学习问题", "情感关系", "人际关系", "日常分享"]
+
+# 本次迁移（dee48de6a407）新增的索引，其他索引在对比时保持不变
+INDEXED_TABLES = [
+    Conversation.__table__,
+    Analysis.__table__,
+    GuideQuestion.__table__,
+]
+MIGRATION_INDEXES = {
+    "ix_conversations_user_id_created_at",
+    "ix_conversations_user_id_is_analyzed_created_at",
+    "ix_user_analysis_user_id_analyzed_at",
+    "ix_guide_questions_scene",
+}
+
+
+def make_config(database_url):
+    """基于 psyas.settings 生成指向基准数据库的配置对象."""
+    from psyas import settings
+
+    values = {key: getattr(settings, key) for key in dir(settings) if key.isupper()}
+    values.update(
+        SQLALCHEMY_DATABASE_URI=database_url,
+        DEBUG_TB_ENABLED=False,
+        ENV="production",
+    )
+    return type("BenchConfig", (), values)
+
+
+def seed(rows, users, analysis_ratio=0.25):
+    """填充用户、对话、分析和引导问题数据（已有足够数据时跳过）."""
+    existing = db.session.scalar(select(func.count()).select_from(Conversation))
+    if existing >= rows:
+        print(f"已有 {existing} 条对话，跳过数据填充")
+        return
+
+    started = time.perf_counter()
+    # 先删除引用其他表的子表，MySQL等数据库会检查外键
+    for model in (DailyEmotionCount, Analysis, Conversation, Role, GuideQuestion, User):
+        db.session.execute(model.__table__.delete())
+
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    db.session.execute(
+        User.__table__.insert(),
+        [
+            {
+                "id": user_id,
+                "username": f"bench{user_id}",
+                "email": f"bench{user_id}@example.com",
+                "created_at": now,
+                "active": True,
+                "is_admin": False,
+            }
+            for user_id in range(1, users + 1)
+        ],
+    )
+    db.session.execute(
+        GuideQuestion.__table__.insert(),
+        [
+            {"scene": scene, "question_text": f"{scene}引导问题{i}", "priority": i % 3}
+            for scene in SCENES
+            for i in range(50)
+        ],
+    )
+
+    rng = random.Random(42)
+    analysis_id = 0
+    for start in range(0, rows, BATCH_SIZE):
+        conversations = []
+        analyses = []
+        for conversation_id in range(start + 1, min(start + BATCH_SIZE, rows) + 1):
+            user_id = rng.randint(1, users)
+            created_at = now - dt.timedelta(seconds=rng.randint(0, 730 * 86400))
+            analyzed = rng.random() < analysis_ratio
+            conversations.append(
+                {
+                    "id": conversation_id,
+                    "user_id": user_id,
+                    "user_input": "最近工作压力很大，有点焦虑",
+                    "assistant_response": "我能感受到你的担心和不安。",
+                    "created_at": created_at,
+                    "is_analyzed": analyzed,
+                }
+            )
+            if analyzed:
+                analysis_id += 1
+                analyses.append(
+                    {
+                        "id": analysis_id,
+                        "user_id": user_id,
+                        "conversation_id": conversation_id,
+                        "core_issue": rng.choice(ISSUES),
+                        "emotion": rng.choice(EMOTIONS),
+                        "simple_conclusion": "当前表现出一定程度的焦虑情绪。",
+                        "analyzed_at": created_at + dt.timedelta(minutes=5),
+                    }
+                )
+        db.session.execute(Conversation.__table__.insert(), conversations)
+        if analyses:
+            db.session.execute(Analysis.__table__.insert(), analyses)
+        db.session.commit()
+        if (start // BATCH_SIZE) % 20 == 19:
+            print(f"  已填充 {min(start + BATCH_SIZE, rows)}/{rows} 条对话")
+
+    print(f"数据填充完成，用时 {time.perf_counter() - started:.1f}s")
+
+
+def hot_queries(user_id, scene):
+    """需要索引支撑的热点查询."""
+    return {
+        "conversation_history": (
+            select(Conversation)
+            .filter_by(user_id=user_id)
+            .order_by(Conversation.created_at.desc())
+            .limit(10)
+        ),
+        "latest_unanalyzed": (
+            select(Conversation)
+            .filter_by(user_id=user_id, is_analyzed=False)
+            .order_by(Conversation.created_at.desc())
+            .limit(1)
+        ),
+        "analysis_history": (
+            select(Analysis)
+            .filter_by(user_id=user_id)
+            .order_by(Analysis.analyzed_at.desc())
+            .limit(10)
+        ),
+        "guide_questions_by_scene": select(GuideQuestion).filter_by(scene=scene),
+    }
+
+
+def explain(statement):
+    """返回当前数据库对查询的执行计划."""
+    dialect = db.engine.dialect
+    compiled = statement.compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}
+    )
+    prefix = "EXPLAIN QUERY PLAN" if dialect.name == "sqlite" else "EXPLAIN"
+    rows = db.session.execute(text(f"{prefix} {compiled}")).fetchall()
+    return [" | ".join(str(value) for value in row) for row in rows]
+
+
+def set_indexes(enabled):
+    """创建或删除本次迁移新增的索引."""
+    for table in INDEXED_TABLES:
+        for index in table.indexes:
+            if index.name not in MIGRATION_INDEXES:
+                continue
+            if enabled:
+                index.create(bind=db.engine, checkfirst=True)
+            else:
+                index.drop(bind=db.engine, checkfirst=True)
+    # 刷新统计信息，让优化器看到索引变化
+    if db.engine.dialect.name == "mysql":
+        for table in INDEXED_TABLES:
+            db.session.execute(text(f"ANALYZE TABLE {table.name}"))
+    else:
+        db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def measure(users, runs):
+    """对每个热点查询记录执行计划和延迟分布（毫秒）."""
+    rng = random.Random(7)
+    samples = {}
+    plans = {}
+    for _ in range(runs):
+        queries = hot_queries(rng.randint(1, users), rng.choice(SCENES))
+        for name, statement in queries.items():
+            plans.setdefault(name, explain(statement))
+            started = time.perf_counter()
+            db.session.execute(statement).all()
+            samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        db.session.expunge_all()
+
+    results = {}
+    for name, values in samples.items():
+        values.sort()
+        results[name] = {
+            "plan": plans[name],
+            "p50_ms": statistics.median(values),
+            "p99_ms": values[min(len(values) - 1, int(len(values) * 0.99))],
+            "mean_ms": statistics.fmean(values),
+        }
+    return results
+
+
+def report(label, results):
+    """打印一组测量结果."""
+    print(f"\n=== {label} ===")
+    for name, result in results.items():
+        print(
+            f"{name:<26} p50={result['p50_ms']:9.3f}ms "
+            f"p99={result['p99_ms']:9.3f}ms"
+        )
+        for line in result["plan"]:
+            print(f"    {line}")
+
+
+def main(argv=None):
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="对话行数")
+    parser.add_argument("--users", type=int, default=5000, help="用户数")
+    parser.add_argument("--runs", type=int, default=50, help="每个查询的执行次数")
+    parser.add_argument("--json", dest="json_path", help="保存结果的JSON文件")
+    args = parser.parse_args(argv)
+
+    app = create_app(make_config(args.database_url))
+    with app.app_context():
+        database = db.engine.dialect.name
+        db.create_all()
+        seed(args.rows, args.users)
+
+        set_indexes(False)
+        without_indexes = measure(args.users, args.runs)
+        report("无本次迁移新增的索引", without_indexes)
+
+        set_indexes(True)
+        with_indexes = measure(args.users, args.runs)
+        report("有本次迁移新增的索引", with_indexes)
+
+        print("\n=== 加速比 (p50) ===")
+        for name in with_indexes:
+            before = without_indexes[name]["p50_ms"]
+            after = with_indexes[name]["p50_ms"] or 1e-9
+            print(f"{name:<26} {before / after:8.1f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "database": database,
+                    "rows": args.rows,
+                    "users": args.users,
+                    "without_indexes": without_indexes,
+                    "with_indexes": with_indexes,
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
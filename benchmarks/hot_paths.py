@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""知识库/情绪/分析热点路径基准测试.
+
+用合成的中文语料（短文本、长文本、危机文本、无匹配文本）逐条计时，
+报告每个热点函数的 ops/sec 和 p50/p99 延迟::
+
+    flask bench
+    flask bench --output benchmarks/baseline.json
+    flask bench --compare benchmarks/baseline.json -k knowledge
+
+也可以直接运行 ``python -m benchmarks.hot_paths``，参数相同。
+"""
+import argparse
+import datetime as dt
+import json
+import platform
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from psyas.services.analysis_service import AnalysisService
+from psyas.services.conversation_service import ConversationService
+from psyas.services.knowledge_base import (
+    CRISIS_COMBINATION_WORDS,
+    CRISIS_KEYWORDS,
+    get_knowledge_base,
+)
+from psyas.services.knowledge_service import KnowledgeService
+
+CORPUS_KINDS = ("short", "long", "crisis", "no_match")
+DEFAULT_CORPUS_SIZE = 200
+DEFAULT_ITERATIONS = 2000
+DEFAULT_SEED = 20250828
+
+# 不含任何关键词的日常句子，用于填充和构造无匹配文本
+NEUTRAL_FRAGMENTS = [
+    "今天早上下了一场小雨",
+    "我在楼下的咖啡店坐了一会儿",
+    "周末去公园散步看到很多人放风筝",
+    "最近在读一本关于历史的书",
+    "晚饭吃了番茄炒蛋和米饭",
+    "地铁上人挺多的",
+    "窗外的树叶开始变黄了",
+    "我买了一盆绿萝放在桌上",
+    "昨天看了一部电影",
+    "下午整理了一下房间",
+    "小区门口新开了一家面包店",
+    "这周的天气比上周暖和",
+    "我打算明天早点起床",
+    "路上遇到一只很可爱的猫",
+    "晚上听了几首老歌",
+]
+
+
+def _keyword_pool() -> List[str]:
+    """收集知识库和各服务使用的全部关键词."""
+    keywords = set(CRISIS_KEYWORDS)
+    for words in CRISIS_COMBINATION_WORDS.values():
+        keywords.update(words)
+    for category in get_knowledge_base().issues.values():
+        for issue in category.values():
+            keywords.update(issue.get("keywords", []))
+    conversation = ConversationService()
+    analysis = AnalysisService()
+    for words in conversation.emotion_keywords.values():
+        keywords.update(words)
+    for words in list(analysis.emotion_keywords.values()) + list(
+        analysis.issue_keywords.values()
+    ):
+        keywords.update(words)
+    keywords.update(["怎么办", "不知道", "困惑"])
+    return sorted(keywords)
+
+
+def generate_corpus(
+    kind: str, size: int = DEFAULT_CORPUS_SIZE, seed: int = DEFAULT_SEED
+) -> List[str]:
+    """
+    生成一组合成中文输入.
+
+    Args:
+        kind: short（单句，最多一个关键词）、long（多句，夹杂多个关键词）、
+            crisis（含直接或组合危机词）、no_match（不含任何关键词）
+        size: 生成条数
+        seed: 随机种子，相同参数生成相同语料
+
+    Returns:
+        List[str]: 输入文本
+    """
+    if kind not in CORPUS_KINDS:
+        raise ValueError(f"未知的语料类型: {kind}")
+
+    rng = random.Random(f"{seed}:{kind}")
+    keywords = _keyword_pool()
+    neutral = [
+        fragment
+        for fragment in NEUTRAL_FRAGMENTS
+        if not any(keyword in fragment for keyword in keywords)
+    ]
+
+    corpus = []
+    for _ in range(size):
+        if kind == "short":
+            text = rng.choice(neutral)
+            if rng.random() < 0.7:
+                text = f"{text}，有点{rng.choice(keywords)}"
+        elif kind == "long":
+            parts = []
+            for _ in range(rng.randint(8, 20)):
+                parts.append(rng.choice(neutral))
+                if rng.random() < 0.4:
+                    parts.append(f"感觉很{rng.choice(keywords)}")
+            text = "，".join(parts) + "。"
+        elif kind == "crisis":
+            if rng.random() < 0.5:
+                crisis = f"我{rng.choice(CRISIS_KEYWORDS)}"
+            else:
+                crisis = "，".join(
+                    rng.choice(words) for words in CRISIS_COMBINATION_WORDS.values()
+                )
+            parts = rng.sample(neutral, rng.randint(1, 4))
+            parts.insert(rng.randint(0, len(parts)), crisis)
+            text = "，".join(parts)
+        else:
+            text = "，".join(rng.sample(neutral, rng.randint(1, 6)))
+        corpus.append(text)
+    return corpus
+
+
+def hot_paths() -> Dict[str, Callable[[str], object]]:
+    """返回需要测量的热点函数（名称 -> 以单条文本为参数的可调用对象）."""
+    knowledge = KnowledgeService()
+    conversation = ConversationService()
+    analysis = AnalysisService()
+    return {
+        "knowledge.analyze_user_input": knowledge.analyze_user_input,
+        "conversation.detect_emotion": conversation._detect_emotion,
+        "conversation.agent_perceive": conversation._agent_perceive,
+        "analysis.analyze_emotion": analysis._analyze_emotion,
+        "analysis.identify_core_issue": analysis._identify_core_issue,
+    }
+
+
+def measure(
+    func: Callable[[str], object], corpus: List[str], iterations: int
+) -> Dict[str, float]:
+    """逐条调用并计时，返回 ops/sec 和延迟分位数（微秒）."""
+    for text in corpus[:50]:
+        func(text)
+
+    samples = []
+    clock = time.perf_counter_ns
+    size = len(corpus)
+    for i in range(iterations):
+        text = corpus[i % size]
+        started = clock()
+        func(text)
+        samples.append(clock() - started)
+
+    samples.sort()
+    total_seconds = sum(samples) / 1e9
+    return {
+        "ops_per_sec": round(iterations / total_seconds, 1) if total_seconds else 0.0,
+        "p50_us": round(statistics.median(samples) / 1000, 3),
+        "p99_us": round(
+            samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000, 3
+        ),
+        "mean_us": round(statistics.fmean(samples) / 1000, 3),
+    }
+
+
+def run(
+    iterations: int = DEFAULT_ITERATIONS,
+    size: int = DEFAULT_CORPUS_SIZE,
+    seed: int = DEFAULT_SEED,
+    name_filter: Optional[str] = None,
+    echo: Callable[[str], None] = print,
+) -> Dict:
+    """运行全部基准，返回可保存为JSON的结果."""
+    corpora = {kind: generate_corpus(kind, size, seed) for kind in CORPUS_KINDS}
+    results = {}
+    for name, func in hot_paths().items():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = {}
+        for kind, corpus in corpora.items():
+            result = measure(func, corpus, iterations)
+            results[name][kind] = result
+            echo(
+                f"{name:<32} {kind:<9} {result['ops_per_sec']:>12,.0f} ops/s "
+                f"p50={result['p50_us']:>8.2f}us p99={result['p99_us']:>8.2f}us"
+            )
+
+    return {
+        "meta": {
+            "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "corpus_size": size,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, echo: Callable[[str], None] = print):
+    """打印与基线相比的 ops/sec 和 p99 变化."""
+    echo("\n=== 与基线对比 (ops/sec, p99) ===")
+    for name, kinds in current["results"].items():
+        for kind, result in kinds.items():
+            base = baseline.get("results", {}).get(name, {}).get(kind)
+            if not base:
+                echo(f"{name:<32} {kind:<9} 基线中没有该项")
+                continue
+            ops_change = (result["ops_per_sec"] / base["ops_per_sec"] - 1) * 100
+            p99_change = (result["p99_us"] / base["p99_us"] - 1) * 100
+            echo(
+                f"{name:<32} {kind:<9} ops/s {ops_change:+7.1f}%  "
+                f"p99 {p99_change:+7.1f}%"
+            )
+
+
+def save(result: Dict, path: str) -> None:
+    """把结果保存为JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> Dict:
+    """读取之前保存的结果."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument(
+        "--size", type=int, default=DEFAULT_CORPUS_SIZE, help="每类语料条数"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "-k", "--filter", dest="name_filter", help="只运行名称包含该字符串的基准"
+    )
+    parser.add_argument("-o", "--output", help="保存结果的JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果对比")
+    args = parser.parse_args(argv)
+
+    result = run(args.iterations, args.size, args.seed, args.name_filter)
+    if args.compare:
+        compare(result, load(args.compare))
+    if args.output:
+        save(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""对话接口的本地负载测试.
+
+在本地SQLite（或其他 ``--database-url``）上启动 ``create_app``，为一批合成用户
+签发JWT，按配置的比例并发发送 chat/history/analyze 请求，报告吞吐量、
+延迟直方图和错误率，不依赖任何外部服务::
+
+    python -m benchmarks.load_test --concurrency 16 --duration 30
+    python -m benchmarks.load_test --mix chat=6,history=3,analyze=1 --json out.json
+
+默认在当前进程内通过WSGI直接调用应用（不含HTTP开销，压测线程与应用共享GIL）。
+测量单个gunicorn worker的承载能力时，用相同的 ``DATABASE_URL``/``JWT_SECRET_KEY``
+启动 ``gunicorn -w 1 ...``，再加 ``--url http://127.0.0.1:5000`` 通过HTTP压测。
+"""
+import argparse
+import bisect
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import select
+
+from benchmarks.db_indexes import make_config
+from benchmarks.hot_paths import generate_corpus
+from psyas.app import create_app
+from psyas.database import db
+from psyas.user.models import User
+
+DEFAULT_DATABASE_URL = "sqlite:////tmp/psyas_load.db"
+DEFAULT_MIX = "chat=6,history=3,analyze=1"
+USERNAME_PREFIX = "loadtest"
+
+# 操作名 -> (方法, 路径, 请求体构造函数)
+OPERATIONS = {
+    "chat": ("POST", "/api/conversation/chat", lambda text: {"message": text}),
+    "send": ("POST", "/api/chat/send-message", lambda text: {"user_input": text}),
+    "history": ("GET", "/api/conversation/history?limit=10", None),
+    "analyze": (
+        "POST",
+        "/api/analysis/analyze",
+        lambda text: {"conversation_id": None},
+    ),
+}
+
+# 延迟直方图分桶上界（毫秒）
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """解析 ``chat=6,history=3`` 形式的请求比例."""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"未知的操作: {name}（可选 {', '.join(OPERATIONS)}）")
+        weights[name] = int(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("请求比例不能全部为0")
+    return weights
+
+
+def ensure_users(count: int) -> List[str]:
+    """创建缺少的合成用户，返回每个用户的access token."""
+    usernames = [f"{USERNAME_PREFIX}{i}" for i in range(count)]
+    existing = set(
+        db.session.scalars(select(User.username).where(User.username.in_(usernames)))
+    )
+    for username in usernames:
+        if username not in existing:
+            db.session.add(
+                User(username=username, email=f"{username}@example.com", active=True)
+            )
+    db.session.commit()
+
+    users = db.session.scalars(select(User).where(User.username.in_(usernames)))
+    return [user.generate_tokens()["access_token"] for user in users]
+
+
+class InProcessClient:
+    """通过Flask测试客户端直接调用WSGI应用."""
+
+    def __init__(self, app):
+        """为当前线程创建测试客户端."""
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, token: str, body: Optional[Dict]) -> int:
+        """发送一个请求，返回状态码."""
+        response = self._client.open(
+            path,
+            method=method,
+            json=body,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        response.close()
+        return response.status_code
+
+
+class HttpClient:
+    """通过HTTP（长连接）访问已启动的服务."""
+
+    def __init__(self, base_url: str):
+        """记录服务地址，连接在第一次请求时建立."""
+        parts = urlsplit(base_url)
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._prefix = parts.path.rstrip("/")
+        self._connection = None
+
+    def request(self, method: str, path: str, token: str, body: Optional[Dict]) -> int:
+        """发送一个请求，返回状态码；连接出错时关闭连接并抛出异常."""
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(
+                self._host, self._port, timeout=30
+            )
+        headers = {"Authorization": f"Bearer {token}"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        try:
+            self._connection.request(
+                method, self._prefix + path, body=payload, headers=headers
+            )
+            response = self._connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self._connection.close()
+            self._connection = None
+            raise
+
+
+class LoadWorker(threading.Thread):
+    """按比例随机发送请求并记录每个请求的延迟和状态码."""
+
+    def __init__(self, index, client, tokens, texts, weights, deadline, budget):
+        """初始化压测线程（deadline为perf_counter截止时间）."""
+        super().__init__(name=f"load-worker-{index}", daemon=True)
+        self.client = client
+        self.tokens = tokens
+        self.texts = texts
+        self.names = list(weights)
+        self.weights = list(weights.values())
+        self.deadline = deadline
+        self.budget = budget
+        self.rng = random.Random(index)
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.names}
+        self.statuses: Dict[str, Counter] = {name: Counter() for name in self.names}
+
+    def run(self):
+        """循环发送请求直到超时或请求数用完."""
+        clock = time.perf_counter
+        while clock() < self.deadline and self.budget.take():
+            name = self.rng.choices(self.names, self.weights)[0]
+            method, path, build_body = OPERATIONS[name]
+            body = build_body(self.rng.choice(self.texts)) if build_body else None
+            token = self.rng.choice(self.tokens)
+
+            started = clock()
+            try:
+                status = self.client.request(method, path, token, body)
+            except Exception:  # noqa: B902  连接失败等也计为错误
+                status = "exception"
+            self.latencies[name].append((clock() - started) * 1000)
+            self.statuses[name][status] += 1
+
+
+class RequestBudget:
+    """所有压测线程共享的请求数上限（None表示不限）."""
+
+    def __init__(self, total: Optional[int]):
+        """设置请求总数上限."""
+        self._remaining = total
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """申请发送一个请求，额度用完时返回False."""
+        if self._remaining is None:
+            return True
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+def is_error(operation: str, status) -> bool:
+    """判断一次请求是否失败（analyze没有可分析的对话时返回404属于正常情况）."""
+    if status == "exception":
+        return True
+    if operation == "analyze" and status == 404:
+        return False
+    return status >= 400
+
+
+def histogram(latencies: List[float]) -> List[Tuple[str, int]]:
+    """按 HISTOGRAM_BOUNDS_MS 统计延迟分布."""
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for value in latencies:
+        counts[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, value)] += 1
+    labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [
+        f">{HISTOGRAM_BOUNDS_MS[-1]}ms"
+    ]
+    return list(zip(labels, counts))
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """返回已排序数据的分位数."""
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * q))
+    return sorted_values[index]
+
+
+def summarize(workers: List[LoadWorker], elapsed: float) -> Dict:
+    """合并各线程的记录并计算统计结果."""
+    operations = {}
+    all_latencies = []
+    total_errors = 0
+    for name in workers[0].names:
+        latencies = sorted(v for worker in workers for v in worker.latencies[name])
+        statuses = Counter()
+        for worker in workers:
+            statuses.update(worker.statuses[name])
+        if not latencies:
+            continue
+        errors = sum(n for status, n in statuses.items() if is_error(name, status))
+        total_errors += errors
+        all_latencies.extend(latencies)
+        operations[name] = {
+            "requests": len(latencies),
+            "requests_per_sec": round(len(latencies) / elapsed, 1),
+            "error_rate": round(errors / len(latencies), 4),
+            "statuses": {str(status): n for status, n in statuses.items()},
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p90_ms": round(percentile(latencies, 0.90), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "max_ms": round(latencies[-1], 3),
+            "histogram": histogram(latencies),
+        }
+
+    total = len(all_latencies)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": total,
+        "requests_per_sec": round(total / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(total_errors / total, 4) if total else 0.0,
+        "operations": operations,
+    }
+
+
+def report(result: Dict, concurrency: int) -> None:
+    """打印统计结果和延迟直方图."""
+    print(
+        f"\n=== {concurrency} 并发, {result['elapsed_seconds']:.1f}s: "
+        f"{result['requests']} 请求, {result['requests_per_sec']:.1f} req/s, "
+        f"错误率 {result['error_rate']:.2%} ==="
+    )
+    for name, op in result["operations"].items():
+        print(
+            f"\n{name:<8} {op['requests']:>7} 请求 {op['requests_per_sec']:>8.1f} req/s "
+            f"错误率 {op['error_rate']:.2%}  p50={op['p50_ms']:.1f}ms "
+            f"p90={op['p90_ms']:.1f}ms p99={op['p99_ms']:.1f}ms max={op['max_ms']:.1f}ms"
+        )
+        print(f"         状态码: {op['statuses']}")
+        peak = max(count for _, count in op["histogram"]) or 1
+        for label, count in op["histogram"]:
+            if count:
+                bar = "#" * max(1, round(count / peak * 40))
+                print(f"         {label:>9} {count:>7} {bar}")
+
+
+def run(
+    app,
+    concurrency: int,
+    duration: float,
+    weights: Dict[str, int],
+    users: int,
+    requests: Optional[int] = None,
+    url: Optional[str] = None,
+    warmup: int = 20,
+) -> Dict:
+    """准备用户和令牌后执行压测，返回统计结果."""
+    with app.app_context():
+        tokens = ensure_users(users)
+    texts = generate_corpus("short", 100) + generate_corpus("long", 20)
+
+    def make_client():
+        return HttpClient(url) if url else InProcessClient(app)
+
+    # 预热：加载知识库、引导问题索引、MCP工具等一次性初始化
+    warm = LoadWorker(
+        -1, make_client(), tokens, texts, weights, float("inf"), RequestBudget(warmup)
+    )
+    warm.run()
+
+    budget = RequestBudget(requests)
+    started = time.perf_counter()
+    deadline = started + duration
+    workers = [
+        LoadWorker(i, make_client(), tokens, texts, weights, deadline, budget)
+        for i in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return summarize(workers, time.perf_counter() - started)
+
+
+def main(argv=None):
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="并发线程数")
+    parser.add_argument(
+        "-d", "--duration", type=float, default=20.0, help="持续时间（秒）"
+    )
+    parser.add_argument("-n", "--requests", type=int, help="请求总数上限（达到即停止）")
+    parser.add_argument("--users", type=int, default=50, help="合成用户数")
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"请求比例，可选 {', '.join(OPERATIONS)}（默认 {DEFAULT_MIX}）",
+    )
+    parser.add_argument("--url", help="压测已启动的服务（如 http://127.0.0.1:5000）")
+    parser.add_argument("--json", dest="json_path", help="保存结果的JSON文件")
+    args = parser.parse_args(argv)
+
+    weights = parse_mix(args.mix)
+    app = create_app(make_config(args.database_url))
+    with app.app_context():
+        db.create_all()
+
+    if not args.url:
+        missing = [
+            name
+            for name in weights
+            if not any(
+                rule.rule == OPERATIONS[name][1].split("?")[0]
+                for rule in app.url_map.iter_rules()
+            )
+        ]
+        for name in missing:
+            print(f"警告：{OPERATIONS[name][1]} 未在应用中注册，跳过 {name}")
+            weights.pop(name)
+        if not weights:
+            parser.error("没有可压测的接口")
+
+    result = run(
+        app,
+        args.concurrency,
+        args.duration,
+        weights,
+        args.users,
+        requests=args.requests,
+        url=args.url,
+    )
+    report(result, args.concurrency)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"concurrency": args.concurrency, "mix": weights, **result},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""gunicorn预加载内存基准测试.
+
+分别以关闭/开启预加载（``GUNICORN_PRELOAD``）启动gunicorn，用并发对话请求
+让每个worker都走一遍知识库、关键词匹配和引导问题路径，然后读取每个worker的
+RSS、PSS和USS（独占内存）::
+
+    python -m benchmarks.preload_memory --workers 4 --requests 400
+    python -m benchmarks.preload_memory --worker-class gevent --json result.json
+
+只支持有 ``/proc/<pid>/smaps_rollup`` 的Linux。
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from psyas.prefork import memory_usage
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGES = [
+    "最近工作压力很大，晚上总是睡不着",
+    "和家里人吵架了，心里很难受",
+    "考试快到了，我很焦虑",
+    "今天心情不错，和朋友出去玩了",
+]
+
+
+def _free_port() -> int:
+    """返回一个空闲端口."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _prepare_database(env: Dict[str, str]) -> str:
+    """建表并创建测试用户，返回访问令牌."""
+    script = (
+        "from psyas.app import create_app\n"
+        "from psyas.database import db\n"
+        "from psyas.user.models import User\n"
+        "app = create_app()\n"
+        "with app.app_context():\n"
+        "    db.create_all()\n"
+        "    user = User.create(username='bench', email='bench@example.com',"
+        " password='bench-password', active=True)\n"
+        "    print(user.generate_tokens()['access_token'])\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        cwd=PROJECT_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return output.strip().splitlines()[-1]
+
+
+def _worker_pids(master_pid: int) -> List[int]:
+    """返回master的子进程ID."""
+    with open(f"/proc/{master_pid}/task/{master_pid}/children", encoding="ascii") as f:
+        return sorted(int(pid) for pid in f.read().split())
+
+
+def _wait_until_ready(port: int, master_pid: int, workers: int, timeout=60.0):
+    """等待全部worker启动且端口可连接."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                if len(_worker_pids(master_pid)) >= workers:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn未能在限定时间内启动")
+
+
+def _chat(port: int, token: str, message: str) -> int:
+    """发送一次对话请求，返回HTTP状态码."""
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/conversation/chat",
+        data=json.dumps({"message": message}).encode("utf-8"),
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {token}",
+        },
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status
+
+
+def measure(preload: bool, args) -> Dict:
+    """启动一组gunicorn worker，压测后返回每个worker的内存占用."""
+    workdir = tempfile.mkdtemp(prefix="psyas_preload_")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir}/bench.db",
+        GUNICORN_PRELOAD="true" if preload else "false",
+        GUNICORN_WORKER_CLASS=args.worker_class,
+        SECRET_KEY="preload-benchmark",
+        FLASK_ENV="production",
+        CACHE_TYPE="SimpleCache",
+    )
+    token = _prepare_database(env)
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "psyas.app:create_app()",
+            "-b",
+            f"127.0.0.1:{port}",
+            "-w",
+            str(args.workers),
+            "-c",
+            "gunicorn.conf.py",
+        ],
+        env=env,
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_until_ready(port, server.pid, args.workers)
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            statuses = list(
+                pool.map(
+                    lambda i: _chat(port, token, MESSAGES[i % len(MESSAGES)]),
+                    range(args.requests),
+                )
+            )
+        workers = {pid: memory_usage(pid) for pid in _worker_pids(server.pid)}
+        return {
+            "preload": preload,
+            "ok_requests": sum(1 for status in statuses if status == 200),
+            "master": memory_usage(server.pid),
+            "workers": workers,
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def _summary(result: Dict) -> Dict[str, float]:
+    """每个worker的平均RSS/PSS/USS（MB）."""
+    workers = list(result["workers"].values())
+    return {
+        key: sum(worker[key] for worker in workers) / len(workers) / 1024
+        for key in ("rss", "pss", "uss")
+    }
+
+
+def main(argv=None):
+    """命令行入口."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker-class", default="sync")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--json", help="把原始结果写入该文件")
+    args = parser.parse_args(argv)
+
+    results = [measure(False, args), measure(True, args)]
+    print(f"{'preload':<10}{'requests':>10}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}")
+    for result in results:
+        summary = _summary(result)
+        print(
+            f"{str(result['preload']):<10}{result['ok_requests']:>10}"
+            f"{summary['rss']:>10.1f}{summary['pss']:>10.1f}{summary['uss']:>10.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""gunicorn配置（从项目根目录启动时自动读取，Procfile 和 supervisord 共用）.
+
+预加载需要显式开启（``GUNICORN_PRELOAD=1``）：应用在master中创建一次，
+fork前构建只读的共享状态并冻结GC，worker通过写时复制共享这些内存页，
+详见 ``psyas/prefork.py``。
+
+worker类型由 ``GUNICORN_WORKER_CLASS`` 设置（默认sync）。使用gevent并预加载时，
+必须在导入应用之前打好补丁，否则master中创建的锁和线程不会被替换为gevent版本，
+所以只有这种组合会在这里（读取配置时）给master打补丁；未预加载时由gevent
+worker在fork后自行打补丁。
+"""
+import os
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+preload_app = os.environ.get("GUNICORN_PRELOAD", "").lower() in (
+    "1",
+    "true",
+    "yes",
+    "on",
+)
+
+
+def uses_gevent(worker_class):
+    """worker类型是否为gevent（gevent、gevent_pywsgi或完整类路径）."""
+    return worker_class.rsplit(".", 1)[-1].lower().startswith("gevent")
+
+
+if preload_app and uses_gevent(worker_class):
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def pre_fork(server, worker):
+    """fork第一个worker前在master中构建共享状态并冻结GC."""
+    if not server.cfg.preload_app:
+        return
+    from psyas.prefork import memory_usage, prepare_for_fork
+
+    if prepare_for_fork(server.app.wsgi()):
+        server.log.info("预加载完成，master内存: %s", memory_usage())
+
+
+def post_fork(server, worker):
+    """worker中丢弃从master继承的数据库连接."""
+    if not server.cfg.preload_app:
+        return
+    from psyas.prefork import after_fork
+
+    after_fork(server.app.wsgi())
+
+
+def worker_exit(server, worker):
+    """worker退出前写入延迟写入队列中的对话."""
+    from psyas.services.conversation_writer import conversation_writer
+
+    conversation_writer.drain()
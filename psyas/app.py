@@ -8,6 +8,7 @@ from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS  # 新增：导入 CORS 处理跨域
 
 from psyas import commands, public, user
+from psyas.auth import identity
 from psyas.extensions import (  # 移除了未使用的csrf_protect
     bcrypt,
     cache,
@@ -23,12 +24,19 @@ from psyas.extensions import (  # 移除了未使用的csrf_protect
 # 新增：导入模型文件，确保Alembic能扫描到
 from psyas.models import analysis  # noqa: F401
 from psyas.models import conversation  # noqa: F401
+from psyas.models import emotion_timeline  # noqa: F401
 from psyas.models import guide_question  # noqa: F401
 from psyas.models import (
     Analysis,
     Conversation,
+    DailyEmotionCount,
     GuideQuestion,
 )
+from psyas.passwords import password_hasher
+from psyas.services.analysis_window import analysis_windows
+from psyas.services.conversation_writer import conversation_writer
+from psyas.services.guide_question_index import guide_question_index
+from psyas.services.memory_cache import agent_memory_cache
 
 
 def create_app(config_object="psyas.settings"):
@@ -61,6 +69,7 @@ def create_app(config_object="psyas.settings"):
     # ---------- CORS 配置结束 ----------
 
     register_blueprints(app)
+    register_mcp(app)
     register_errorhandlers(app)
     register_shellcontext(app)
     register_commands(app)
@@ -70,11 +79,13 @@ def create_app(config_object="psyas.settings"):
     # 注册业务接口蓝图
     from psyas.routes.analysis_routes import analysis_bp
     from psyas.routes.conversation_routes import conversation_bp
+    from psyas.routes.metrics_routes import metrics_bp
     from psyas.routes.test_routes import test_bp
 
     app.register_blueprint(test_bp)
     app.register_blueprint(analysis_bp)
     app.register_blueprint(conversation_bp)
+    app.register_blueprint(metrics_bp)
 
     return app
 
@@ -83,6 +94,7 @@ def create_app(config_object="psyas.settings"):
 def register_extensions(app):
     """Register Flask extensions."""
     bcrypt.init_app(app)
+    password_hasher.init_app(app)
     cache.init_app(app)
     db.init_app(app)
     # csrf_protect.init_app(app)  # 前后端分离场景暂不启用 CSRF
@@ -93,6 +105,11 @@ def register_extensions(app):
     # 条件初始化JWT
     if jwt is not None:
         jwt.init_app(app)
+    identity.init_app(app)
+    agent_memory_cache.init_app(app)
+    guide_question_index.init_app(app)
+    conversation_writer.init_app(app)
+    analysis_windows.init_app(app)
     return None
 
 
@@ -106,6 +123,14 @@ def register_blueprints(app):
     return None
 
 
+def register_mcp(app):
+    """Bind the shared MCP tool registry to the app."""
+    from psyas.mcp.tool_registry import get_tool_registry
+
+    get_tool_registry().init_app(app)
+    return None
+
+
 def register_errorhandlers(app):
     """Register error handlers (返回 JSON 而非 HTML)."""
 
@@ -131,6 +156,7 @@ def register_shellcontext(app):
             "Conversation": Conversation,  # 使用包级别导入
             "Analysis": Analysis,  # 使用包级别导入
             "GuideQuestion": GuideQuestion,  # 使用包级别导入
+            "DailyEmotionCount": DailyEmotionCount,
         }
 
     app.shell_context_processor(shell_context)
@@ -140,6 +166,11 @@ def register_commands(app):
     """Register Click commands."""
     app.cli.add_command(commands.test)
     app.cli.add_command(commands.lint)
+    app.cli.add_command(commands.analyze_all)
+    app.cli.add_command(commands.backfill_emotions)
+    app.cli.add_command(commands.export_history)
+    app.cli.add_command(commands.bench)
+    app.cli.add_command(commands.kb)
 
 
 def configure_logger(app):
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""请求级用户身份加载 (UserIdentity) 和短期用户缓存.
+
+``jwt_required`` 通过 ``user_lookup_loader`` 每个请求最多加载一次当前用户，
+结果由 flask_jwt_extended 保存在请求上下文中，路由通过 ``current_user``
+读取；服务层再次调用 ``load_user`` 时命中同一请求的结果。
+
+用户快照（ID、用户名、是否管理员、是否启用）缓存在带TTL的 ``user_cache``
+中，不同请求之间不再重复按主键查询；``User`` 的修改或删除在事务提交后
+自动使缓存失效。``update(User)`` 之类的批量语句不会触发失效，只能等TTL到期。
+
+失效只作用于本worker的缓存（开启 ``USER_CACHE_SHARED`` 时作用于共享缓存），
+其他worker中用户名、停用等修改最长在 ``USER_CACHE_TTL`` 秒后生效。
+
+用户名和管理员标记优先取自 ``User.generate_tokens`` 写入令牌的声明；
+管理员权限由 ``has_admin_rights`` 绕过缓存查询数据库确认，撤销在所有worker中
+立即生效，授予需要重新登录。
+
+令牌有效但用户已删除或已停用时，所有 ``jwt_required`` 接口（包括此前不检查
+用户的接口和页面）都由 ``user_lookup_error_loader`` 统一返回401
+``{"code": 401, "message": "用户不存在"}``。此前停用的用户仍可使用未过期的
+令牌，对话接口的错误字段为 ``msg``，用户页面返回纯文本。
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from flask import g, has_app_context, jsonify
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from psyas.database import db
+from psyas.extensions import jwt
+from psyas.services.memory_cache import MemoryCache
+from psyas.user.models import User
+
+DEFAULT_USER_CACHE_SIZE = 4096
+DEFAULT_USER_CACHE_TTL = 60
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    """当前用户的只读身份信息（可安全缓存和跨请求共享）."""
+
+    id: int
+    username: str
+    is_admin: bool = False
+    active: bool = True
+
+
+# 按用户ID缓存身份快照，在 create_app 中通过 init_app 读取配置
+user_cache = MemoryCache(
+    max_entries=DEFAULT_USER_CACHE_SIZE,
+    ttl=DEFAULT_USER_CACHE_TTL,
+    key_prefix="user_identity:",
+)
+
+
+def init_app(app):
+    """从应用配置读取用户缓存参数."""
+    user_cache.max_entries = app.config.get("USER_CACHE_SIZE", DEFAULT_USER_CACHE_SIZE)
+    user_cache.ttl = app.config.get("USER_CACHE_TTL", DEFAULT_USER_CACHE_TTL)
+    user_cache.shared = app.config.get("USER_CACHE_SHARED", False)
+    user_cache.clear()
+
+
+def load_user(user_id) -> Optional[UserIdentity]:
+    """
+    按ID加载用户身份：同一请求内只查一次，跨请求使用TTL缓存.
+
+    Args:
+        user_id: 用户ID（令牌中的sub，可能是字符串）
+
+    Returns:
+        Optional[UserIdentity]: 用户不存在时返回None
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    loaded = _request_identities()
+    if user_id in loaded:
+        return loaded[user_id]
+
+    identity = user_cache.get(user_id)
+    if identity is None:
+        identity = _query_identity(user_id)
+
+    loaded[user_id] = identity
+    return identity
+
+
+def has_admin_rights(identity: Optional[UserIdentity]) -> bool:
+    """
+    管理员权限检查：令牌声明为管理员时绕过缓存查询数据库.
+
+    其他worker撤销管理员或停用用户时，本worker的缓存不会失效，
+    权限检查因此不使用缓存中的快照。
+
+    Args:
+        identity: 当前用户（``current_user``）
+
+    Returns:
+        bool: 令牌和数据库中都是管理员且用户仍启用
+    """
+    if identity is None or not identity.is_admin:
+        return False
+    stored = _query_identity(identity.id)
+    return stored is not None and stored.active and stored.is_admin
+
+
+def _query_identity(user_id: int) -> Optional[UserIdentity]:
+    """从数据库读取用户身份并写入缓存."""
+    row = db.session.execute(
+        select(User.id, User.username, User.is_admin, User.active).where(
+            User.id == user_id
+        )
+    ).first()
+    if row is None:
+        return None
+    identity = UserIdentity(
+        id=row.id,
+        username=row.username,
+        is_admin=bool(row.is_admin),
+        active=bool(row.active),
+    )
+    user_cache.set(user_id, identity)
+    return identity
+
+
+def invalidate_user(user_id: int) -> None:
+    """使用户缓存失效（包括当前请求中已加载的身份）."""
+    user_cache.invalidate(user_id)
+    _request_identities().pop(user_id, None)
+
+
+def _request_identities() -> Dict[int, Optional[UserIdentity]]:
+    """当前应用上下文中已加载的用户身份."""
+    if not has_app_context():
+        return {}
+    if "user_identities" not in g:
+        g.user_identities = {}
+    return g.user_identities
+
+
+def identity_from_token(jwt_header: Dict, jwt_data: Dict) -> Optional[UserIdentity]:
+    """JWT用户加载器：用户不存在或已停用时返回None（请求返回401）."""
+    stored = load_user(jwt_data.get("sub"))
+    if stored is None or not stored.active:
+        return None
+    return UserIdentity(
+        id=stored.id,
+        username=jwt_data.get("username", stored.username),
+        is_admin=bool(jwt_data.get("is_admin", stored.is_admin)) and stored.is_admin,
+        active=True,
+    )
+
+
+if jwt is not None:
+
+    @jwt.user_lookup_loader
+    def _user_lookup(jwt_header, jwt_data):
+        """每个请求加载一次当前用户."""
+        return identity_from_token(jwt_header, jwt_data)
+
+    @jwt.user_lookup_error_loader
+    def _user_lookup_error(jwt_header, jwt_data):
+        """令牌对应的用户不存在或已停用."""
+        return jsonify({"code": 401, "message": "用户不存在"}), 401
+
+
+def _mark_changed(mapper, connection, target):
+    """记录当前会话修改过的用户."""
+    session = object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault("users_changed", set()).add(target.id)
+
+
+for _event_name in ("after_update", "after_delete"):
+    event.listen(User, _event_name, _mark_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    """用户的修改提交后使缓存失效."""
+    for user_id in session.info.pop("users_changed", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    """回滚后丢弃修改标记."""
+    session.info.pop("users_changed", None)
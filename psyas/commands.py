@@ -5,6 +5,7 @@ from glob import glob
 from subprocess import call
 
 import click
+from flask.cli import with_appcontext
 
 HERE = os.path.abspath(os.path.dirname(__file__))
 PROJECT_ROOT = os.path.join(HERE, os.pardir)
@@ -81,3 +82,211 @@ def lint(fix_imports, check):
         execute_tool("Fixing import order", "isort", *isort_args)
     execute_tool("Formatting style", "black", *black_args)
     execute_tool("Checking code style", "flake8")
+
+
+@click.command("analyze-all")
+@click.option(
+    "--chunk-size",
+    default=1000,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Conversations analysed and committed per transaction",
+)
+@click.option(
+    "-w",
+    "--workers",
+    default=None,
+    type=click.IntRange(min=0),
+    help="Analysis processes (default: CPU count, 0 or 1 runs in-process)",
+)
+@click.option(
+    "-n",
+    "--limit",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Stop after analysing this many conversations",
+)
+@with_appcontext
+def analyze_all(chunk_size, workers, limit):
+    """Analyse every conversation that has not been analysed yet."""
+    from psyas.services.analysis_service import AnalysisService
+
+    def report(stats):
+        click.echo(
+            f"chunk {stats['chunks']}: {stats['analyzed']} analysed, "
+            f"{stats['rows_per_second']:.0f} rows/s"
+        )
+
+    result = AnalysisService().analyze_unanalyzed_conversations(
+        chunk_size=chunk_size, workers=workers, limit=limit, progress=report
+    )
+    stats = result.get("data")
+    if stats:
+        click.echo(
+            f"Analysed {stats['analyzed']} conversations in {stats['chunks']} "
+            f"chunks using {stats['workers']} workers: "
+            f"{stats['elapsed_seconds']:.1f}s, {stats['rows_per_second']:.0f} rows/s"
+        )
+    if result["code"] != 200:
+        raise click.ClickException(result["error"])
+
+
+@click.command("backfill-emotions")
+@click.option(
+    "--chunk-size",
+    default=1000,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Conversations updated per transaction",
+)
+@with_appcontext
+def backfill_emotions(chunk_size):
+    """Store the detected emotion on conversations saved before it existed."""
+    from psyas.services.conversation_service import get_conversation_service
+
+    result = get_conversation_service().backfill_conversation_emotions(
+        chunk_size=chunk_size,
+        progress=lambda updated: click.echo(f"{updated} conversations backfilled"),
+    )
+    click.echo(f"Backfilled {result['data']['updated']} conversations")
+    if result["code"] != 200:
+        raise click.ClickException(result["error"])
+
+
+def _keep_end_record(records, end):
+    """Pass records through, copying the closing summary record into ``end``."""
+    for record in records:
+        if record["type"] == "end":
+            end.update(record)
+        yield record
+
+
+@click.command("export-history")
+@click.option("-u", "--user-id", required=True, type=int, help="User to export")
+@click.option(
+    "-o",
+    "--output",
+    default="-",
+    show_default=True,
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help="Output file (- for stdout)",
+)
+@click.option(
+    "--gzip/--no-gzip",
+    "compress",
+    default=None,
+    help="Gzip the output (default: when the output file ends with .gz)",
+)
+@click.option("--cursor", default=None, help="Resume after this export cursor")
+@click.option(
+    "-n",
+    "--limit",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Stop after exporting this many records",
+)
+@with_appcontext
+def export_history(user_id, output, compress, cursor, limit):
+    """Stream a user's conversations and analyses as NDJSON."""
+    from psyas.pagination import InvalidCursor
+    from psyas.services.history_export import (
+        gzip_chunks,
+        iter_history,
+        ndjson_chunks,
+    )
+
+    try:
+        records = iter_history(user_id, cursor=cursor, limit=limit)
+    except InvalidCursor as exc:
+        raise click.BadParameter(str(exc), param_hint="--cursor")
+
+    end = {}
+    chunks = ndjson_chunks(_keep_end_record(records, end))
+    if compress is None:
+        compress = output.endswith(".gz")
+    if compress:
+        chunks = gzip_chunks(chunks)
+    else:
+        chunks = (chunk.encode("utf-8") for chunk in chunks)
+    with click.open_file(output, "wb") as stream:
+        for chunk in chunks:
+            stream.write(chunk)
+
+    click.echo(f"Exported {end['exported']} records", err=True)
+    if end.get("error"):
+        raise click.ClickException(
+            f"{end['error']} (resume with --cursor {end['next_cursor']})"
+        )
+    if not end["complete"]:
+        click.echo(f"More records remain: --cursor {end['next_cursor']}", err=True)
+
+
+@click.command()
+@click.option(
+    "-n",
+    "--iterations",
+    default=2000,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Calls per benchmark and corpus",
+)
+@click.option(
+    "--size",
+    default=200,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Synthetic inputs per corpus",
+)
+@click.option("--seed", default=20250828, show_default=True, help="Corpus seed")
+@click.option(
+    "-k", "--filter", default=None, help="Only run benchmarks whose name contains this"
+)
+@click.option(
+    "-o", "--output", default=None, type=click.Path(), help="Save results as JSON"
+)
+@click.option(
+    "--compare",
+    default=None,
+    type=click.Path(exists=True),
+    help="Compare against previously saved JSON results",
+)
+def bench(iterations, size, seed, filter, output, compare):
+    """Benchmark the knowledge, emotion and analysis hot paths."""
+    from benchmarks import hot_paths
+
+    result = hot_paths.run(iterations, size, seed, filter, echo=click.echo)
+    if compare:
+        hot_paths.compare(result, hot_paths.load(compare), echo=click.echo)
+    if output:
+        hot_paths.save(result, output)
+        click.echo(f"Saved results to {output}")
+
+
+@click.group()
+def kb():
+    """Knowledge base data commands."""
+
+
+@kb.command("check")
+@click.option(
+    "--data-dir",
+    default=None,
+    type=click.Path(exists=True, file_okay=False),
+    help="Directory with the knowledge JSON files (default: psyas/data)",
+)
+def kb_check(data_dir):
+    """Validate the knowledge JSON files."""
+    from psyas.services.knowledge_base import (
+        DATA_DIR,
+        KnowledgeBaseError,
+        check_data_dir,
+    )
+
+    try:
+        stats = check_data_dir(data_dir or DATA_DIR)
+    except KnowledgeBaseError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"Knowledge data OK: {stats['frameworks']} frameworks, "
+        f"{stats['issues']} issues, {stats['states']} automaton states"
+    )
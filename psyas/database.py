@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Database module, including the SQLAlchemy database object and DB-related utilities."""
-from typing import Optional, Type, TypeVar
+from contextlib import contextmanager
+from typing import Iterator, Optional, Type, TypeVar
 
 from .compat import basestring
 from .extensions import db
@@ -11,15 +12,58 @@ T = TypeVar("T", bound="PkModel")
 Column = db.Column
 relationship = db.relationship
 
+# Key in ``session.info`` holding the current unit-of-work nesting depth
+_UNIT_OF_WORK_DEPTH = "unit_of_work_depth"
+
+
+def in_unit_of_work() -> bool:
+    """Return whether the current session is inside :func:`unit_of_work`."""
+    return db.session.info.get(_UNIT_OF_WORK_DEPTH, 0) > 0
+
+
+@contextmanager
+def unit_of_work() -> Iterator:
+    """Run a block of database work as a single transaction.
+
+    The outermost block commits once on success and rolls back on any
+    exception. Nested blocks join the outer transaction, and CRUDMixin
+    commits inside the block only flush (so primary keys are available)::
+
+        with unit_of_work():
+            analysis = Analysis.create(commit=False, ...)
+            conversation.is_analyzed = True
+    """
+    session = db.session
+    depth = session.info.get(_UNIT_OF_WORK_DEPTH, 0)
+    session.info[_UNIT_OF_WORK_DEPTH] = depth + 1
+    committed = False
+    try:
+        yield session
+        if depth == 0:
+            session.commit()
+        committed = True
+    finally:
+        session.info[_UNIT_OF_WORK_DEPTH] = depth
+        if depth == 0 and not committed:
+            session.rollback()
+
+
+def _commit() -> None:
+    """Commit, or only flush when a unit of work will commit later."""
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
 
 class CRUDMixin(object):
     """Mixin that adds convenience methods for CRUD (create, read, update, delete) operations."""
 
     @classmethod
-    def create(cls, **kwargs):
+    def create(cls, commit=True, **kwargs):
         """Create a new record and save it the database."""
         instance = cls(**kwargs)
-        return instance.save()
+        return instance.save(commit=commit)
 
     def update(self, commit=True, **kwargs):
         """Update specific fields of a record."""
@@ -33,14 +77,14 @@ class CRUDMixin(object):
         """Save the record."""
         db.session.add(self)
         if commit:
-            db.session.commit()
+            _commit()
         return self
 
     def delete(self, commit: bool = True) -> None:
         """Remove the record from the database."""
         db.session.delete(self)
         if commit:
-            return db.session.commit()
+            return _commit()
         return
 
 
@@ -17,6 +17,15 @@ try:
 except ImportError:
     JWT_AVAILABLE = False
     JWTManager = None
+
+# redis 可选：使用RedisCache时读写缓存可能抛出redis的连接错误
+try:
+    from redis.exceptions import RedisError
+
+    CACHE_ERRORS = (OSError, RedisError)
+except ImportError:
+    CACHE_ERRORS = (OSError,)
+
 bcrypt = Bcrypt()
 cors = CORS()
 login_manager = LoginManager()
@@ -11,9 +11,14 @@ MCP (Model Context Protocol) 工具包装模块.
 try:
     from .database_server import DatabaseMCPServer  # noqa: F401
     from .psychology_server import PsychologyMCPServer  # noqa: F401
-    from .tool_registry import MCPToolRegistry  # noqa: F401
+    from .tool_registry import MCPToolRegistry, get_tool_registry  # noqa: F401
 
-    __all__ = ["PsychologyMCPServer", "DatabaseMCPServer", "MCPToolRegistry"]
+    __all__ = [
+        "PsychologyMCPServer",
+        "DatabaseMCPServer",
+        "MCPToolRegistry",
+        "get_tool_registry",
+    ]
 
 except ImportError as e:
     print(f"警告：MCP模块导入失败: {e}")
@@ -1,14 +1,31 @@
 # -*- coding: utf-8 -*-
-"""数据库MCP服务器 - 包装现有的数据库操作为MCP工具."""
-from typing import Any, Dict, List, Optional
-
+"""数据库MCP服务器 - 包装现有的数据库操作为MCP工具.
+
+SQLAlchemy查询是阻塞的，所有数据库工具都在有界线程池中执行：
+每个任务推入独立的应用上下文（从而使用独立的scoped session），
+``asyncio.gather`` 并发调用的多个数据库工具能真正重叠执行I/O。
+"""
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
 
 # 重用现有模型和数据库
 try:
-    from psyas.database import db
+    from psyas.database import db, unit_of_work
     from psyas.models.analysis import Analysis
     from psyas.models.conversation import Conversation
+    from psyas.pagination import InvalidCursor, keyset_page
+    from psyas.services.emotion_timeline import (
+        record_analyses,
+        record_conversations,
+    )
     from psyas.user.models import User
 
     DATABASE_AVAILABLE = True
@@ -19,6 +36,13 @@ except ImportError:
 from .psychology_server import MCPToolResult
 
 
+def _reset_server_after_fork(server_ref: "weakref.ref") -> None:
+    """fork后在子进程中重置仍存活的服务器实例."""
+    server = server_ref()
+    if server is not None:
+        server._reset_after_fork()
+
+
 class DatabaseMCPServer:
     """
     数据库MCP服务器.
@@ -27,11 +51,94 @@ class DatabaseMCPServer:
     为Agent提供数据存储、查询等功能。
     """
 
-    def __init__(self):
-        """初始化数据库MCP服务器."""
+    # 线程池默认大小和最多排队（含执行中）的任务数
+    default_pool_size = 4
+    default_queue_depth = 32
+
+    def __init__(
+        self,
+        app=None,
+        pool_size: Optional[int] = None,
+        queue_depth: Optional[int] = None,
+    ):
+        """初始化数据库MCP服务器.
+
+        Args:
+            app: Flask应用，线程池中的任务在它的应用上下文中执行；
+                为None时使用调用方当前的应用
+            pool_size: 线程池大小
+            queue_depth: 允许同时提交的最大任务数，超出时直接返回失败结果
+        """
         self.server_name = "database-tools"
         self.version = "1.0.0"
 
+        self.app = app
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.configure_pool(pool_size, queue_depth)
+
+        if hasattr(os, "register_at_fork"):
+            server_ref = weakref.ref(self)
+            os.register_at_fork(
+                after_in_child=lambda: _reset_server_after_fork(server_ref)
+            )
+
+    def configure_pool(
+        self, pool_size: Optional[int] = None, queue_depth: Optional[int] = None
+    ) -> None:
+        """设置线程池大小和队列深度（已有线程池会在空闲后替换）."""
+        with self._lock:
+            self.pool_size = pool_size or self.default_pool_size
+            self.queue_depth = max(queue_depth or self.default_queue_depth, 1)
+            self._slots = threading.BoundedSemaphore(self.queue_depth)
+            old_executor, self._executor = self._executor, None
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """数据库工具使用的线程池（首次使用时创建）."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size, thread_name_prefix="mcp-db"
+                )
+            return self._executor
+
+    async def _run_db(self, func: Callable[..., MCPToolResult], *args) -> MCPToolResult:
+        """在线程池中、独立的应用上下文里执行阻塞的数据库操作."""
+        app = self.app
+        if app is None and has_app_context():
+            app = current_app._get_current_object()
+        if app is None:
+            return MCPToolResult(success=False, data=None, error="缺少Flask应用上下文")
+
+        # 释放时使用获取的那个信号量：调用进行中configure_pool可能已替换self._slots
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            return MCPToolResult(
+                success=False, data=None, error="数据库工具繁忙，请稍后重试"
+            )
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self._call_in_app_context, app, func, args
+            )
+        finally:
+            slots.release()
+
+    @staticmethod
+    def _call_in_app_context(app, func: Callable[..., MCPToolResult], args):
+        """推入应用上下文后执行，上下文结束时scoped session随之清理."""
+        with app.app_context():
+            return func(*args)
+
+    def _reset_after_fork(self) -> None:
+        """fork后的子进程中线程池不可用，丢弃后重新创建."""
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+
     async def save_conversation(
         self,
         user_id: int,
@@ -46,24 +153,40 @@ class DatabaseMCPServer:
             user_id: 用户ID
             user_input: 用户输入
             assistant_response: 助手回复
-            metadata: 可选的元数据
+            metadata: 可选的元数据（emotion、confidence、response_source）
 
         Returns:
             MCPToolResult: 保存结果
         """
+        return await self._run_db(
+            self._save_conversation, user_id, user_input, assistant_response, metadata
+        )
+
+    def _save_conversation(
+        self,
+        user_id: int,
+        user_input: str,
+        assistant_response: str,
+        metadata: Optional[Dict] = None,
+    ) -> MCPToolResult:
+        """保存对话记录（在线程池中执行）."""
         try:
             if not DATABASE_AVAILABLE:
                 return MCPToolResult(success=False, data=None, error="数据库不可用")
 
-            conversation = Conversation.create(
-                user_id=user_id,
-                user_input=user_input.strip(),
-                assistant_response=assistant_response,
-                is_analyzed=False,
-            )
-
-            db.session.add(conversation)
-            db.session.commit()
+            metadata = metadata or {}
+            with unit_of_work() as session:
+                conversation = Conversation.create(
+                    commit=False,
+                    user_id=user_id,
+                    user_input=user_input.strip(),
+                    assistant_response=assistant_response,
+                    is_analyzed=False,
+                    emotion=metadata.get("emotion"),
+                    confidence=metadata.get("confidence"),
+                    response_source=metadata.get("response_source"),
+                )
+                record_conversations(session, [conversation])
 
             return MCPToolResult(
                 success=True,
@@ -81,7 +204,7 @@ class DatabaseMCPServer:
             )
 
     async def get_user_conversations(
-        self, user_id: int, limit: int = 10
+        self, user_id: int, limit: int = 10, cursor: Optional[str] = None
     ) -> MCPToolResult:
         """
         MCP工具：获取用户对话历史.
@@ -89,19 +212,27 @@ class DatabaseMCPServer:
         Args:
             user_id: 用户ID
             limit: 返回数量限制
+            cursor: 分页游标（上一页返回的next_cursor）
 
         Returns:
             MCPToolResult: 对话历史
         """
+        return await self._run_db(self._get_user_conversations, user_id, limit, cursor)
+
+    def _get_user_conversations(
+        self, user_id: int, limit: int = 10, cursor: Optional[str] = None
+    ) -> MCPToolResult:
+        """获取用户对话历史（在线程池中执行）."""
         try:
             if not DATABASE_AVAILABLE:
                 return MCPToolResult(success=False, data=None, error="数据库不可用")
 
-            conversations = (
-                Conversation.query.filter_by(user_id=user_id)
-                .order_by(Conversation.created_at.desc())
-                .limit(limit)
-                .all()
+            conversations, next_cursor = keyset_page(
+                Conversation.query.filter_by(user_id=user_id),
+                Conversation.created_at,
+                Conversation.id,
+                limit,
+                cursor,
             )
 
             conversation_list = []
@@ -113,6 +244,9 @@ class DatabaseMCPServer:
                         "assistant_response": conv.assistant_response,
                         "created_at": conv.created_at.isoformat(),
                         "is_analyzed": conv.is_analyzed,
+                        "emotion": conv.emotion,
+                        "confidence": conv.confidence,
+                        "response_source": conv.response_source,
                     }
                 )
 
@@ -121,10 +255,13 @@ class DatabaseMCPServer:
                 data={
                     "conversations": conversation_list,
                     "total": len(conversation_list),
+                    "next_cursor": next_cursor,
                     "user_id": user_id,
                 },
             )
 
+        except InvalidCursor as e:
+            return MCPToolResult(success=False, data=None, error=str(e))
         except SQLAlchemyError as e:
             return MCPToolResult(
                 success=False, data=None, error=f"获取对话历史失败: {str(e)}"
@@ -144,20 +281,37 @@ class DatabaseMCPServer:
         Returns:
             MCPToolResult: 保存结果
         """
+        return await self._run_db(
+            self._save_analysis, user_id, conversation_id, analysis_data
+        )
+
+    def _save_analysis(
+        self, user_id: int, conversation_id: int, analysis_data: Dict
+    ) -> MCPToolResult:
+        """保存分析结果并标记对话已分析（在线程池中执行，同一事务）."""
         try:
             if not DATABASE_AVAILABLE:
                 return MCPToolResult(success=False, data=None, error="数据库不可用")
 
-            analysis = Analysis.create(
-                user_id=user_id,
-                conversation_id=conversation_id,
-                core_issue=analysis_data.get("core_issue", "未知"),
-                emotion=analysis_data.get("emotion", "中性"),
-                simple_conclusion=analysis_data.get("conclusion", ""),
-            )
-
-            db.session.add(analysis)
-            db.session.commit()
+            with unit_of_work() as session:
+                analysis = Analysis.create(
+                    commit=False,
+                    user_id=user_id,
+                    conversation_id=conversation_id,
+                    core_issue=analysis_data.get("core_issue", "未知"),
+                    emotion=analysis_data.get("emotion", "中性"),
+                    simple_conclusion=analysis_data.get("conclusion", ""),
+                )
+                record_analyses(session, [analysis])
+                session.execute(
+                    update(Conversation)
+                    .where(
+                        Conversation.id == conversation_id,
+                        Conversation.user_id == user_id,
+                    )
+                    .values(is_analyzed=True)
+                    .execution_options(synchronize_session=False)
+                )
 
             return MCPToolResult(
                 success=True,
@@ -185,6 +339,10 @@ class DatabaseMCPServer:
         Returns:
             MCPToolResult: 用户信息
         """
+        return await self._run_db(self._get_user_info, user_id)
+
+    def _get_user_info(self, user_id: int) -> MCPToolResult:
+        """获取用户信息（在线程池中执行）."""
         try:
             if not DATABASE_AVAILABLE:
                 return MCPToolResult(success=False, data=None, error="数据库不可用")
@@ -227,6 +385,12 @@ class DatabaseMCPServer:
         Returns:
             MCPToolResult: 查询结果
         """
+        return await self._run_db(self._query_user_data, user_id, query_type, params)
+
+    def _query_user_data(
+        self, user_id: int, query_type: str, params: Optional[Dict] = None
+    ) -> MCPToolResult:
+        """通用用户数据查询（在线程池中执行）."""
         try:
             if not DATABASE_AVAILABLE:
                 return MCPToolResult(success=False, data=None, error="数据库不可用")
@@ -234,18 +398,19 @@ class DatabaseMCPServer:
             params = params or {}
 
             if query_type == "conversations":
-                return await self.get_user_conversations(
-                    user_id, params.get("limit", 10)
+                return self._get_user_conversations(
+                    user_id, params.get("limit", 10), params.get("cursor")
                 )
             elif query_type == "profile":
-                return await self.get_user_info(user_id)
+                return self._get_user_info(user_id)
             elif query_type == "analyses":
                 # 获取用户的分析历史
-                analyses = (
-                    Analysis.query.filter_by(user_id=user_id)
-                    .order_by(Analysis.analyzed_at.desc())
-                    .limit(params.get("limit", 10))
-                    .all()
+                analyses, next_cursor = keyset_page(
+                    Analysis.query.filter_by(user_id=user_id),
+                    Analysis.analyzed_at,
+                    Analysis.id,
+                    params.get("limit", 10),
+                    params.get("cursor"),
                 )
 
                 analysis_list = []
@@ -266,6 +431,7 @@ class DatabaseMCPServer:
                     data={
                         "analyses": analysis_list,
                         "total": len(analysis_list),
+                        "next_cursor": next_cursor,
                         "user_id": user_id,
                     },
                 )
@@ -274,6 +440,8 @@ class DatabaseMCPServer:
                     success=False, data=None, error=f"未支持的查询类型: {query_type}"
                 )
 
+        except InvalidCursor as e:
+            return MCPToolResult(success=False, data=None, error=str(e))
         except SQLAlchemyError as e:
             return MCPToolResult(
                 success=False, data=None, error=f"查询用户数据失败: {str(e)}"
@@ -294,7 +462,10 @@ class DatabaseMCPServer:
                     "user_id": {"type": "integer", "description": "用户ID"},
                     "user_input": {"type": "string", "description": "用户输入"},
                     "assistant_response": {"type": "string", "description": "助手回复"},
-                    "metadata": {"type": "object", "description": "可选的元数据"},
+                    "metadata": {
+                        "type": "object",
+                        "description": "可选的元数据（emotion、confidence、response_source）",
+                    },
                 },
             },
             {
@@ -303,6 +474,7 @@ class DatabaseMCPServer:
                 "parameters": {
                     "user_id": {"type": "integer", "description": "用户ID"},
                     "limit": {"type": "integer", "description": "返回数量限制"},
+                    "cursor": {"type": "string", "description": "分页游标"},
                 },
             },
             {
@@ -325,7 +497,10 @@ class DatabaseMCPServer:
                 "parameters": {
                     "user_id": {"type": "integer", "description": "用户ID"},
                     "query_type": {"type": "string", "description": "查询类型"},
-                    "params": {"type": "object", "description": "查询参数"},
+                    "params": {
+                        "type": "object",
+                        "description": "查询参数（limit、cursor）",
+                    },
                 },
             },
         ]
@@ -353,7 +528,9 @@ class DatabaseMCPServer:
                 )
             elif tool_name == "get_user_conversations":
                 return await self.get_user_conversations(
-                    parameters.get("user_id"), parameters.get("limit", 10)
+                    parameters.get("user_id"),
+                    parameters.get("limit", 10),
+                    parameters.get("cursor"),
                 )
             elif tool_name == "save_analysis":
                 return await self.save_analysis(
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""后台事件循环 (BackgroundLoop) - 在同步的Flask处理函数中执行MCP协程.
+
+每个进程只启动一个常驻的asyncio事件循环线程，同步代码通过
+``submit`` 提交协程并拿到 ``concurrent.futures.Future``，或通过 ``run``
+带超时地等待结果，不再为每个请求创建/检查事件循环。
+
+在gevent worker下，``threading`` 已被monkey patch，等待Future时只会让出
+当前greenlet，不会阻塞整个worker。
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """常驻后台线程中的asyncio事件循环."""
+
+    def __init__(self, name: str = "mcp-event-loop"):
+        """初始化（线程在第一次提交协程时才启动）."""
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """后台循环是否在运行."""
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """启动后台线程（已启动时直接返回现有循环）."""
+        with self._lock:
+            if self._loop is not None and self._thread.is_alive():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=run_loop, name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._thread = thread
+            return loop
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """把协程提交到后台循环，返回可等待的Future."""
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """提交协程并同步等待结果.
+
+        Raises:
+            concurrent.futures.TimeoutError: 超过timeout仍未完成（协程会被取消）
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止后台循环并等待线程退出."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+    def _reset_after_fork(self) -> None:
+        """fork后的子进程中没有后台线程，丢弃从父进程继承的状态."""
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+
+_background_loop = BackgroundLoop()
+
+atexit.register(_background_loop.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_background_loop._reset_after_fork)
+
+
+def get_background_loop() -> BackgroundLoop:
+    """获取进程内共享的后台事件循环."""
+    return _background_loop
@@ -5,7 +5,7 @@ from typing import Any, Dict, List, Optional
 
 # 重用现有服务
 try:
-    from psyas.services.knowledge_service import KnowledgeService
+    from psyas.services.knowledge_service import get_knowledge_service
 
     KNOWLEDGE_SERVICE_AVAILABLE = True
 except ImportError:
@@ -35,10 +35,10 @@ class PsychologyMCPServer:
         self.server_name = "psychology-tools"
         self.version = "1.0.0"
 
-        # 初始化现有服务
+        # 使用进程内共享的知识库服务，不再重复加载知识数据
         if KNOWLEDGE_SERVICE_AVAILABLE:
             try:
-                self.knowledge_service = KnowledgeService()
+                self.knowledge_service = get_knowledge_service()
                 print("✅ 心理学MCP服务器已加载KnowledgeService")
             except (ImportError, AttributeError, RuntimeError) as e:
                 self.knowledge_service = None
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 """MCP工具注册表 - 统一管理所有MCP工具."""
 import asyncio
+import concurrent.futures
+import threading
 from typing import Any, Dict, List, Optional
 
 from .database_server import DatabaseMCPServer
+from .loop_runner import get_background_loop
 from .psychology_server import MCPToolResult, PsychologyMCPServer
 
 
@@ -12,10 +15,17 @@ class MCPToolRegistry:
     MCP工具注册表.
 
     统一管理和调用所有MCP工具，为Agent提供一致的工具调用接口。
+    同步代码（Flask处理函数）通过 ``submit_tool`` / ``call_tool_sync`` /
+    ``call_multiple_tools_sync`` 把调用提交到进程内常驻的后台事件循环。
     """
 
+    # 同步调用的默认超时时间（秒）
+    default_timeout = 5.0
+
     def __init__(self):
         """初始化MCP工具注册表."""
+        self.background_loop = get_background_loop()
+
         # 初始化各个MCP服务器
         self.psychology_server = PsychologyMCPServer()
         self.database_server = DatabaseMCPServer()
@@ -37,6 +47,36 @@ class MCPToolRegistry:
 
         print("✅ MCP工具注册表已初始化")
 
+    def init_app(self, app) -> None:
+        """绑定Flask应用并按配置设置数据库工具线程池."""
+        self.database_server.app = app
+        self.configure_database_pool(
+            pool_size=app.config.get("MCP_DB_POOL_SIZE"),
+            queue_depth=app.config.get("MCP_DB_QUEUE_DEPTH"),
+        )
+
+    def configure_database_pool(
+        self, pool_size: Optional[int] = None, queue_depth: Optional[int] = None
+    ) -> None:
+        """
+        设置数据库工具线程池.
+
+        Args:
+            pool_size: 同时执行数据库工具的线程数
+            queue_depth: 允许同时提交（含执行中）的最大数据库工具调用数
+        """
+        self.database_server.configure_pool(pool_size, queue_depth)
+
+    @property
+    def database_pool_size(self) -> int:
+        """数据库工具线程池大小."""
+        return self.database_server.pool_size
+
+    @property
+    def database_queue_depth(self) -> int:
+        """数据库工具最大队列深度."""
+        return self.database_server.queue_depth
+
     async def call_tool(
         self, tool_name: str, parameters: Dict[str, Any]
     ) -> MCPToolResult:
@@ -113,6 +153,72 @@ class MCPToolRegistry:
             )
             return [error_result] * len(tool_calls)
 
+    def submit_tool(
+        self, tool_name: str, parameters: Dict[str, Any]
+    ) -> concurrent.futures.Future:
+        """
+        把工具调用提交到后台事件循环.
+
+        Args:
+            tool_name: 工具名称
+            parameters: 工具参数
+
+        Returns:
+            concurrent.futures.Future: 结果为MCPToolResult的Future
+        """
+        return self.background_loop.submit(self.call_tool(tool_name, parameters))
+
+    def call_tool_sync(
+        self,
+        tool_name: str,
+        parameters: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> MCPToolResult:
+        """
+        在同步上下文中调用MCP工具.
+
+        Args:
+            tool_name: 工具名称
+            parameters: 工具参数
+            timeout: 超时时间（秒），为None时使用default_timeout
+
+        Returns:
+            MCPToolResult: 工具调用结果，超时时返回失败结果
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return self.background_loop.run(
+                self.call_tool(tool_name, parameters), timeout=timeout
+            )
+        except concurrent.futures.TimeoutError:
+            return MCPToolResult(
+                success=False, data=None, error=f"工具调用超时: {tool_name}"
+            )
+
+    def call_multiple_tools_sync(
+        self, tool_calls: List[Dict[str, Any]], timeout: Optional[float] = None
+    ) -> List[MCPToolResult]:
+        """
+        在同步上下文中并行调用多个MCP工具.
+
+        Args:
+            tool_calls: 工具调用列表，每个元素包含tool_name和parameters
+            timeout: 整批调用的超时时间（秒），为None时使用default_timeout
+
+        Returns:
+            List[MCPToolResult]: 工具调用结果列表，超时时全部返回失败结果
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return self.background_loop.run(
+                self.call_multiple_tools(tool_calls), timeout=timeout
+            )
+        except concurrent.futures.TimeoutError:
+            error_result = MCPToolResult(
+                success=False, data=None, error="并发工具调用超时"
+            )
+            return [error_result] * len(tool_calls)
+
     def get_available_tools(self) -> Dict[str, List[Dict[str, Any]]]:
         """
         获取所有可用的MCP工具.
@@ -194,3 +300,17 @@ class MCPToolRegistry:
                 )
 
         return test_results
+
+
+_shared_registry: Optional[MCPToolRegistry] = None
+_shared_lock = threading.Lock()
+
+
+def get_tool_registry() -> MCPToolRegistry:
+    """获取进程内共享的MCP工具注册表."""
+    global _shared_registry
+    if _shared_registry is None:
+        with _shared_lock:
+            if _shared_registry is None:
+                _shared_registry = MCPToolRegistry()
+    return _shared_registry
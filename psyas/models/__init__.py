@@ -12,10 +12,15 @@ try:
 except ImportError:
     Conversation = None
 
+try:
+    from .emotion_timeline import DailyEmotionCount
+except ImportError:
+    DailyEmotionCount = None
+
 try:
     from .guide_question import GuideQuestion
 except ImportError:
     GuideQuestion = None
 
 # 只定义导出列表，避免未使用的导入
-__all__ = ["Analysis", "Conversation", "GuideQuestion"]
+__all__ = ["Analysis", "Conversation", "DailyEmotionCount", "GuideQuestion"]
@@ -11,6 +11,10 @@ class Analysis(PkModel):
     """对用户的基础分析结果."""
 
     __tablename__ = "user_analysis"
+    __table_args__ = (
+        # 分析历史：按用户取最近的分析结果
+        db.Index("ix_user_analysis_user_id_analyzed_at", "user_id", "analyzed_at"),
+    )
 
     # 1. 关联用户（每个分析结果属于某个用户）
     user_id = reference_col("users", nullable=False)
@@ -27,7 +31,7 @@ class Analysis(PkModel):
 
     # 4. 元数据
     analyzed_at = Column(
-        db.DateTime, nullable=False, default=dt.datetime.now(dt.timezone.utc)
+        db.DateTime, nullable=False, default=lambda: dt.datetime.now(dt.timezone.utc)
     )
 
     def __repr__(self):
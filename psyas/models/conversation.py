@@ -4,11 +4,25 @@ import datetime as dt
 
 from psyas.database import Column, PkModel, db, reference_col, relationship
 
+# 回填旧对话时使用的回复来源（原始来源和回复置信度已无法还原）
+BACKFILL_SOURCE = "backfill"
+
 
 class Conversation(PkModel):
     """用户与助手的单轮对话记录."""
 
     __tablename__ = "conversations"
+    __table_args__ = (
+        # 对话历史/Agent记忆/MCP工具：按用户取最近N条
+        db.Index("ix_conversations_user_id_created_at", "user_id", "created_at"),
+        # 分析服务：按用户取最新的未分析对话
+        db.Index(
+            "ix_conversations_user_id_is_analyzed_created_at",
+            "user_id",
+            "is_analyzed",
+            "created_at",
+        ),
+    )
     # 1. 关联用户（关键：每一条对话都属于某个用户）
     user_id = reference_col("users", nullable=False)
     user = relationship("User", backref="conversations")
@@ -23,6 +37,13 @@ class Conversation(PkModel):
     )
     is_analyzed = Column(db.Boolean, default=False)
 
+    # 4. Agent处理结果（与对话同时写入，记忆检索/分析直接读取，无需重新检测）
+    # confidence为回复来源给出的置信度；response_source为空表示旧数据尚未回填，
+    # 回填的旧数据记为BACKFILL_SOURCE，只补情绪，confidence保持为空
+    emotion = Column(db.String(50), nullable=True)
+    confidence = Column(db.Float, nullable=True)
+    response_source = Column(db.String(50), nullable=True)
+
     def __repr__(self):
         """返回对话对象的字符串表示."""
         return f"<Conversation(user={self.user.username},time={self.created_at})>"
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Emotion timeline models (每个用户每天的情绪/问题计数汇总)."""
+from psyas.database import Column, PkModel, db, reference_col
+
+
+class DailyEmotionCount(PkModel):
+    """用户某一天某个维度（情绪/核心问题）下某个标签的出现次数.
+
+    与分析结果、对话在同一事务中增量更新，趋势查询只需按天读取汇总行。
+    """
+
+    __tablename__ = "user_daily_emotions"
+    __table_args__ = (
+        # 同一用户、同一天、同一维度的同一标签只有一行（增量更新时按此去重）
+        db.UniqueConstraint(
+            "user_id", "day", "dimension", "label", name="uq_user_daily_emotions"
+        ),
+    )
+
+    # 1. 关联用户
+    user_id = reference_col("users", nullable=False)
+
+    # 2. 日期（UTC）和维度：emotion/core_issue 来自分析结果，turn_emotion 来自对话
+    day = Column(db.Date, nullable=False)
+    dimension = Column(db.String(20), nullable=False)
+    label = Column(db.String(200), nullable=False)
+
+    # 3. 当天出现次数
+    total = Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """返回汇总行的字符串表示."""
+        return (
+            f"<DailyEmotionCount(user={self.user_id}, day={self.day}, "
+            f"{self.dimension}={self.label}, total={self.total})>"
+        )
@@ -9,7 +9,7 @@ class GuideQuestion(PkModel):
     __tablename__ = "guide_questions"
 
     # 1. 问题分类（方便后续按场景匹配，比如“家庭关系”“情绪”“工作压力”）
-    scene = Column(db.String(50), nullable=False)
+    scene = Column(db.String(50), nullable=False, index=True)
 
     # 2. 问题模板（基础版用固定文本，后续可加变量替换，比如“你提到{issue}，能说说具体情况吗？”）
     question_text = Column(db.Text, nullable=False)
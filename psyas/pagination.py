@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Keyset (cursor) pagination helpers.
+
+列表按 ``(时间列, id)`` 倒序排列，游标记录上一页最后一条记录的这两个值，
+下一页只需在复合索引上从该位置继续向后读取，无论翻到多深，代价都与第一页相同。
+"""
+import base64
+import binascii
+import datetime as dt
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析."""
+
+
+def encode_cursor(timestamp: dt.datetime, record_id: int) -> str:
+    """把 ``(时间, id)`` 编码为不透明的游标字符串."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    raw = f"{timestamp.isoformat()}|{record_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[dt.datetime, int]:
+    """解析游标字符串，格式错误时抛出 InvalidCursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        timestamp, record_id = raw.rsplit("|", 1)
+        return dt.datetime.fromisoformat(timestamp), int(record_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise InvalidCursor(f"无效的分页游标: {cursor}") from exc
+
+
+def keyset_before(time_column, id_column, cursor: str):
+    """
+    返回"排在游标之后"（更早）的记录的过滤条件.
+
+    Args:
+        time_column: 排序用的时间列
+        id_column: 排序并打破时间相同情况的主键列
+        cursor: 上一页最后一条记录的游标
+
+    Raises:
+        InvalidCursor: 游标格式错误
+    """
+    timestamp, record_id = decode_cursor(cursor)
+    return or_(
+        time_column < timestamp,
+        and_(time_column == timestamp, id_column < record_id),
+    )
+
+
+def keyset_page(
+    query, time_column, id_column, limit: int, cursor: Optional[str] = None
+) -> Tuple[List, Optional[str]]:
+    """
+    按 ``(time_column, id_column)`` 倒序取一页记录.
+
+    Args:
+        query: 已按用户等条件过滤的查询
+        time_column: 排序用的时间列
+        id_column: 排序并打破时间相同情况的主键列
+        limit: 每页记录数
+        cursor: 上一页返回的游标，为None时从最新的记录开始
+
+    Returns:
+        Tuple[List, Optional[str]]: 本页记录和下一页游标（没有更多记录时为None）
+    """
+    if cursor:
+        query = query.filter(keyset_before(time_column, id_column, cursor))
+
+    rows = query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor(
+        getattr(last, time_column.key), getattr(last, id_column.key)
+    )
+    return rows, next_cursor
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""密码哈希 (PasswordHasher) - 在有界线程池中执行bcrypt.
+
+bcrypt的哈希和校验每次要花几十到几百毫秒CPU时间。在gevent worker中直接调用
+会阻塞整个worker，登录高峰时所有请求都要排队。这里把它们放到有界线程池中
+执行（bcrypt计算期间释放GIL）：
+
+- gevent已打补丁时使用gevent自己的线程池（真正的操作系统线程），
+  调用方只挂起当前greenlet；否则使用 ``ThreadPoolExecutor``。
+- 排队任务超过 ``BCRYPT_QUEUE_DEPTH`` 时抛出 ``PasswordHasherBusy``，
+  登录接口返回503，而不是让请求无限堆积。
+- 设置 ``BCRYPT_TARGET_MS`` 后，启动时实测单次哈希耗时，选择不超过目标耗时的
+  最大强度（log rounds）；否则使用 ``BCRYPT_LOG_ROUNDS``。
+- 登录成功时如果已存哈希的强度低于当前配置，用本次输入的密码重新哈希；
+  线程池繁忙或保存失败时跳过，登录不受影响，下次登录再试。
+  只升不降：未预加载时每个worker各自实测，选出的强度可能不同，
+  双向重新哈希会让同一用户的哈希随处理登录的worker来回改写。
+"""
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Union
+
+from psyas.extensions import bcrypt
+
+# gevent 可选：只有在已打补丁的进程中才使用gevent线程池
+try:
+    from gevent.monkey import is_module_patched
+    from gevent.threadpool import ThreadPool as GeventThreadPool
+
+    GEVENT_AVAILABLE = True
+except ImportError:
+    GEVENT_AVAILABLE = False
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_QUEUE_DEPTH = 64
+DEFAULT_ROUNDS = 12
+# 自动选择强度的范围（bcrypt允许4-31，低于10不适合生产环境）
+MIN_SELECTED_ROUNDS = 10
+MAX_SELECTED_ROUNDS = 16
+
+
+class PasswordHasherBusy(RuntimeError):
+    """排队的密码哈希任务超过上限."""
+
+
+def hash_rounds(pw_hash: Union[bytes, str, None]) -> Optional[int]:
+    """从bcrypt哈希（$2b$12$...）中读取强度，无法识别时返回None."""
+    if not pw_hash:
+        return None
+    if isinstance(pw_hash, bytes):
+        pw_hash = pw_hash.decode("ascii", errors="ignore")
+    parts = pw_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def select_rounds(
+    target_ms: float,
+    min_rounds: int = MIN_SELECTED_ROUNDS,
+    max_rounds: int = MAX_SELECTED_ROUNDS,
+    samples: int = 3,
+) -> int:
+    """
+    按目标耗时选择bcrypt强度.
+
+    在 ``min_rounds`` 下实测几次取最短耗时，强度每加1耗时翻倍，
+    返回预计耗时不超过 ``target_ms`` 的最大强度（至少为 ``min_rounds``）。
+
+    Args:
+        target_ms: 单次哈希的目标耗时（毫秒）
+        min_rounds: 最小强度
+        max_rounds: 最大强度
+        samples: 实测次数
+
+    Returns:
+        int: 选择的强度
+    """
+    elapsed = []
+    for _ in range(max(samples, 1)):
+        started = time.perf_counter()
+        bcrypt.generate_password_hash("rounds-calibration", min_rounds)
+        elapsed.append(time.perf_counter() - started)
+    base_ms = min(elapsed) * 1000
+
+    rounds = min_rounds
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    return rounds
+
+
+class PasswordHasher:
+    """在有界线程池中执行bcrypt哈希和校验."""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        queue_depth: int = DEFAULT_QUEUE_DEPTH,
+        rounds: int = DEFAULT_ROUNDS,
+    ):
+        """初始化密码哈希器.
+
+        Args:
+            pool_size: 执行bcrypt的线程数
+            queue_depth: 同时提交（执行中+排队）的最大任务数
+            rounds: 新哈希使用的强度
+        """
+        self.pool_size = pool_size
+        self.queue_depth = queue_depth
+        self.rounds = rounds
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._gevent_pool = None
+        self.rehashes = 0
+        self.rejected = 0
+
+    def init_app(self, app):
+        """从应用配置读取线程池大小和强度（设置了目标耗时则实测选择强度）."""
+        self.pool_size = max(app.config.get("BCRYPT_POOL_SIZE", DEFAULT_POOL_SIZE), 1)
+        self.queue_depth = max(
+            app.config.get("BCRYPT_QUEUE_DEPTH", DEFAULT_QUEUE_DEPTH), 1
+        )
+        target_ms = app.config.get("BCRYPT_TARGET_MS")
+        if target_ms:
+            rounds = select_rounds(target_ms)
+            app.config["BCRYPT_LOG_ROUNDS"] = rounds
+        else:
+            rounds = app.config.get("BCRYPT_LOG_ROUNDS", DEFAULT_ROUNDS)
+        self.rounds = rounds
+        self._reset_pool()
+
+    def hash(self, password: str) -> bytes:
+        """用当前强度哈希密码."""
+        return self._run(bcrypt.generate_password_hash, password, self.rounds)
+
+    def verify(self, pw_hash: Union[bytes, str], password: str) -> bool:
+        """校验密码."""
+        return self._run(bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash: Union[bytes, str]) -> bool:
+        """已存哈希的强度是否低于当前配置."""
+        rounds = hash_rounds(pw_hash)
+        return rounds is not None and rounds < self.rounds
+
+    def record_rehash(self) -> None:
+        """记录一次登录时的重新哈希."""
+        with self._lock:
+            self.rehashes += 1
+
+    def _run(self, func: Callable, *args):
+        """在线程池中执行并等待结果，排队任务过多时抛出PasswordHasherBusy."""
+        # 释放时使用获取的那个信号量：执行期间init_app可能已替换self._slots
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("密码校验繁忙，请稍后重试")
+        try:
+            if GEVENT_AVAILABLE and is_module_patched("threading"):
+                return self._gevent_threadpool().apply(func, args)
+            return self._thread_executor().submit(func, *args).result()
+        finally:
+            slots.release()
+
+    def _thread_executor(self) -> ThreadPoolExecutor:
+        """按需创建线程池."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size, thread_name_prefix="bcrypt"
+                )
+            return self._executor
+
+    def _gevent_threadpool(self):
+        """按需创建gevent线程池（必须在使用它的进程中创建）."""
+        if self._gevent_pool is None:
+            self._gevent_pool = GeventThreadPool(self.pool_size)
+        return self._gevent_pool
+
+    def _reset_pool(self) -> None:
+        """丢弃已有线程池，按当前配置重新创建."""
+        with self._lock:
+            old_executor, self._executor = self._executor, None
+            self._slots = threading.BoundedSemaphore(self.queue_depth)
+        self._gevent_pool = None
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    def _reset_after_fork(self) -> None:
+        """fork后子进程中线程池的线程不存在，重建锁和线程池."""
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        self._executor = None
+        self._gevent_pool = None
+
+
+# 进程内共享的密码哈希器，在 create_app 中通过 init_app 读取配置
+password_hasher = PasswordHasher()
+
+
+def _reset_hasher_after_fork(hasher_ref: "weakref.ref") -> None:
+    """fork后在子进程中重置密码哈希器."""
+    hasher = hasher_ref()
+    if hasher is not None:
+        hasher._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    _hasher_ref = weakref.ref(password_hasher)
+    os.register_at_fork(after_in_child=lambda: _reset_hasher_after_fork(_hasher_ref))
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""gunicorn预加载 (preload_app) 时的fork前后处理.
+
+开启预加载后应用在master进程中只创建一次，worker通过fork共享它的内存页
+（写时复制）。为了让共享页在worker中保持不被复制：
+
+- fork前在master中构建只读状态：知识库、关键词自动机、引导问题索引、
+  MCP工具注册表等，避免每个worker各自构建一份。
+- fork前关闭master的数据库连接池，并 ``gc.collect()`` + ``gc.freeze()``，
+  把已有对象移入永久代。之后worker的垃圾回收不再扫描（写入引用计数之外的
+  GC头）这些对象，共享页不会因为GC而被复制。
+- fork后在worker中 ``engine.dispose(close=False)``，丢弃从master继承的连接
+  （不关闭，以免影响其他进程），worker按需新建连接。事件循环、线程池和写入
+  队列由各自模块的 ``os.register_at_fork`` 钩子重置。
+
+``memory_usage`` 读取 ``/proc/<pid>/smaps_rollup``，用于比较预加载前后
+每个worker的常驻内存（RSS）和按比例分摊的内存（PSS）。
+"""
+import gc
+from typing import Dict, Optional, Union
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from psyas.database import db
+
+# smaps_rollup 中需要的字段（单位kB）
+MEMORY_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+_frozen = False
+
+
+def warm_shared_state(app) -> None:
+    """在当前进程中构建只读的共享状态（知识库、关键词索引、引导问题等）."""
+    from psyas.mcp.tool_registry import get_tool_registry
+    from psyas.services.conversation_service import get_conversation_service
+    from psyas.services.guide_question_index import guide_question_index
+    from psyas.services.knowledge_base import get_knowledge_base
+    from psyas.services.knowledge_service import get_knowledge_service
+
+    with app.app_context():
+        get_knowledge_base()
+        get_knowledge_service()
+        get_conversation_service()
+        get_tool_registry()
+        try:
+            guide_question_index.preload()
+        except SQLAlchemyError as e:
+            print(f"警告：预加载引导问题失败，worker将按需加载: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def prepare_for_fork(app) -> bool:
+    """
+    fork第一个worker前调用：构建共享状态、关闭连接池并冻结GC.
+
+    master进程中只执行一次（重启worker时不再重复）。
+
+    Args:
+        app: 已创建的Flask应用
+
+    Returns:
+        bool: 本次是否执行了准备工作
+    """
+    global _frozen
+    if _frozen:
+        return False
+
+    warm_shared_state(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    gc.collect()
+    gc.freeze()
+    _frozen = True
+    return True
+
+
+def after_fork(app) -> None:
+    """worker中fork后调用：丢弃从master继承的数据库连接."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def memory_usage(pid: Union[int, str] = "self") -> Optional[Dict[str, int]]:
+    """
+    读取进程的内存占用（kB）.
+
+    Args:
+        pid: 进程ID，默认当前进程
+
+    Returns:
+        Optional[Dict[str, int]]: rss/pss/shared_*/private_* 以及 uss
+        （private_clean + private_dirty）；系统不支持时返回None
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    usage = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        key = MEMORY_FIELDS.get(name)
+        if key is not None:
+            usage[key] = int(rest.split()[0])
+    usage["uss"] = usage.get("private_clean", 0) + usage.get("private_dirty", 0)
+    return usage
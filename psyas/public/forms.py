@@ -29,7 +29,7 @@ class LoginForm(FlaskForm):
             self.username.errors.append("Unknown username")
             return False
 
-        if not self.user.check_password(self.password.data):
+        if not self.user.verify_password(self.password.data):
             self.password.errors.append("Invalid password")
             return False
 
@@ -9,6 +9,7 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_login import current_user, login_user
 
 from psyas.extensions import login_manager
+from psyas.passwords import PasswordHasherBusy
 from psyas.public.forms import LoginForm
 from psyas.user.forms import RegisterForm
 from psyas.user.models import User
@@ -115,7 +116,11 @@ def logout():
 def api_login():
     """新：登录 API（返回 JSON）."""
     form = LoginForm(request.form)
-    if form.validate_on_submit():
+    try:
+        validated = form.validate_on_submit()
+    except PasswordHasherBusy as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 503
+    if validated:
         login_user(form.user)
         return jsonify(
             {
@@ -155,12 +160,15 @@ def api_register():
     """新：注册 API（返回 JSON）."""
     form = RegisterForm(request.form)
     if form.validate_on_submit():
-        User.create(
-            username=form.username.data,
-            email=form.email.data,
-            password=form.password.data,
-            active=True,
-        )
+        try:
+            User.create(
+                username=form.username.data,
+                email=form.email.data,
+                password=form.password.data,
+                active=True,
+            )
+        except PasswordHasherBusy as exc:
+            return jsonify({"status": "error", "message": str(exc)}), 503
         return jsonify(
             {"status": "success", "message": "Registered successfully. Please log in."}
         )
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 """分析结果相关的API路由."""
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import current_user, jwt_required
 
 from psyas.services.analysis_service import AnalysisService
-from psyas.user.models import User
+from psyas.services.emotion_timeline import DEFAULT_TREND_DAYS, get_trend
 
 # 创建分析蓝图
 analysis_bp = Blueprint("analysis", __name__, url_prefix="/api/analysis")
@@ -40,10 +40,7 @@ def analyze_conversation():
     """
     try:
         # 1. 从JWT获取用户ID
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user:
-            return jsonify({"code": 401, "message": "用户不存在"}), 401
+        current_user_id = current_user.id
 
         # 2. 获取请求数据
         data = request.get_json()
@@ -79,16 +76,15 @@ def get_analysis_results():
 
     URL参数:
     - limit: 返回数量限制 (查询参数，默认10)
+    - cursor: 分页游标 (查询参数，可选，取上一页返回的next_cursor)
     """
     try:
         # 1. 从JWT获取用户ID
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user:
-            return jsonify({"code": 401, "message": "用户不存在"}), 401
+        current_user_id = current_user.id
 
         # 2. 获取查询参数
         limit = request.args.get("limit", default=10, type=int)
+        cursor = request.args.get("cursor")
 
         # 3. 验证参数
         if limit <= 0 or limit > 100:
@@ -96,7 +92,7 @@ def get_analysis_results():
 
         # 4. 调用服务获取分析历史
         result = analysis_service.get_user_analysis_history(
-            user_id=current_user_id, limit=limit
+            user_id=current_user_id, limit=limit, cursor=cursor
         )
 
         # 5. 返回结果
@@ -136,10 +132,7 @@ def get_analysis_detail(analysis_id):
     """
     try:
         # 1. 从JWT获取用户ID
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user:
-            return jsonify({"code": 401, "message": "用户不存在"}), 401
+        current_user_id = current_user.id
 
         # 2. 调用服务获取分析详情
         result = analysis_service.get_analysis_by_id(
@@ -156,6 +149,93 @@ def get_analysis_detail(analysis_id):
         return jsonify({"code": 400, "message": f"参数错误: {str(exc)}"}), 400
 
 
+@analysis_bp.route("/window", methods=["GET"])
+@jwt_required()
+def get_window_analysis():
+    """
+    窗口分析接口 - 汇总最近N轮或最近T天对话的情绪和问题.
+
+    URL参数:
+    - turns: 最近多少轮对话 (可选)
+    - days: 最近多少天的对话 (可选，与turns同时给出时两个条件都要满足)
+
+    都不传时使用默认轮数（ANALYSIS_WINDOW_TURNS）。
+
+    返回格式:
+    {
+        "code": 200,
+        "message": "窗口分析完成",
+        "data": {
+            "turns": 20,
+            "first_conversation_id": 31,
+            "last_conversation_id": 50,
+            "emotion": "焦虑",
+            "core_issue": "工作压力",
+            "conclusion": "当前表现出一定程度的焦虑情绪，工作方面的压力需要合理管理和调节。",
+            "emotion_counts": {"焦虑": 6, "压力": 4},
+            "issue_counts": {"工作压力": 9, "家庭关系": 2}
+        }
+    }
+    """
+    try:
+        turns = request.args.get("turns", type=int)
+        days = request.args.get("days", type=int)
+
+        result = analysis_service.analyze_window(
+            user_id=current_user.id, turns=turns, days=days
+        )
+
+        if "error" in result:
+            return jsonify(result), result.get("code", 500)
+        else:
+            return jsonify(result), 200
+
+    except (ValueError, TypeError) as exc:
+        return jsonify({"code": 400, "message": f"参数错误: {str(exc)}"}), 400
+
+
+@analysis_bp.route("/trend", methods=["GET"])
+@jwt_required()
+def get_emotion_trend():
+    """
+    情绪趋势接口 - 按天读取情绪/核心问题计数汇总.
+
+    URL参数:
+    - days: 最近多少天 (默认30，最多366)
+    - dimension: emotion（分析情绪，默认）、core_issue（核心问题）
+      或 turn_emotion（对话时检测到的情绪）
+
+    返回格式:
+    {
+        "code": 200,
+        "message": "获取趋势成功",
+        "data": {
+            "dimension": "emotion",
+            "start": "2025-08-22",
+            "end": "2025-08-28",
+            "days": [
+                {"date": "2025-08-22", "counts": {}},
+                {"date": "2025-08-23", "counts": {"焦虑": 2, "快乐": 1}}
+            ],
+            "totals": {"焦虑": 2, "快乐": 1}
+        }
+    }
+    """
+    try:
+        days = request.args.get("days", default=DEFAULT_TREND_DAYS, type=int)
+        dimension = request.args.get("dimension", default="emotion")
+
+        result = get_trend(current_user.id, days=days, dimension=dimension)
+
+        if "error" in result:
+            return jsonify(result), result.get("code", 500)
+        else:
+            return jsonify(result), 200
+
+    except (ValueError, TypeError) as exc:
+        return jsonify({"code": 400, "message": f"参数错误: {str(exc)}"}), 400
+
+
 @analysis_bp.route("/summary", methods=["GET"])
 @jwt_required()
 def get_analysis_summary():
@@ -186,10 +266,7 @@ def get_analysis_summary():
     """
     try:
         # 1. 从JWT获取用户ID
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user:
-            return jsonify({"code": 401, "message": "用户不存在"}), 401
+        current_user_id = current_user.id
 
         # 2. 获取用户所有分析结果进行统计
         result = analysis_service.get_user_analysis_history(
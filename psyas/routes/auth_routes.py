@@ -7,6 +7,7 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
 
 from psyas.extensions import db  # noqa: F401
+from psyas.passwords import PasswordHasherBusy
 from psyas.user.models import User
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
@@ -25,7 +26,12 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"code": 400, "message": "邮箱已被注册"}), 400
     # 创建新用户
-    user = User.create(username=username, password=password, email=email, active=True)
+    try:
+        user = User.create(
+            username=username, password=password, email=email, active=True
+        )
+    except PasswordHasherBusy as exc:
+        return jsonify({"code": 503, "message": str(exc)}), 503
     return jsonify(
         {
             "code": 200,
@@ -54,7 +60,12 @@ def jwt_login():
 
     user = User.query.filter_by(username=username).first()
 
-    if user and user.check_password(password):
+    try:
+        verified = bool(user) and user.verify_password(password)
+    except PasswordHasherBusy as exc:
+        return jsonify({"code": 503, "message": str(exc)}), 503
+
+    if verified:
         tokens = user.generate_tokens()
         return jsonify(
             {
@@ -1,15 +1,23 @@
 # -*- coding: utf-8 -*-
 """聊天助手相关接口路由."""
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+import json
+from typing import Dict, Iterator, List, Optional
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import current_user, jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
-from psyas.models.analysis import Analysis
+from psyas.pagination import InvalidCursor, encode_cursor
 from psyas.services.analysis_service import AnalysisService
 from psyas.services.conversation_service import ConversationService
-from psyas.user.models import User
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/api/chat")
+analysis_service = AnalysisService()
+
+# get-analysis 单次请求最多返回的条数（不传limit时不限制）
+MAX_ANALYSIS_PAGE = 1000
+# 流式写出时每次合并写出的行数
+STREAM_CHUNK_ROWS = 100
 
 
 @chat_bp.route("/send-message", methods=["POST"])
@@ -22,10 +30,7 @@ def send_message():
     返回：{ "assistant_response": "能说说最近一次和家里人发生不愉快是因为什么事情吗？", "conversation_id": 123 }
     """
     # 1. 从 JWT 获取用户ID
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"code": 401, "msg": "用户不存在"}), 401
+    current_user_id = current_user.id
 
     # 2. 获取请求参数和校验
     data = request.get_json()
@@ -47,33 +52,120 @@ def send_message():
 @jwt_required()
 def get_analysis():
     """
-    获取用户的分析结果接口.
+    获取用户的分析结果接口（流式返回，内存占用与历史记录数无关）.
+
+    URL参数:
+    - limit: 最多返回的条数 (可选，1-1000，不传时返回全部)
+    - cursor: 分页游标 (可选，取上一次返回的next_cursor)
+    - format: json（默认，逐步写出与原来相同的JSON结构）或 ndjson（每行一条分析结果，
+      有下一页时最后一行为 {"next_cursor": "..."}）
+
+    返回：{ "code": 200, "msg": "获取分析成功",
+            "data": [{"analysis_id": 1, "core_issue": "家庭关系困扰", "emotion": "烦躁", ...}],
+            "next_cursor": null }
 
-    返回：{ "analyses": [{"core_issue": "家庭关系困扰", "emotion": "烦躁", ...}] }
+    响应头发出后状态码已无法修改，读取中途出错时客户端必须检查结尾：
+    json格式不再闭合数组和对象，在截断处之后另起一行写出 {"error": "..."}，
+    整个响应体无法解析为JSON；ndjson格式最后一行为 {"error": "..."}。
     """
     # 1. 从 JWT 获取用户ID
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"code": 401, "msg": "用户不存在"}), 401
-
-    # 2. 查询该用户的所有分析结果（按时间倒序，最新的在前）
-    analyses = (
-        Analysis.query.filter_by(user_id=current_user_id)
-        .order_by(Analysis.analyzed_at.desc())
-        .all()
+    current_user_id = current_user.id
+
+    # 2. 获取并校验查询参数
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    output_format = request.args.get("format", default="json")
+    if limit is not None and not 1 <= limit <= MAX_ANALYSIS_PAGE:
+        return (
+            jsonify({"code": 400, "msg": f"limit参数必须在1-{MAX_ANALYSIS_PAGE}之间"}),
+            400,
+        )
+    if output_format not in ("json", "ndjson"):
+        return jsonify({"code": 400, "msg": "format参数必须是json或ndjson"}), 400
+
+    # 3. 执行查询（出错时还能返回正常的错误响应），之后边读边写
+    try:
+        rows = analysis_service.iter_user_analyses(
+            current_user_id, limit=limit, cursor=cursor
+        )
+    except InvalidCursor as exc:
+        return jsonify({"code": 400, "msg": str(exc)}), 400
+    except SQLAlchemyError as exc:
+        return jsonify({"code": 500, "msg": f"数据库查询失败: {str(exc)}"}), 500
+
+    ndjson = output_format == "ndjson"
+    return Response(
+        stream_with_context(_stream_analyses(rows, limit, ndjson)),
+        mimetype="application/x-ndjson" if ndjson else "application/json",
+        headers={"X-Accel-Buffering": "no"},
     )
-    analyses_list = [
-        {
-            "analysis_id": analysis.id,
-            "core_issue": analysis.core_issue,
-            "emotion": analysis.emotion,
-            "simple_conclusion": analysis.simple_conclusion,
-            "analyzed_at": analysis.analyzed_at.strftime("%Y-%m-%d %H:%M:%S"),
-        }
-        for analysis in analyses
-    ]
-    return jsonify({"code": 200, "msg": "获取分析成功", "data": analyses_list}), 200
+
+
+def _analysis_record(row) -> Dict:
+    """把一行分析结果转为接口返回的字典."""
+    return {
+        "analysis_id": row.id,
+        "core_issue": row.core_issue,
+        "emotion": row.emotion,
+        "simple_conclusion": row.simple_conclusion,
+        "analyzed_at": row.analyzed_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def _stream_analyses(rows, limit: Optional[int], ndjson: bool) -> Iterator[str]:
+    """逐批写出分析结果，读完limit条后用下一行判断是否还有下一页."""
+    separator = "\n" if ndjson else ","
+    if not ndjson:
+        yield '{"code": 200, "msg": "获取分析成功", "data": ['
+
+    next_cursor = None
+    error = None
+    written = 0
+    chunk: List[str] = []
+    last = None
+    try:
+        for row in rows:
+            if limit is not None and written == limit:
+                next_cursor = encode_cursor(last.analyzed_at, last.id)
+                break
+            chunk.append(json.dumps(_analysis_record(row), ensure_ascii=False))
+            written += 1
+            last = row
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                yield _join_chunk(chunk, separator, written, ndjson)
+                chunk = []
+    except SQLAlchemyError as exc:
+        error = f"数据库查询失败: {str(exc)}"
+    finally:
+        rows.close()
+
+    if chunk:
+        yield _join_chunk(chunk, separator, written, ndjson)
+    yield _stream_trailer(next_cursor, error, ndjson)
+
+
+def _join_chunk(chunk: List[str], separator: str, written: int, ndjson: bool) -> str:
+    """拼接一批记录；JSON数组中除第一批外要先写逗号."""
+    text = separator.join(chunk)
+    if ndjson:
+        return text + "\n"
+    return text if written == len(chunk) else "," + text
+
+
+def _stream_trailer(next_cursor: Optional[str], error: Optional[str], ndjson: bool):
+    """写出结尾：下一页游标，或读取中途的错误（JSON格式此时不闭合）."""
+    tail = {}
+    if next_cursor is not None:
+        tail["next_cursor"] = next_cursor
+    if error is not None:
+        tail["error"] = error
+    if ndjson:
+        return json.dumps(tail, ensure_ascii=False) + "\n" if tail else ""
+    if error is not None:
+        # 不写 ]} ，已写出的部分不会被当作完整的成功结果解析
+        return "\n" + json.dumps(tail, ensure_ascii=False)
+    tail.setdefault("next_cursor", None)
+    return "], " + json.dumps(tail, ensure_ascii=False)[1:]
 
 
 @chat_bp.route("/create-analysis", methods=["POST"])
@@ -86,10 +178,7 @@ def create_analysis():
     返回：{ "analysis": {"core_issue": "家庭关系困扰", ...} }
     """
     # 1. 从 JWT 获取用户ID
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"code": 401, "msg": "用户不存在"}), 401
+    current_user_id = current_user.id
 
     data = request.get_json()
     conversation_id = data.get("conversation_id")
@@ -1,16 +1,19 @@
 # -*- coding: utf-8 -*-
 """对话相关的API路由."""
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+import json
 
-from psyas.services.conversation_service import ConversationService
-from psyas.user.models import User
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_jwt_extended import current_user, jwt_required
+
+from psyas.pagination import InvalidCursor
+from psyas.services.conversation_service import get_conversation_service
+from psyas.services.history_export import gzip_chunks, iter_history, ndjson_chunks
 
 # 创建对话蓝图
 conversation_bp = Blueprint("conversation", __name__, url_prefix="/api/conversation")
 
-# 初始化对话服务
-conversation_service = ConversationService()
+# 使用进程内共享的对话服务
+conversation_service = get_conversation_service()
 
 
 @conversation_bp.route("/chat", methods=["POST"])
@@ -38,10 +41,7 @@ def chat():
     """
     try:
         # 1. 从 JWT 获取用户ID
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user:
-            return jsonify({"code": 401, "message": "用户不存在"}), 401
+        current_user_id = current_user.id
 
         # 2. 获取请求数据
         data = request.get_json()
@@ -70,6 +70,62 @@ def chat():
         return jsonify({"code": 500, "message": f"服务不可用: {str(exc)}"}), 500
 
 
+@conversation_bp.route("/chat/stream", methods=["POST"])
+@jwt_required()
+def chat_stream():
+    """
+    流式对话接口 - 以Server-Sent Events逐步返回助手回复.
+
+    请求格式与 /chat 相同:
+    {
+        "message": "我最近感觉很焦虑"
+    }
+
+    响应为 text/event-stream，依次包含:
+        event: response
+        data: {"text": "我能感受到你的担心和不安..."}
+
+        event: follow_up
+        data: {"question": "什么事情让你感到最担心？"}
+
+        event: metadata
+        data: {"conversation_id": 1, "assistant_response": "...", "created_at": "...",
+               "agent_info": {...}}
+
+    即时回应生成后立即发送，对话在发送后才保存；处理失败时发送
+    event: error（data 中包含 error 和 code）。
+    """
+    try:
+        # 1. 从 JWT 获取用户ID
+        current_user_id = current_user.id
+
+        # 2. 获取并验证请求数据
+        data = request.get_json()
+        if not data:
+            return jsonify({"code": 400, "message": "请提供JSON数据"}), 400
+
+        message = data.get("message")
+        if not message or not message.strip():
+            return jsonify({"code": 400, "message": "消息内容不能为空"}), 400
+
+    except (ValueError, TypeError) as exc:
+        return jsonify({"code": 400, "message": f"参数格式错误: {str(exc)}"}), 400
+
+    # 3. 逐个事件写出，保持请求上下文直到流结束
+    events = conversation_service.stream_user_input(
+        user_id=current_user_id, user_input=message.strip()
+    )
+    body = (
+        f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        for event, payload in events
+    )
+    return Response(
+        stream_with_context(body),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @conversation_bp.route("/history", methods=["GET"])
 @jwt_required()
 def get_conversation_history():
@@ -78,6 +134,7 @@ def get_conversation_history():
 
     URL参数:
     - limit: 返回数量限制 (查询参数，默认10) // 不再需要user_id路径参数
+    - cursor: 分页游标 (查询参数，可选，取上一页返回的next_cursor)
 
     返回格式:
     {
@@ -93,19 +150,19 @@ def get_conversation_history():
                     "is_analyzed": true
                 }
             ],
-            "total": 1
+            "total": 1,
+            "next_cursor": "MjAyNS0wOC0yOFQxNjozNzowMHwx",
+            "has_more": true
         }
     }
     """
     try:
         # 1. 从 JWT 获取用户ID
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if not user:
-            return jsonify({"code": 401, "message": "用户不存在"}), 401
+        current_user_id = current_user.id
 
         # 2. 获取查询参数
         limit = request.args.get("limit", default=10, type=int)
+        cursor = request.args.get("cursor")
 
         # 3. 验证参数
         if limit <= 0 or limit > 100:
@@ -113,7 +170,7 @@ def get_conversation_history():
 
         # 4. 调用服务获取对话历史
         result = conversation_service.get_user_conversations(
-            user_id=current_user_id, limit=limit
+            user_id=current_user_id, limit=limit, cursor=cursor
         )
 
         # 4. 返回结果
@@ -126,6 +183,61 @@ def get_conversation_history():
         return jsonify({"code": 400, "message": f"参数错误: {str(exc)}"}), 400
 
 
+@conversation_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_history():
+    """
+    导出用户的全部对话和分析结果接口（流式NDJSON，内存占用与历史记录数无关）.
+
+    URL参数:
+    - format: ndjson（默认）或 ndjson.gz（gzip压缩）
+    - cursor: 续传游标 (可选，取上一次结尾行的next_cursor，或中断前收到的最后一行的cursor)
+    - limit: 本次最多导出的记录数 (可选，不传时导出全部)
+
+    返回为附件，每行一条记录，最后一行为结尾:
+        {"type": "conversation", "cursor": "Y29udmVyc2F0aW9ufDE", "data": {"id": 1, ...}}
+        {"type": "analysis", "cursor": "YW5hbHlzaXN8MQ", "data": {"id": 1, ...}}
+        {"type": "end", "complete": true, "exported": 2, "next_cursor": null}
+    """
+    # 1. 从 JWT 获取用户ID
+    current_user_id = current_user.id
+
+    # 2. 获取并校验查询参数
+    output_format = request.args.get("format", default="ndjson")
+    limit = request.args.get("limit", type=int)
+    if output_format not in ("ndjson", "ndjson.gz"):
+        return (
+            jsonify({"code": 400, "message": "format参数必须是ndjson或ndjson.gz"}),
+            400,
+        )
+    if limit is not None and limit <= 0:
+        return jsonify({"code": 400, "message": "limit参数必须大于0"}), 400
+
+    try:
+        records = iter_history(
+            current_user_id, cursor=request.args.get("cursor"), limit=limit
+        )
+    except InvalidCursor as exc:
+        return jsonify({"code": 400, "message": str(exc)}), 400
+
+    # 3. 边读边写（按需压缩），保持请求上下文直到流结束
+    body = ndjson_chunks(records)
+    mimetype = "application/x-ndjson"
+    if output_format == "ndjson.gz":
+        body = gzip_chunks(body)
+        mimetype = "application/gzip"
+    filename = f"psyas-history-{current_user_id}.{output_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @conversation_bp.route("/status", methods=["GET"])
 def conversation_status():
     """
@@ -156,6 +268,7 @@ def conversation_status():
                         "timestamp": datetime.now().isoformat(),
                         "endpoints": [
                             "/api/conversation/chat",
+                            "/api/conversation/chat/stream",
                             "/api/conversation/history",  # 更新路径
                             "/api/conversation/status",
                         ],
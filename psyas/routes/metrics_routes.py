@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""运行指标相关的API路由."""
+from flask import Blueprint, Response, jsonify
+from flask_jwt_extended import current_user, jwt_required
+
+from psyas.auth.identity import has_admin_rights
+from psyas.services.pipeline_metrics import agent_metrics
+
+# 创建指标蓝图（/metrics 供Prometheus抓取，JSON接口仅管理员可用）
+metrics_bp = Blueprint("metrics", __name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    Prometheus文本格式的Agent流程指标.
+
+    包含各阶段耗时直方图（psyas_agent_stage_duration_seconds）、
+    各回复分支次数（psyas_agent_response_source_total）和错误次数。
+    """
+    return Response(
+        agent_metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+@metrics_bp.route("/api/admin/metrics", methods=["GET"])
+@jwt_required()
+def admin_metrics():
+    """
+    管理员查看Agent流程各阶段耗时和命中分支.
+
+    需要令牌中和数据库中都是管理员（刚被授予管理员的用户需重新登录，
+    撤销不经过用户缓存，立即生效）。
+
+    返回格式:
+    {
+        "code": 200,
+        "message": "获取指标成功",
+        "data": {
+            "stages": {
+                "reason": {"count": 10, "mean_ms": 3.2, "p50_ms": 2.5, "p99_ms": 10.0, ...},
+                ...
+            },
+            "branches": {"mcp_enhanced": 7, "basic_enhanced": 3},
+            "errors": {}
+        }
+    }
+    """
+    if not has_admin_rights(current_user):
+        return jsonify({"code": 403, "message": "需要管理员权限"}), 403
+
+    return jsonify(
+        {"code": 200, "message": "获取指标成功", "data": agent_metrics.snapshot()}
+    )
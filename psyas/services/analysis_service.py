@@ -1,14 +1,32 @@
 # -*- coding: utf-8 -*-
 """分析服务 (AnalysisService) - 简单提取标签和结论."""
+import datetime as dt
+import os
+import time
 from collections import Counter
-from typing import Dict, Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+from sqlalchemy import insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
 
-from psyas.database import db
+from psyas.auth.identity import load_user
+from psyas.database import db, unit_of_work
 from psyas.models.analysis import Analysis
-from psyas.models.conversation import Conversation
-from psyas.user.models import User
+from psyas.models.conversation import BACKFILL_SOURCE, Conversation
+from psyas.pagination import keyset_before, keyset_page
+from psyas.services.analysis_window import (
+    MAX_WINDOW_DAYS,
+    MAX_WINDOW_TURNS,
+    analysis_windows,
+)
+from psyas.services.emotion_timeline import record_analyses
+from psyas.services.keyword_matrix import KeywordMatrix
+
+# 批量分析时每个事务处理的对话条数
+DEFAULT_BATCH_CHUNK_SIZE = 1000
+# 流式读取分析历史时每次从数据库取回的行数
+DEFAULT_STREAM_BATCH_SIZE = 500
 
 
 class AnalysisService:
@@ -45,6 +63,11 @@ class AnalysisService:
             "自我认知": ["自己", "自我", "性格", "能力", "自信", "自尊", "价值"],
         }
 
+        # 批量/窗口分析用的关键词关联矩阵（首次使用时构建）
+        self._emotion_matrix: Optional[KeywordMatrix] = None
+        self._issue_matrix: Optional[KeywordMatrix] = None
+        self._windows = analysis_windows
+
     def analyze_user_conversations(
         self, user_id: int, conversation_id: Optional[int] = None
     ) -> Dict:
@@ -60,7 +83,7 @@ class AnalysisService:
         """
         try:
             # 1. 验证用户存在
-            user = User.query.get(user_id)
+            user = load_user(user_id)
             if not user:
                 return {"error": "用户不存在", "code": 404}
 
@@ -84,20 +107,18 @@ class AnalysisService:
             # 3. 进行分析
             analysis_result = self._perform_analysis(conversation)
 
-            # 4. 保存分析结果
-            analysis = Analysis.create(
-                user_id=user_id,
-                conversation_id=conversation.id,
-                core_issue=analysis_result["core_issue"],
-                emotion=analysis_result["emotion"],
-                simple_conclusion=analysis_result["conclusion"],
-            )
-            db.session.add(analysis)
-
-            # 标记对话已分析
-            conversation.is_analyzed = True
-
-            db.session.commit()
+            # 4. 保存分析结果并标记对话已分析（同一事务）
+            with unit_of_work() as session:
+                analysis = Analysis.create(
+                    commit=False,
+                    user_id=user_id,
+                    conversation_id=conversation.id,
+                    core_issue=analysis_result["core_issue"],
+                    emotion=analysis_result["emotion"],
+                    simple_conclusion=analysis_result["conclusion"],
+                )
+                conversation.is_analyzed = True
+                record_analyses(session, [analysis])
 
             return {
                 "code": 200,
@@ -118,23 +139,177 @@ class AnalysisService:
         except (ValueError, TypeError) as exc:
             return {"error": f"参数错误: {str(exc)}", "code": 400}
 
-    def get_user_analysis_history(self, user_id: int, limit: int = 10) -> Dict:
+    def analyze_unanalyzed_conversations(
+        self,
+        chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+        workers: Optional[int] = None,
+        limit: Optional[int] = None,
+        progress: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """
+        批量分析所有未分析的对话.
+
+        按主键顺序分块读取未分析的对话，在进程池中执行分析，
+        每块的分析结果批量写入并在同一事务中标记对话已分析。
+        下一块的分析与上一块的写入重叠进行。
+
+        Args:
+            chunk_size: 每个事务处理的对话条数
+            workers: 进程数，None为CPU核数，0或1时在当前进程中分析
+            limit: 最多分析的对话条数，None表示全部
+            progress: 每提交一块后调用，参数为当前统计
+
+        Returns:
+            Dict: 分析条数、块数、耗时和吞吐量
+        """
+        if chunk_size <= 0:
+            return {"error": "参数错误: chunk_size必须大于0", "code": 400}
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        stats = {
+            "analyzed": 0,
+            "chunks": 0,
+            "workers": max(workers, 1),
+            "elapsed_seconds": 0.0,
+            "rows_per_second": 0.0,
+        }
+        started = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        try:
+            pending = None
+            for rows in self._iter_unanalyzed_chunks(chunk_size, limit):
+                futures = self._submit_analysis(pool, rows, stats["workers"])
+                if pending is not None:
+                    self._save_analysis_chunk(*pending, stats, started, progress)
+                pending = (rows, futures)
+            if pending is not None:
+                self._save_analysis_chunk(*pending, stats, started, progress)
+
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            return {
+                "error": f"数据库操作失败: {str(exc)}",
+                "code": 500,
+                "data": stats,
+            }
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        return {"code": 200, "message": "批量分析完成", "data": stats}
+
+    def _iter_unanalyzed_chunks(
+        self, chunk_size: int, limit: Optional[int] = None
+    ) -> Iterator[List]:
+        """按主键顺序分块读取未分析的对话（只取分析需要的列）."""
+        last_id = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            rows = db.session.execute(
+                select(
+                    Conversation.id,
+                    Conversation.user_id,
+                    Conversation.user_input,
+                    Conversation.emotion,
+                    Conversation.response_source,
+                )
+                .where(Conversation.is_analyzed.is_(False), Conversation.id > last_id)
+                .order_by(Conversation.id)
+                .limit(size)
+            ).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def _submit_analysis(self, pool, rows: List, workers: int) -> List[Future]:
+        """把一块对话按进程数分片交给进程池分析，返回各分片结果的Future."""
+        texts = [
+            (row.user_input, _stored_emotion(row.emotion, row.response_source))
+            for row in rows
+        ]
+        if pool is None:
+            future = Future()
+            future.set_result(_analyze_batch(self, texts))
+            return [future]
+
+        step = -(-len(texts) // workers)
+        return [
+            pool.submit(_analyze_texts, texts[start:end])
+            for start, end in ((i, i + step) for i in range(0, len(texts), step))
+        ]
+
+    def _save_analysis_chunk(
+        self,
+        rows: List,
+        futures: List[Future],
+        stats: Dict,
+        started: float,
+        progress: Optional[Callable[[Dict], None]] = None,
+    ) -> None:
+        """在一个事务中批量写入一块分析结果、标记对话已分析并更新情绪时间线."""
+        results = [result for future in futures for result in future.result()]
+        analyzed_at = dt.datetime.now(dt.timezone.utc)
+        analyses = [
+            {
+                "user_id": row.user_id,
+                "conversation_id": row.id,
+                "core_issue": result["core_issue"],
+                "emotion": result["emotion"],
+                "simple_conclusion": result["conclusion"],
+                "analyzed_at": analyzed_at,
+            }
+            for row, result in zip(rows, results)
+        ]
+        with unit_of_work() as session:
+            session.execute(insert(Analysis), analyses)
+            record_analyses(session, analyses)
+            session.execute(
+                update(Conversation)
+                .where(Conversation.id.in_([row.id for row in rows]))
+                .values(is_analyzed=True)
+                .execution_options(synchronize_session=False)
+            )
+
+        elapsed = time.perf_counter() - started
+        stats["analyzed"] += len(rows)
+        stats["chunks"] += 1
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["rows_per_second"] = (
+            round(stats["analyzed"] / elapsed, 1) if elapsed else 0.0
+        )
+        if progress is not None:
+            progress(dict(stats))
+
+    def get_user_analysis_history(
+        self, user_id: int, limit: int = 10, cursor: Optional[str] = None
+    ) -> Dict:
         """
         获取用户的分析历史记录.
 
         Args:
             user_id: 用户ID
             limit: 返回的记录数量限制
+            cursor: 上一页返回的next_cursor，为None时从最新的记录开始
 
         Returns:
-            Dict: 分析历史数据
+            Dict: 分析历史数据，next_cursor用于获取下一页
+
+        Raises:
+            InvalidCursor: 游标格式错误
         """
         try:
-            analyses = (
-                Analysis.query.filter_by(user_id=user_id)
-                .order_by(Analysis.analyzed_at.desc())
-                .limit(limit)
-                .all()
+            analyses, next_cursor = keyset_page(
+                Analysis.query.filter_by(user_id=user_id),
+                Analysis.analyzed_at,
+                Analysis.id,
+                limit,
+                cursor,
             )
 
             analysis_list = []
@@ -153,12 +328,60 @@ class AnalysisService:
             return {
                 "code": 200,
                 "message": "获取分析历史成功",
-                "data": {"analyses": analysis_list, "total": len(analysis_list)},
+                "data": {
+                    "analyses": analysis_list,
+                    "total": len(analysis_list),
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None,
+                },
             }
 
         except SQLAlchemyError as exc:
             return {"error": f"数据库查询失败: {str(exc)}", "code": 500}
 
+    def iter_user_analyses(
+        self,
+        user_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+    ):
+        """
+        按 ``(analyzed_at, id)`` 倒序流式读取用户的分析结果.
+
+        使用 ``yield_per`` 分批取回（MySQL等驱动使用服务端游标），
+        只读取需要的列，不创建ORM对象，内存占用与历史记录总数无关。
+
+        Args:
+            user_id: 用户ID
+            limit: 最多返回的条数，None表示全部；给出时会多取一行用于判断是否还有下一页
+            cursor: 上一页返回的游标，为None时从最新的记录开始
+            batch_size: 每批取回的行数
+
+        Returns:
+            可迭代的结果（行包含 id/core_issue/emotion/simple_conclusion/analyzed_at），
+            调用方读完或放弃时应调用 ``close()``
+
+        Raises:
+            InvalidCursor: 游标格式错误
+            SQLAlchemyError: 查询失败
+        """
+        query = select(
+            Analysis.id,
+            Analysis.core_issue,
+            Analysis.emotion,
+            Analysis.simple_conclusion,
+            Analysis.analyzed_at,
+        ).where(Analysis.user_id == user_id)
+        if cursor:
+            query = query.where(
+                keyset_before(Analysis.analyzed_at, Analysis.id, cursor)
+            )
+        query = query.order_by(Analysis.analyzed_at.desc(), Analysis.id.desc())
+        if limit is not None:
+            query = query.limit(limit + 1)
+        return db.session.execute(query.execution_options(yield_per=batch_size))
+
     def get_analysis_by_id(self, user_id: int, analysis_id: int) -> Dict:
         """
         根据ID获取特定的分析结果.
@@ -204,10 +427,24 @@ class AnalysisService:
         Returns:
             Dict: 分析结果
         """
-        user_input = conversation.user_input
+        return self._analyze_text(
+            conversation.user_input,
+            _stored_emotion(conversation.emotion, conversation.response_source),
+        )
+
+    def _analyze_text(self, user_input: str, emotion: Optional[str] = None) -> Dict:
+        """
+        对单条用户输入进行分析（不访问数据库，可在子进程中执行）.
+
+        Args:
+            user_input: 用户输入文本
+            emotion: 对话时已检测并保存的情绪，为None时重新分析
 
-        # 1. 情绪分析
-        detected_emotion = self._analyze_emotion(user_input)
+        Returns:
+            Dict: 分析结果
+        """
+        # 1. 情绪分析（优先使用对话保存的情绪）
+        detected_emotion = emotion or self._analyze_emotion(user_input)
 
         # 2. 核心问题识别
         core_issue = self._identify_core_issue(user_input)
@@ -221,6 +458,112 @@ class AnalysisService:
             "conclusion": conclusion,
         }
 
+    def analyze_many(
+        self, texts: List[str], emotions: Optional[List[Optional[str]]] = None
+    ) -> List[Dict]:
+        """
+        批量分析多条用户输入（不访问数据库，结果与逐条 ``_analyze_text`` 一致）.
+
+        整批文本只构建一次关键词命中矩阵，与关键词×类别关联矩阵相乘
+        得到每条文本的情绪和问题计数（有NumPy时向量化计算）。
+
+        Args:
+            texts: 用户输入文本列表
+            emotions: 与texts对应的已保存情绪，为None或元素为空时重新分析
+
+        Returns:
+            List[Dict]: 与texts一一对应的分析结果
+        """
+        emotion_matrix, issue_matrix = self._keyword_matrices()
+        lowered = [text.lower() for text in texts]
+        detected_emotions = emotion_matrix.best(lowered)
+        issues = issue_matrix.best(lowered)
+        if emotions is None:
+            emotions = [None] * len(texts)
+
+        results = []
+        conclusions: Dict[Tuple[str, str, bool], str] = {}
+        for text, saved, detected, issue in zip(
+            texts, emotions, detected_emotions, issues
+        ):
+            emotion = saved or detected or "中性"
+            core_issue = issue or self._fallback_issue(text)
+            # 结论只取决于情绪、问题和文本是否超过50字
+            key = (emotion, core_issue, len(text) > 50)
+            conclusion = conclusions.get(key)
+            if conclusion is None:
+                conclusion = self._generate_conclusion(emotion, core_issue, text)
+                conclusions[key] = conclusion
+            results.append(
+                {"emotion": emotion, "core_issue": core_issue, "conclusion": conclusion}
+            )
+        return results
+
+    def analyze_window(
+        self, user_id: int, turns: Optional[int] = None, days: Optional[int] = None
+    ) -> Dict:
+        """
+        窗口分析：汇总用户最近N轮或最近T天对话的关键词命中（不保存结果）.
+
+        每个窗口的计数在进程内滚动维护，再次调用时只扫描新增的对话。
+
+        Args:
+            user_id: 用户ID
+            turns: 最近多少轮对话
+            days: 最近多少天的对话（与turns同时给出时两个条件都要满足），
+                都为None时使用 ``ANALYSIS_WINDOW_TURNS``
+
+        Returns:
+            Dict: 窗口内的主要情绪、核心问题、结论和各类别命中数
+        """
+        if turns is not None and not 1 <= turns <= MAX_WINDOW_TURNS:
+            return {
+                "error": f"参数错误: turns必须在1-{MAX_WINDOW_TURNS}之间",
+                "code": 400,
+            }
+        if days is not None and not 1 <= days <= MAX_WINDOW_DAYS:
+            return {
+                "error": f"参数错误: days必须在1-{MAX_WINDOW_DAYS}之间",
+                "code": 400,
+            }
+
+        try:
+            user = load_user(user_id)
+            if not user:
+                return {"error": "用户不存在", "code": 404}
+            emotion_matrix, issue_matrix = self._keyword_matrices()
+            window = self._windows.counts(
+                user_id, emotion_matrix, issue_matrix, turns, days
+            )
+        except SQLAlchemyError as exc:
+            return {"error": f"数据库查询失败: {str(exc)}", "code": 500}
+
+        emotion_counts = _nonzero(emotion_matrix.categories, window["emotion_counts"])
+        issue_counts = _nonzero(issue_matrix.categories, window["issue_counts"])
+        emotion = _top_category(emotion_counts) or "中性"
+        core_issue = _top_category(issue_counts) or "日常分享"
+        return {
+            "code": 200,
+            "message": "窗口分析完成",
+            "data": {
+                "turns": window["turns"],
+                "first_conversation_id": window["first_id"],
+                "last_conversation_id": window["last_id"],
+                "emotion": emotion,
+                "core_issue": core_issue,
+                "conclusion": self._generate_conclusion(emotion, core_issue, ""),
+                "emotion_counts": emotion_counts,
+                "issue_counts": issue_counts,
+            },
+        }
+
+    def _keyword_matrices(self) -> Tuple[KeywordMatrix, KeywordMatrix]:
+        """按需构建情绪和问题关键词矩阵."""
+        if self._emotion_matrix is None or self._issue_matrix is None:
+            self._emotion_matrix = KeywordMatrix(self.emotion_keywords)
+            self._issue_matrix = KeywordMatrix(self.issue_keywords)
+        return self._emotion_matrix, self._issue_matrix
+
     def _analyze_emotion(self, text: str) -> str:
         """
         分析文本中的主要情绪.
@@ -265,13 +608,17 @@ class AnalysisService:
         if issue_counts:
             return issue_counts.most_common(1)[0][0]
         else:
-            # 基于文本长度和内容特征的简单推断
-            if len(text) > 100:
-                return "复杂情况"
-            elif any(word in text_lower for word in ["怎么办", "不知道", "困惑"]):
-                return "决策困难"
-            else:
-                return "日常分享"
+            return self._fallback_issue(text)
+
+    def _fallback_issue(self, text: str) -> str:
+        """没有命中问题关键词时，基于文本长度和内容特征的简单推断."""
+        text_lower = text.lower()
+        if len(text) > 100:
+            return "复杂情况"
+        elif any(word in text_lower for word in ["怎么办", "不知道", "困惑"]):
+            return "决策困难"
+        else:
+            return "日常分享"
 
     def _generate_conclusion(self, emotion: str, core_issue: str, text: str) -> str:
         """
@@ -324,3 +671,49 @@ class AnalysisService:
             return "这是一次很好的自我表达，继续保持开放的沟通"
 
         return "，".join(conclusion_parts) + "。"
+
+
+def _nonzero(categories: List[str], counts: List[int]) -> Dict[str, int]:
+    """按类别顺序返回命中数大于0的类别."""
+    return {category: count for category, count in zip(categories, counts) if count > 0}
+
+
+def _top_category(counts: Dict[str, int]) -> Optional[str]:
+    """返回命中数最多的类别，并列时取靠前的一个."""
+    if not counts:
+        return None
+    return max(counts, key=counts.get)
+
+
+# 进程池中每个子进程复用的分析服务实例
+_worker_service: Optional[AnalysisService] = None
+
+
+def _stored_emotion(emotion: Optional[str], response_source: Optional[str]):
+    """
+    返回分析可以直接使用的已保存情绪.
+
+    回填的情绪来自对话服务的关键词检测，与分析服务自己的检测结果不一定相同；
+    这些旧对话仍按回填前的方式重新分析，回填不改变它们的分析结果。
+    """
+    if response_source == BACKFILL_SOURCE:
+        return None
+    return emotion
+
+
+def _analyze_texts(texts: List[Tuple[str, Optional[str]]]) -> List[Dict]:
+    """在子进程中分析一批 ``(用户输入, 已保存的情绪)``."""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = AnalysisService()
+    return _analyze_batch(_worker_service, texts)
+
+
+def _analyze_batch(
+    service: AnalysisService, texts: List[Tuple[str, Optional[str]]]
+) -> List[Dict]:
+    """用 ``analyze_many`` 分析一批 ``(用户输入, 已保存的情绪)``."""
+    if not texts:
+        return []
+    user_inputs, emotions = zip(*texts)
+    return service.analyze_many(list(user_inputs), list(emotions))
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""窗口分析 (AnalysisWindow) - 按用户最近N轮或最近T天的对话滚动统计关键词.
+
+每个窗口保存窗口内每轮对话命中的 ``(类别编号, 命中个数)`` 和累计计数。
+读取时只查询上次之后新增的对话（``id > last_id``），新对话加入时按它命中的
+关键词累加，移出窗口的对话（超过N轮或早于T天）按同样的记录扣减，
+不需要重新读取和扫描整个窗口。
+
+窗口保存在进程内的LRU缓存中（``ANALYSIS_WINDOW_CACHE_SIZE`` 个），
+``ANALYSIS_WINDOW_TTL`` 秒后整体重建一次，以纠正并发写入时可能漏读的对话。
+"""
+import datetime as dt
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from psyas.database import db
+from psyas.models.conversation import Conversation
+from psyas.services.keyword_matrix import KeywordMatrix
+from psyas.services.memory_cache import MemoryCache
+
+DEFAULT_WINDOW_TURNS = 20
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_TTL = 600
+MAX_WINDOW_TURNS = 500
+MAX_WINDOW_DAYS = 365
+
+# 一轮对话命中的 (类别编号, 关键词个数)
+Hits = Tuple[Tuple[int, int], ...]
+
+
+class AnalysisWindow:
+    """一个用户最近N轮/T天对话的滚动关键词计数."""
+
+    def __init__(
+        self,
+        emotion_size: int,
+        issue_size: int,
+        turns: Optional[int] = None,
+        days: Optional[int] = None,
+    ):
+        """初始化空窗口.
+
+        Args:
+            emotion_size: 情绪类别数
+            issue_size: 问题类别数
+            turns: 最多保留的对话轮数，None表示不按轮数限制
+            days: 只保留最近多少天的对话，None表示不按时间限制
+        """
+        self.max_turns = turns
+        self.days = days
+        self.emotion_counts = [0] * emotion_size
+        self.issue_counts = [0] * issue_size
+        # (对话ID, 创建时间, 情绪命中, 问题命中)，按ID递增
+        self.turns: deque = deque()
+        self.last_id = 0
+
+    def push(
+        self, conversation_id: int, created_at, emotion_hits: Hits, issue_hits: Hits
+    ) -> None:
+        """加入一轮新对话，超过轮数上限时移出最早的对话."""
+        if conversation_id <= self.last_id:
+            return
+        self.turns.append((conversation_id, created_at, emotion_hits, issue_hits))
+        self.last_id = conversation_id
+        _apply(self.emotion_counts, emotion_hits, 1)
+        _apply(self.issue_counts, issue_hits, 1)
+        if self.max_turns is not None:
+            while len(self.turns) > self.max_turns:
+                self._pop()
+
+    def expire(self, now: dt.datetime) -> None:
+        """移出早于T天的对话."""
+        if self.days is None:
+            return
+        cutoff = now - dt.timedelta(days=self.days)
+        while self.turns and self.turns[0][1] < cutoff:
+            self._pop()
+
+    def cutoff(self, now: dt.datetime) -> Optional[dt.datetime]:
+        """返回窗口的最早时间，不按时间限制时为None."""
+        if self.days is None:
+            return None
+        return now - dt.timedelta(days=self.days)
+
+    def _pop(self) -> None:
+        """移出最早的一轮对话并扣减计数."""
+        _, _, emotion_hits, issue_hits = self.turns.popleft()
+        _apply(self.emotion_counts, emotion_hits, -1)
+        _apply(self.issue_counts, issue_hits, -1)
+
+
+def _apply(counts: List[int], hits: Hits, sign: int) -> None:
+    """把一轮对话的命中加到（或从）累计计数上."""
+    for column, count in hits:
+        counts[column] += sign * count
+
+
+def _sparse(row) -> Hits:
+    """把一行类别计数转为只含非零项的元组."""
+    return tuple((column, int(count)) for column, count in enumerate(row) if count)
+
+
+class AnalysisWindows:
+    """按 (用户, 轮数, 天数) 缓存滚动窗口."""
+
+    def __init__(
+        self,
+        default_turns: int = DEFAULT_WINDOW_TURNS,
+        max_entries: int = DEFAULT_CACHE_SIZE,
+        ttl: int = DEFAULT_TTL,
+    ):
+        """初始化窗口缓存.
+
+        Args:
+            default_turns: 未指定轮数和天数时的窗口轮数
+            max_entries: 最多缓存的窗口数
+            ttl: 窗口整体重建的间隔（秒）
+        """
+        self.default_turns = default_turns
+        self._cache = MemoryCache(
+            max_entries=max_entries, ttl=ttl, key_prefix="analysis_window:"
+        )
+        self._lock = threading.Lock()
+        self.scanned_turns = 0
+
+    def init_app(self, app):
+        """从应用配置读取窗口参数."""
+        self.default_turns = app.config.get(
+            "ANALYSIS_WINDOW_TURNS", DEFAULT_WINDOW_TURNS
+        )
+        self._cache.max_entries = app.config.get(
+            "ANALYSIS_WINDOW_CACHE_SIZE", DEFAULT_CACHE_SIZE
+        )
+        self._cache.ttl = app.config.get("ANALYSIS_WINDOW_TTL", DEFAULT_TTL)
+        self._cache.clear()
+
+    def counts(
+        self,
+        user_id: int,
+        emotion_matrix: KeywordMatrix,
+        issue_matrix: KeywordMatrix,
+        turns: Optional[int] = None,
+        days: Optional[int] = None,
+    ) -> Dict:
+        """
+        返回用户窗口内各情绪/问题类别的关键词命中数.
+
+        Args:
+            user_id: 用户ID
+            emotion_matrix: 情绪关键词矩阵
+            issue_matrix: 问题关键词矩阵
+            turns: 最近多少轮，与days都为None时使用默认轮数
+            days: 最近多少天
+
+        Returns:
+            Dict: emotion_counts、issue_counts（按类别顺序的列表）、
+            turns（窗口内对话数）、first_id/last_id
+        """
+        if turns is None and days is None:
+            turns = self.default_turns
+        key = (user_id, turns, days)
+        window = self._cache.get(key)
+        if window is None:
+            window = AnalysisWindow(
+                len(emotion_matrix.categories),
+                len(issue_matrix.categories),
+                turns,
+                days,
+            )
+            self._cache.set(key, window)
+
+        now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+        rows = self._new_turns(user_id, window, now)
+        texts = [row.user_input.lower() for row in rows]
+        emotion_rows = emotion_matrix.counts(texts)
+        issue_rows = issue_matrix.counts(texts)
+
+        with self._lock:
+            for row, emotion_row, issue_row in zip(rows, emotion_rows, issue_rows):
+                window.push(
+                    row.id, row.created_at, _sparse(emotion_row), _sparse(issue_row)
+                )
+            window.expire(now)
+            self.scanned_turns += len(rows)
+            return {
+                "emotion_counts": list(window.emotion_counts),
+                "issue_counts": list(window.issue_counts),
+                "turns": len(window.turns),
+                "first_id": window.turns[0][0] if window.turns else None,
+                "last_id": window.turns[-1][0] if window.turns else None,
+            }
+
+    def clear(self) -> None:
+        """丢弃全部窗口."""
+        self._cache.clear()
+
+    def _new_turns(
+        self, user_id: int, window: AnalysisWindow, now: dt.datetime
+    ) -> Sequence:
+        """读取窗口上次更新之后的新对话（最多取窗口轮数条，按ID递增）."""
+        query = select(
+            Conversation.id, Conversation.user_input, Conversation.created_at
+        ).where(Conversation.user_id == user_id, Conversation.id > window.last_id)
+        cutoff = window.cutoff(now)
+        if cutoff is not None:
+            query = query.where(Conversation.created_at >= cutoff)
+        query = query.order_by(Conversation.id.desc())
+        if window.max_turns is not None:
+            query = query.limit(window.max_turns)
+        return list(reversed(db.session.execute(query).all()))
+
+
+# 进程内共享的窗口缓存，在 create_app 中通过 init_app 读取配置
+analysis_windows = AnalysisWindows()
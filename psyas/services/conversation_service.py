@@ -3,20 +3,30 @@
 
 升级为Agent架构，但保持原有接口完全兼容。
 """
+import datetime as dt
 import random
+import threading
+import time
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+from flask import current_app
+from sqlalchemy import select, update
 from sqlalchemy.exc import SQLAlchemyError
 
-from psyas.database import db
-from psyas.models.conversation import Conversation
-from psyas.models.guide_question import GuideQuestion
-from psyas.user.models import User
+from psyas.auth.identity import load_user
+from psyas.database import db, unit_of_work
+from psyas.models.conversation import BACKFILL_SOURCE, Conversation
+from psyas.pagination import keyset_page
+from psyas.services.conversation_writer import conversation_writer
+from psyas.services.emotion_timeline import record_conversations
+from psyas.services.guide_question_index import guide_question_index
+from psyas.services.memory_cache import agent_memory_cache
+from psyas.services.pipeline_metrics import agent_metrics
 
 # 尝试导入知识库服务，如果导入失败则使用基础模式
 try:
-    from psyas.services.knowledge_service import KnowledgeService
+    from psyas.services.knowledge_service import get_knowledge_service
 
     KNOWLEDGE_SERVICE_AVAILABLE = True
 except ImportError:
@@ -25,23 +35,32 @@ except ImportError:
 
 # 尝试导入MCP工具注册表
 try:
-    from psyas.mcp.tool_registry import MCPToolRegistry
+    from psyas.mcp.tool_registry import get_tool_registry
 
     MCP_AVAILABLE = True
 except ImportError:
     MCP_AVAILABLE = False
     print("警告：MCP工具不可用，将使用基础模式")
 
+# Agent记忆上下文保留的最近对话条数
+MEMORY_CONTEXT_SIZE = 3
+
 
 @dataclass
 class AgentResult:
     """Agent处理结果."""
 
     response: str
+    # 回复依据的情绪（本轮未检测到时可能沿用记忆中的情绪）
     emotion: Optional[str] = None
+    # 本轮输入直接检测到的情绪，保存到对话记录和记忆中，使沿用的情绪随轮次淡出
+    detected_emotion: Optional[str] = None
     confidence: float = 0.0
     source: str = "basic"
     has_memory: bool = False
+    # 流式接口分开发送：即时回应（共情/危机回应）和后续引导问题
+    immediate_response: str = ""
+    follow_up: Optional[str] = None
 
 
 class ConversationService:
@@ -64,10 +83,10 @@ class ConversationService:
             "快乐": ["开心", "高兴", "快乐", "兴奋", "满意", "幸福"],
         }
 
-        # 初始化知识库服务（如果可用）
+        # 使用进程内共享的知识库服务（如果可用）
         if KNOWLEDGE_SERVICE_AVAILABLE:
             try:
-                self.knowledge_service = KnowledgeService()
+                self.knowledge_service = get_knowledge_service()
                 print("✅ Agent已启用知识库服务")
             except (ImportError, AttributeError) as e:
                 self.knowledge_service = None
@@ -75,10 +94,10 @@ class ConversationService:
         else:
             self.knowledge_service = None
 
-        # 初始化MCP工具注册表（如果可用）
+        # 使用进程内共享的MCP工具注册表（如果可用）
         if MCP_AVAILABLE:
             try:
-                self.mcp_registry = MCPToolRegistry()
+                self.mcp_registry = get_tool_registry()
                 print("✅ Agent已启用MCP工具系统")
             except (ImportError, AttributeError, RuntimeError) as e:
                 self.mcp_registry = None
@@ -86,8 +105,17 @@ class ConversationService:
         else:
             self.mcp_registry = None
 
-        # Agent记忆缓存（简单版本）
-        self._memory_cache = {}
+        # Agent记忆缓存（带容量上限和过期时间，可配置为跨worker共享）
+        self._memory_cache = agent_memory_cache
+
+        # 引导问题索引（进程内按场景分组，请求路径不访问数据库）
+        self._guide_questions = guide_question_index
+
+        # 各阶段耗时和命中分支统计
+        self._metrics = agent_metrics
+
+        # 对话批量延迟写入队列（CONVERSATION_WRITE_BEHIND开启时使用）
+        self._writer = conversation_writer
 
     def process_user_input(self, user_id: int, user_input: str) -> Dict:
         """
@@ -104,34 +132,24 @@ class ConversationService:
             user_input: 用户输入的文本
 
         Returns:
-            Dict: 包含助手回复和Agent信息的字典
+            Dict: 包含助手回复和Agent信息的字典（开启延迟写入时
+                conversation_id 为 None，对话在下一次刷新时入库）
         """
+        metrics = self._metrics
         try:
-            # 1. 验证用户存在
-            user = User.query.get(user_id)
-            if not user:
-                return {"error": "用户不存在", "code": 404}
-
-            # === Agent四步流程 ===
-
-            # 2. 感知阶段：理解用户输入（重用+增强现有逻辑）
-            perception = self._agent_perceive(user_input)
+            with metrics.stage("total"):
+                # 1. 验证用户存在
+                with metrics.stage("user_lookup"):
+                    user = load_user(user_id)
+                if not user:
+                    metrics.record_error("user_not_found")
+                    return {"error": "用户不存在", "code": 404}
 
-            # 3. 记忆检索：获取用户历史上下文
-            memory_context = self._agent_get_memory(user_id)
-
-            # 4. 推理和行动：生成回复（重用+增强现有逻辑）
-            agent_result = self._agent_reason_and_respond(
-                user_input, perception, memory_context
-            )
-
-            # 5. 记忆更新：保存对话记录
-            conversation = self._save_conversation(
-                user_id, user_input, agent_result.response
-            )
+                # 2-4. 感知、记忆检索、推理和行动
+                agent_result = self._agent_respond(user_id, user_input)
 
-            # 6. 更新记忆缓存
-            self._agent_update_memory(user_id, user_input, agent_result)
+                # 5-6. 保存对话记录并更新记忆缓存
+                conversation = self._agent_persist(user_id, user_input, agent_result)
 
             return {
                 "code": 200,
@@ -142,21 +160,137 @@ class ConversationService:
                     "user_input": user_input,
                     "created_at": conversation.created_at.isoformat(),
                     # === Agent增强信息 ===
-                    "agent_info": {
-                        "detected_emotion": agent_result.emotion,
-                        "confidence": agent_result.confidence,
-                        "response_source": agent_result.source,
-                        "has_memory": agent_result.has_memory,
-                    },
+                    "agent_info": self._agent_info(agent_result),
                 },
             }
 
         except SQLAlchemyError as exc:
             db.session.rollback()
+            metrics.record_error("database")
             return {"error": f"数据库操作失败: {str(exc)}", "code": 500}
         except (ValueError, TypeError) as exc:
+            metrics.record_error("invalid_input")
             return {"error": f"参数错误: {str(exc)}", "code": 400}
 
+    def stream_user_input(
+        self, user_id: int, user_input: str
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        Agent主流程的流式版本：回复生成后立即产出，保存对话放在最后.
+
+        依次产出以下事件（事件名, 数据）：
+        - response: 即时回应（共情回应或危机干预回应）
+        - follow_up: 后续引导问题（如果有）
+        - metadata: 保存后的对话ID、完整回复和Agent信息
+        - error: 处理失败时产出，之后不再产出其他事件
+
+        客户端在收到前两个事件后断开时，对话仍会被保存。
+
+        Args:
+            user_id: 用户ID
+            user_input: 用户输入的文本
+
+        Yields:
+            Tuple[str, Dict]: 事件名和事件数据
+        """
+        metrics = self._metrics
+        started = time.perf_counter()
+        try:
+            with metrics.stage("user_lookup"):
+                user = load_user(user_id)
+            if not user:
+                metrics.record_error("user_not_found")
+                yield "error", {"error": "用户不存在", "code": 404}
+                return
+
+            agent_result = self._agent_respond(user_id, user_input)
+            metrics.observe("first_event", time.perf_counter() - started)
+
+            delivered = False
+            try:
+                yield "response", {"text": agent_result.immediate_response}
+                if agent_result.follow_up:
+                    yield "follow_up", {"question": agent_result.follow_up}
+                delivered = True
+            finally:
+                if not delivered:
+                    # 客户端提前断开：不再产出事件，但仍保存对话
+                    self._persist_quietly(user_id, user_input, agent_result)
+
+            conversation = self._agent_persist(user_id, user_input, agent_result)
+            metrics.observe("total", time.perf_counter() - started)
+
+            yield "metadata", {
+                "conversation_id": conversation.id,
+                "assistant_response": agent_result.response,
+                "user_input": user_input,
+                "created_at": conversation.created_at.isoformat(),
+                "agent_info": self._agent_info(agent_result),
+            }
+
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            metrics.record_error("database")
+            yield "error", {"error": f"数据库操作失败: {str(exc)}", "code": 500}
+        except (ValueError, TypeError) as exc:
+            metrics.record_error("invalid_input")
+            yield "error", {"error": f"参数错误: {str(exc)}", "code": 400}
+
+    def _agent_respond(self, user_id: int, user_input: str) -> AgentResult:
+        """Agent感知、记忆检索、推理和行动（只读，不写数据库）."""
+        metrics = self._metrics
+
+        # 感知阶段：理解用户输入（重用+增强现有逻辑）
+        with metrics.stage("perceive"):
+            perception = self._agent_perceive(user_input)
+
+        # 记忆检索：获取用户历史上下文
+        with metrics.stage("memory"):
+            memory_context = self._agent_get_memory(user_id)
+
+        # 推理和行动：生成回复（重用+增强现有逻辑）
+        with metrics.stage("reason"):
+            agent_result = self._agent_reason_and_respond(
+                user_input, perception, memory_context
+            )
+        agent_result.detected_emotion = perception.get("emotion")
+        metrics.record_branch(agent_result.source)
+        return agent_result
+
+    def _agent_persist(
+        self, user_id: int, user_input: str, agent_result: AgentResult
+    ) -> Conversation:
+        """保存对话记录（连同检测到的情绪和回复来源）并更新记忆缓存."""
+        with self._metrics.stage("save"):
+            conversation = self._save_conversation(
+                user_id, user_input, agent_result.response, agent_result
+            )
+
+        with self._metrics.stage("memory_update"):
+            self._agent_update_memory(user_id, conversation, agent_result)
+        return conversation
+
+    def _persist_quietly(
+        self, user_id: int, user_input: str, agent_result: AgentResult
+    ) -> None:
+        """保存对话，失败时只回滚并记录错误（用于无法再向客户端报告的场景）."""
+        try:
+            self._agent_persist(user_id, user_input, agent_result)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self._metrics.record_error("database")
+            print(f"警告：流式对话保存失败: {str(e)}")
+
+    @staticmethod
+    def _agent_info(agent_result: AgentResult) -> Dict:
+        """返回接口中展示的Agent增强信息."""
+        return {
+            "detected_emotion": agent_result.emotion,
+            "confidence": agent_result.confidence,
+            "response_source": agent_result.source,
+            "has_memory": agent_result.has_memory,
+        }
+
     # === 兼容性接口（保持原有API不变） ===
 
     @classmethod
@@ -165,7 +299,8 @@ class ConversationService:
         创建对话（原有接口，完全兼容）.
 
         这个方法保持与原有ConversationService.create_conversation()完全兼容，
-        但内部使用Agent处理。
+        但内部使用Agent处理。使用进程内共享的服务实例，请求路径上不再
+        重复构建知识库和MCP工具注册表。
 
         Args:
             user_id: 用户ID
@@ -174,8 +309,7 @@ class ConversationService:
         Returns:
             Dict: 对话结果，包含Agent增强信息
         """
-        service = cls()
-        return service.process_user_input(user_id, user_input)
+        return get_conversation_service().process_user_input(user_id, user_input)
 
     def _agent_perceive(self, user_input: str) -> Dict:
         """
@@ -209,15 +343,20 @@ class ConversationService:
         重用现有的get_user_conversations逻辑
         """
         # 检查缓存
-        if user_id in self._memory_cache:
-            return self._memory_cache[user_id]
+        cached_memory = self._memory_cache.get(user_id)
+        if cached_memory is not None:
+            return cached_memory
 
         try:
-            # 获取最近3条对话作为记忆上下文
+            # 延迟写入模式下，队列中尚未入库的对话也属于记忆（先读队列再查库，
+            # 期间刚写入数据库的对话会同时出现在两边，按内容去重）
+            pending = self._writer.pending_for(user_id) if self._writer.enabled else []
+
+            # 获取最近几条对话作为记忆上下文
             recent_conversations = (
                 Conversation.query.filter_by(user_id=user_id)
                 .order_by(Conversation.created_at.desc())
-                .limit(3)
+                .limit(MEMORY_CONTEXT_SIZE)
                 .all()
             )
 
@@ -228,14 +367,29 @@ class ConversationService:
                         "user_input": conv.user_input,
                         "assistant_response": conv.assistant_response,
                         "created_at": conv.created_at.isoformat(),
-                        "emotion": self._detect_emotion(
-                            conv.user_input
-                        ),  # 分析历史情绪
+                        "emotion": self._stored_emotion(conv),
                     }
                 )
 
-            # 缓存记忆（简单版本）
-            self._memory_cache[user_id] = memory_context
+            if pending:
+                saved = {
+                    (memory["user_input"], memory["assistant_response"])
+                    for memory in memory_context
+                }
+                queued = [
+                    {
+                        "user_input": row["user_input"],
+                        "assistant_response": row["assistant_response"],
+                        "created_at": row["created_at"].isoformat(),
+                        "emotion": row["emotion"],
+                    }
+                    for row in reversed(pending)
+                    if (row["user_input"], row["assistant_response"]) not in saved
+                ]
+                memory_context = (queued + memory_context)[:MEMORY_CONTEXT_SIZE]
+
+            # 缓存记忆
+            self._memory_cache.set(user_id, memory_context)
             return memory_context
 
         except SQLAlchemyError:
@@ -258,23 +412,26 @@ class ConversationService:
         )
 
         # 尝试使用MCP工具
-        mcp_result = self._try_mcp_response(
-            user_input, enhanced_emotion, detected_emotion, memory_context
-        )
+        with self._metrics.stage("mcp"):
+            mcp_result = self._try_mcp_response(
+                user_input, enhanced_emotion, detected_emotion, memory_context
+            )
         if mcp_result:
             return mcp_result
 
         # 回退到知识库逻辑
-        knowledge_result = self._try_knowledge_response(
-            user_input, enhanced_emotion, detected_emotion, memory_context
-        )
+        with self._metrics.stage("knowledge"):
+            knowledge_result = self._try_knowledge_response(
+                user_input, enhanced_emotion, detected_emotion, memory_context
+            )
         if knowledge_result:
             return knowledge_result
 
         # 使用基础回复逻辑
-        return self._generate_basic_response(
-            enhanced_emotion, detected_emotion, confidence, memory_context
-        )
+        with self._metrics.stage("basic"):
+            return self._generate_basic_response(
+                enhanced_emotion, detected_emotion, confidence, memory_context
+            )
 
     def _try_mcp_response(
         self,
@@ -288,22 +445,14 @@ class ConversationService:
             return None
 
         try:
-            import asyncio
-
-            loop = asyncio.get_event_loop()
-
-            if loop.is_running():
-                print("MCP工具可用，但当前在同步上下文中")
-                return None
-
-            mcp_result = loop.run_until_complete(
-                self.mcp_registry.call_tool(
-                    "emotion_analysis",
-                    {
-                        "text": user_input,
-                        "context": {"emotion": enhanced_emotion or detected_emotion},
-                    },
-                )
+            # 提交到常驻后台事件循环执行，不再为每个请求创建事件循环
+            mcp_result = self.mcp_registry.call_tool_sync(
+                "emotion_analysis",
+                {
+                    "text": user_input,
+                    "context": {"emotion": enhanced_emotion or detected_emotion},
+                },
+                timeout=current_app.config.get("MCP_TOOL_TIMEOUT"),
             )
 
             if mcp_result.success and mcp_result.data.get("confidence", 0) > 0.3:
@@ -357,9 +506,12 @@ class ConversationService:
                 enhanced_response, memory_context
             )
 
+        immediate_response = enhanced_response
+        follow_up = None
         follow_up_questions = mcp_data.get("follow_up_questions", [])
         if follow_up_questions:
-            enhanced_response += f" {follow_up_questions[0]}"
+            follow_up = follow_up_questions[0]
+            enhanced_response += f" {follow_up}"
 
         return AgentResult(
             response=enhanced_response,
@@ -367,6 +519,8 @@ class ConversationService:
             confidence=mcp_data.get("confidence", 0.5),
             source="mcp_enhanced",
             has_memory=len(memory_context) > 0,
+            immediate_response=immediate_response,
+            follow_up=follow_up,
         )
 
     def _build_knowledge_response(
@@ -384,6 +538,8 @@ class ConversationService:
                 enhanced_response, memory_context
             )
 
+        immediate_response = enhanced_response
+        follow_up = None
         if knowledge_match.follow_up_questions:
             follow_up = knowledge_match.follow_up_questions[0]
             enhanced_response += f" {follow_up}"
@@ -394,6 +550,8 @@ class ConversationService:
             confidence=knowledge_match.confidence,
             source="knowledge_enhanced",
             has_memory=len(memory_context) > 0,
+            immediate_response=immediate_response,
+            follow_up=follow_up,
         )
 
     def _generate_basic_response(
@@ -414,10 +572,10 @@ class ConversationService:
         guide_question = self._get_guide_question(
             (enhanced_emotion or detected_emotion) or "通用"
         )
-        final_response = f"{base_response} {guide_question}"
 
         if memory_context:
-            final_response = self._add_memory_continuity(final_response, memory_context)
+            base_response = self._add_memory_continuity(base_response, memory_context)
+        final_response = f"{base_response} {guide_question}"
 
         return AgentResult(
             response=final_response,
@@ -425,27 +583,32 @@ class ConversationService:
             confidence=confidence,
             source="basic_enhanced",
             has_memory=len(memory_context) > 0,
+            immediate_response=base_response,
+            follow_up=guide_question,
         )
 
     def _agent_update_memory(
-        self, user_id: int, user_input: str, agent_result: AgentResult
+        self, user_id: int, conversation: Conversation, agent_result: AgentResult
     ):
-        """Agent记忆更新：更新缓存记忆."""
-        if user_id in self._memory_cache:
-            # 更新记忆缓存
-            memory = self._memory_cache[user_id]
-
-            # 添加新的对话到记忆中
-            new_memory = {
-                "user_input": user_input,
-                "assistant_response": agent_result.response,
-                "created_at": "just_now",
-                "emotion": agent_result.emotion,
-            }
-            memory.insert(0, new_memory)
+        """Agent记忆更新：把刚保存的对话写入已缓存的记忆."""
+        memory = self._memory_cache.peek(user_id)
+        if memory is None:
+            # 未缓存时下次检索直接从数据库读取，无需在此构建；
+            # 仍需通知其他worker丢弃它们缓存的旧记忆
+            self._memory_cache.invalidate(user_id)
+            return
+
+        new_memory = {
+            "user_input": conversation.user_input,
+            "assistant_response": agent_result.response,
+            "created_at": conversation.created_at.isoformat(),
+            "emotion": agent_result.detected_emotion,
+        }
 
-            # 保持最近3条记录
-            self._memory_cache[user_id] = memory[:3]
+        # 保持最近几条记录（生成新列表，不修改缓存中的原对象）
+        self._memory_cache.replace(
+            user_id, [new_memory] + list(memory)[: MEMORY_CONTEXT_SIZE - 1]
+        )
 
     def _enhance_emotion_with_memory(
         self, current_emotion: Optional[str], memory_context: List[Dict]
@@ -509,18 +672,40 @@ class ConversationService:
 
         return keywords
 
+    def _stored_emotion(self, conversation: Conversation) -> Optional[str]:
+        """读取对话保存的情绪，尚未回填的旧数据才重新检测."""
+        if conversation.response_source is None:
+            return self._detect_emotion(conversation.user_input)
+        return conversation.emotion
+
     def _save_conversation(
-        self, user_id: int, user_input: str, assistant_response: str
+        self,
+        user_id: int,
+        user_input: str,
+        assistant_response: str,
+        agent_result: Optional[AgentResult] = None,
     ) -> Conversation:
-        """保存对话记录（重用现有逻辑）."""
-        conversation = Conversation.create(
-            user_id=user_id,
-            user_input=user_input.strip(),
-            assistant_response=assistant_response,
-            is_analyzed=False,
-        )
-        db.session.add(conversation)
-        db.session.commit()
+        """保存对话记录（重用现有逻辑），同时写入本轮检测到的情绪和回复来源.
+
+        开启延迟写入时只把对话加入写入队列，返回的对象尚未入库（id为None）。
+        """
+        values = {
+            "user_id": user_id,
+            "user_input": user_input.strip(),
+            "assistant_response": assistant_response,
+            "is_analyzed": False,
+            "emotion": agent_result.detected_emotion if agent_result else None,
+            "confidence": agent_result.confidence if agent_result else None,
+            "response_source": agent_result.source if agent_result else None,
+        }
+        if self._writer.enabled:
+            values["created_at"] = dt.datetime.now(dt.timezone.utc)
+            self._writer.submit(values)
+            return Conversation(**values)
+
+        with unit_of_work() as session:
+            conversation = Conversation.create(commit=False, **values)
+            record_conversations(session, [conversation])
         return conversation
 
     # === 原有方法（保持不变，用于Agent内部调用） ===
@@ -616,13 +801,11 @@ class ConversationService:
         Returns:
             str: 引导问题
         """
-        # 从数据库获取引导问题
-        guide_questions = GuideQuestion.query.filter_by(scene=scene).all()
+        # 从进程内索引按优先级加权抽取引导问题
+        selected_question = self._guide_questions.choose(scene)
 
-        if guide_questions:
-            # 随机选择一个引导问题
-            selected_question = random.choice(guide_questions)
-            return selected_question.question_text
+        if selected_question is not None:
+            return selected_question
         else:
             # 默认引导问题
             default_questions = [
@@ -633,23 +816,30 @@ class ConversationService:
             ]
             return random.choice(default_questions)
 
-    def get_user_conversations(self, user_id: int, limit: int = 10) -> Dict:
+    def get_user_conversations(
+        self, user_id: int, limit: int = 10, cursor: Optional[str] = None
+    ) -> Dict:
         """
         获取用户的对话历史.
 
         Args:
             user_id: 用户ID
             limit: 返回的对话数量限制
+            cursor: 上一页返回的next_cursor，为None时从最新的对话开始
 
         Returns:
-            Dict: 对话历史数据
+            Dict: 对话历史数据，next_cursor用于获取下一页
+
+        Raises:
+            InvalidCursor: 游标格式错误
         """
         try:
-            conversations = (
-                Conversation.query.filter_by(user_id=user_id)
-                .order_by(Conversation.created_at.desc())
-                .limit(limit)
-                .all()
+            conversations, next_cursor = keyset_page(
+                Conversation.query.filter_by(user_id=user_id),
+                Conversation.created_at,
+                Conversation.id,
+                limit,
+                cursor,
             )
 
             conversation_list = []
@@ -661,6 +851,9 @@ class ConversationService:
                         "assistant_response": conv.assistant_response,
                         "created_at": conv.created_at.isoformat(),
                         "is_analyzed": conv.is_analyzed,
+                        "emotion": conv.emotion,
+                        "confidence": conv.confidence,
+                        "response_source": conv.response_source,
                     }
                 )
 
@@ -670,8 +863,102 @@ class ConversationService:
                 "data": {
                     "conversations": conversation_list,
                     "total": len(conversation_list),
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None,
                 },
             }
 
         except SQLAlchemyError as exc:
             return {"error": f"数据库查询失败: {str(exc)}", "code": 500}
+
+    def backfill_conversation_emotions(
+        self,
+        chunk_size: int = 1000,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> Dict:
+        """
+        为尚未保存情绪的旧对话回填情绪和回复来源.
+
+        按主键顺序分块处理，每块一个事务。旧数据的回复来源和回复置信度
+        无法还原：来源统一记为 ``BACKFILL_SOURCE``，置信度保持为空，
+        不与新对话保存的回复置信度混在一起。
+
+        Args:
+            chunk_size: 每个事务更新的对话条数
+            progress: 每提交一块后调用，参数为已回填的条数
+
+        Returns:
+            Dict: 回填条数
+        """
+        updated = 0
+        last_id = 0
+        try:
+            while True:
+                rows = db.session.execute(
+                    select(
+                        Conversation.id,
+                        Conversation.user_id,
+                        Conversation.user_input,
+                        Conversation.emotion,
+                        Conversation.created_at,
+                    )
+                    .where(
+                        Conversation.response_source.is_(None),
+                        Conversation.id > last_id,
+                    )
+                    .order_by(Conversation.id)
+                    .limit(chunk_size)
+                ).all()
+                if not rows:
+                    break
+
+                values = []
+                detected = []
+                for row in rows:
+                    perception = self._agent_perceive(row.user_input)
+                    values.append(
+                        {
+                            "id": row.id,
+                            "emotion": perception["emotion"],
+                            "response_source": BACKFILL_SOURCE,
+                        }
+                    )
+                    detected.append(
+                        {
+                            "user_id": row.user_id,
+                            "created_at": row.created_at,
+                            "emotion": perception["emotion"],
+                        }
+                    )
+                with unit_of_work() as session:
+                    session.execute(update(Conversation), values)
+                    record_conversations(session, detected, replaced=rows)
+
+                updated += len(rows)
+                last_id = rows[-1].id
+                if progress is not None:
+                    progress(updated)
+
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            return {
+                "error": f"数据库操作失败: {str(exc)}",
+                "code": 500,
+                "data": {"updated": updated},
+            }
+
+        return {"code": 200, "message": "回填完成", "data": {"updated": updated}}
+
+
+_shared_service: Optional[ConversationService] = None
+_shared_lock = threading.Lock()
+
+
+def get_conversation_service() -> ConversationService:
+    """获取进程内共享的对话服务实例."""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = ConversationService()
+    return _shared_service
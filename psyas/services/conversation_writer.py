@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""对话写入队列 (ConversationWriter) - 可选的批量延迟写入（write-behind）.
+
+开启 ``CONVERSATION_WRITE_BEHIND`` 后，对话记录先进入进程内队列，
+由后台线程每隔 ``CONVERSATION_FLUSH_INTERVAL_MS`` 毫秒或攒够
+``CONVERSATION_FLUSH_BATCH_SIZE`` 条时用一条多行INSERT写入数据库。
+
+- 顺序：队列先进先出，只有一个写入者（持有刷新锁），同一用户的对话按提交顺序入库。
+- 背压：队列超过 ``CONVERSATION_QUEUE_SIZE`` 时，提交者在当前线程同步刷新整个队列。
+- 关闭：进程退出时（atexit）刷新剩余记录。
+- 失败：数据错误（IntegrityError/DataError）时逐行重试，写不进去的行转入死信
+  （``dead_letters``），不会阻塞后面的记录；其他错误（如连接断开）时整批放回
+  队首，按指数退避重试，连续失败 ``CONVERSATION_FLUSH_MAX_RETRIES`` 次后转入死信。
+
+队列只在进程内存中，进程被强制杀死时尚未写入的记录会丢失；
+写入前对话没有数据库ID，历史接口在刷新后才能看到这些对话。
+"""
+import atexit
+import os
+import threading
+import weakref
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+
+from psyas.database import unit_of_work
+from psyas.models.conversation import Conversation
+from psyas.services.emotion_timeline import record_conversations
+
+DEFAULT_FLUSH_INTERVAL_MS = 50
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_QUEUE_SIZE = 5000
+DEFAULT_MAX_RETRIES = 20
+# 重试间隔从刷新间隔开始逐次翻倍，最长不超过该值（秒）
+MAX_RETRY_DELAY = 30.0
+# 进程内最多保留的死信条数（更早的只在日志中留下警告）
+DEAD_LETTER_SIZE = 1000
+
+
+class ConversationWriter:
+    """进程内的对话批量写入队列."""
+
+    def __init__(
+        self,
+        flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_queue: int = DEFAULT_QUEUE_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        """初始化写入队列（默认关闭，由 ``init_app`` 根据配置开启）.
+
+        Args:
+            flush_interval_ms: 后台刷新间隔（毫秒）
+            batch_size: 每条INSERT最多写入的行数，队列达到该长度时立即刷新
+            max_queue: 队列上限，超过后提交者同步刷新
+            max_retries: 暂时性错误时同一批记录最多重试的次数
+        """
+        self.flush_interval_ms = flush_interval_ms
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.enabled = False
+        self.app = None
+
+        self._queue: deque = deque()
+        self._in_flight: List[Dict] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._retries = 0
+        self.dead_letters: deque = deque(maxlen=DEAD_LETTER_SIZE)
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.sync_flushes = 0
+        self.dropped_rows = 0
+
+    def init_app(self, app):
+        """从应用配置读取写入参数."""
+        self.drain()
+        self.app = app
+        self.enabled = app.config.get("CONVERSATION_WRITE_BEHIND", False)
+        self.flush_interval_ms = app.config.get(
+            "CONVERSATION_FLUSH_INTERVAL_MS", DEFAULT_FLUSH_INTERVAL_MS
+        )
+        self.batch_size = app.config.get(
+            "CONVERSATION_FLUSH_BATCH_SIZE", DEFAULT_BATCH_SIZE
+        )
+        self.max_queue = app.config.get("CONVERSATION_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)
+        self.max_retries = app.config.get(
+            "CONVERSATION_FLUSH_MAX_RETRIES", DEFAULT_MAX_RETRIES
+        )
+
+    def submit(self, row: Dict) -> None:
+        """
+        把一条对话加入写入队列.
+
+        队列已满时在当前线程同步刷新整个队列（包括这条记录）后返回。
+
+        Args:
+            row: Conversation表的列值（需包含created_at）
+        """
+        with self._cond:
+            self._queue.append(row)
+            queued = len(self._queue)
+            if queued >= self.batch_size:
+                self._cond.notify()
+        self._ensure_thread()
+
+        if queued > self.max_queue:
+            self.sync_flushes += 1
+            self.flush()
+
+    def pending_for(self, user_id: int) -> List[Dict]:
+        """返回该用户已提交但尚未写入数据库的对话（按提交顺序）."""
+        with self._cond:
+            rows = list(self._in_flight) + list(self._queue)
+        return [row for row in rows if row["user_id"] == user_id]
+
+    def pending_count(self) -> int:
+        """返回尚未写入数据库的对话条数."""
+        with self._cond:
+            return len(self._queue) + len(self._in_flight)
+
+    def flush(self) -> int:
+        """
+        把队列中的全部对话写入数据库.
+
+        Returns:
+            int: 本次写入的行数
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    count = min(self.batch_size, len(self._queue))
+                    batch = [self._queue.popleft() for _ in range(count)]
+                    self._in_flight = batch
+                if not batch:
+                    return written
+                inserted, retry = self._write_batch(batch)
+                with self._cond:
+                    self._in_flight = []
+                written += inserted
+                self.flushed_rows += inserted
+                if retry:
+                    return written
+                self._retries = 0
+                self.flushes += 1
+
+    def drain(self, timeout: float = 10.0) -> None:
+        """停止后台线程并写入剩余的全部对话."""
+        thread = self._thread
+        if thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            thread.join(timeout)
+            self._thread = None
+            self._stopping = False
+        if self.app is not None and self._queue:
+            self.flush()
+            if self._queue:
+                print(f"警告：进程退出时仍有{len(self._queue)}条对话未能写入")
+
+    def _write_batch(self, batch: List[Dict]) -> Tuple[int, bool]:
+        """写入一批记录，返回 (写入的行数, 是否已放回队列等待重试)."""
+        try:
+            self._insert(batch)
+            return len(batch), False
+        except (IntegrityError, DataError):
+            return self._insert_each(batch)
+        except SQLAlchemyError as e:
+            return 0, self._requeue(batch, e)
+
+    def _insert_each(self, batch: List[Dict]) -> Tuple[int, bool]:
+        """整批写入因数据错误失败时逐行写入，写不进去的行转入死信."""
+        inserted = 0
+        while batch:
+            try:
+                self._insert(batch[:1])
+                inserted += 1
+            except (IntegrityError, DataError) as e:
+                self._dead_letter(batch[:1], e)
+            except SQLAlchemyError as e:
+                # 已处理的行已从batch中移除，只放回剩余的行
+                return inserted, self._requeue(batch, e)
+            with self._cond:
+                batch.pop(0)
+        return inserted, False
+
+    def _requeue(self, batch: List[Dict], error: SQLAlchemyError) -> bool:
+        """暂时性错误：整批放回队首等待重试；重试次数用完时转入死信并返回False."""
+        self._retries += 1
+        if self._retries > self.max_retries:
+            self._dead_letter(batch, error)
+            return False
+        with self._cond:
+            self._queue.extendleft(reversed(batch))
+            self._in_flight = []
+        print(
+            f"警告：对话批量写入失败（第{self._retries}次），"
+            f"{len(batch)}条记录将重试: {str(error)}"
+        )
+        return True
+
+    def _dead_letter(self, rows: List[Dict], error: SQLAlchemyError) -> None:
+        """放弃写入这些记录，保留在死信中供排查."""
+        for row in rows:
+            self.dead_letters.append((row, str(error)))
+        self.dropped_rows += len(rows)
+        print(f"警告：{len(rows)}条对话无法写入数据库，已转入死信: {str(error)}")
+
+    def _insert(self, rows: List[Dict]) -> None:
+        """在独立的应用上下文（独立会话）中用一条多行INSERT写入，同时更新情绪时间线."""
+        with self.app.app_context(), unit_of_work() as session:
+            session.execute(insert(Conversation), rows)
+            record_conversations(session, rows)
+
+    def _ensure_thread(self) -> None:
+        """按需启动后台刷新线程."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="conversation-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        """后台线程：定时或攒够一批时刷新."""
+        while True:
+            with self._cond:
+                # 重试期间不因攒够一批而提前刷新，按退避间隔等待
+                self._cond.wait_for(
+                    lambda: self._stopping
+                    or (not self._retries and len(self._queue) >= self.batch_size),
+                    timeout=self._flush_delay(),
+                )
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def _flush_delay(self) -> float:
+        """下一次后台刷新前等待的秒数（写入失败后指数退避）."""
+        delay = self.flush_interval_ms / 1000
+        if self._retries:
+            backoff = delay * 2 ** min(self._retries, 16)
+            delay = max(delay, min(backoff, MAX_RETRY_DELAY))
+        return delay
+
+    def _reset_after_fork(self) -> None:
+        """fork后子进程中后台线程不存在，重建锁和队列状态."""
+        self._queue = deque()
+        self._in_flight = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._retries = 0
+
+
+conversation_writer = ConversationWriter()
+atexit.register(conversation_writer.drain)
+
+
+def _reset_writer_after_fork(writer_ref: "weakref.ref") -> None:
+    """fork后在子进程中重置写入队列."""
+    writer = writer_ref()
+    if writer is not None:
+        writer._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    _writer_ref = weakref.ref(conversation_writer)
+    os.register_at_fork(after_in_child=lambda: _reset_writer_after_fork(_writer_ref))
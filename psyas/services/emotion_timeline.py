@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""情绪时间线 (emotion timeline) - 按用户按天汇总情绪和核心问题计数.
+
+写入分析结果或对话时，调用方在同一个 ``unit_of_work`` 中调用
+``record_analyses`` / ``record_conversations``，按 (用户, 日期, 维度, 标签)
+对 ``user_daily_emotions`` 做增量upsert（MySQL用 ON DUPLICATE KEY UPDATE，
+SQLite/PostgreSQL用 ON CONFLICT），分析/对话回滚时汇总一起回滚。
+
+维度：
+- ``emotion`` / ``core_issue``：分析结果的情绪和核心问题
+- ``turn_emotion``：对话本轮输入检测到的情绪（``Conversation.emotion``，
+  不含从记忆中沿用的情绪）
+
+日期按UTC划分。``get_trend`` 只读取汇总行，查询代价与天数成正比，
+与分析/对话的行数无关。
+"""
+import datetime as dt
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from psyas.database import db
+from psyas.models.emotion_timeline import DailyEmotionCount
+
+DIMENSIONS = ("emotion", "core_issue", "turn_emotion")
+DEFAULT_TREND_DAYS = 30
+MAX_TREND_DAYS = 366
+
+_UNIQUE_COLUMNS = ["user_id", "day", "dimension", "label"]
+
+
+def _utc_day(value) -> dt.date:
+    """把时间转为UTC日期（没有时区的时间按UTC处理）."""
+    if isinstance(value, str):
+        value = dt.datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(dt.timezone.utc)
+    return value.date()
+
+
+def _flushed(session, rows: Iterable, time_field: str) -> list:
+    """新建的ORM对象在flush前还没有默认时间，需要时先flush."""
+    rows = list(rows)
+    if any(
+        not isinstance(row, dict) and getattr(row, time_field) is None for row in rows
+    ):
+        session.flush()
+    return rows
+
+
+def _field(row, name: str):
+    """从字典或对象中读取字段."""
+    if isinstance(row, dict):
+        return row.get(name)
+    return getattr(row, name)
+
+
+def record_analyses(session, analyses: Iterable) -> int:
+    """
+    把分析结果计入时间线（在写入分析结果的事务中调用）.
+
+    Args:
+        session: 当前事务的会话
+        analyses: Analysis对象或包含 user_id/analyzed_at/emotion/core_issue 的字典
+
+    Returns:
+        int: 更新的汇总行数
+    """
+    counts: Counter = Counter()
+    for analysis in _flushed(session, analyses, "analyzed_at"):
+        user_id = _field(analysis, "user_id")
+        day = _utc_day(_field(analysis, "analyzed_at"))
+        for dimension in ("emotion", "core_issue"):
+            label = _field(analysis, dimension)
+            if label:
+                counts[(user_id, day, dimension, label)] += 1
+    return _increment(session, counts)
+
+
+def record_conversations(
+    session, conversations: Iterable, replaced: Iterable = ()
+) -> int:
+    """
+    把对话检测到的情绪计入时间线（在写入对话的事务中调用）.
+
+    Args:
+        session: 当前事务的会话
+        conversations: Conversation对象或包含 user_id/created_at/emotion 的字典
+        replaced: 修改已有对话的情绪时传入修改前的值，先从时间线中扣减
+
+    Returns:
+        int: 更新的汇总行数
+    """
+    counts: Counter = Counter()
+    conversations = _flushed(session, conversations, "created_at")
+    for rows, step in ((conversations, 1), (replaced, -1)):
+        for conversation in rows:
+            label = _field(conversation, "emotion")
+            if label:
+                day = _utc_day(_field(conversation, "created_at"))
+                user_id = _field(conversation, "user_id")
+                counts[(user_id, day, "turn_emotion", label)] += step
+    return _increment(session, counts)
+
+
+def _increment(session, counts: Counter) -> int:
+    """按 (用户, 日期, 维度, 标签) 增加计数，不存在的行插入."""
+    # 固定加锁顺序，降低并发事务死锁的概率
+    values = [
+        {
+            "user_id": user_id,
+            "day": day,
+            "dimension": dimension,
+            "label": label,
+            "total": total,
+        }
+        for (user_id, day, dimension, label), total in sorted(counts.items())
+        if total
+    ]
+    if not values:
+        return 0
+    table = DailyEmotionCount.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ("mysql", "mariadb"):
+        statement = mysql_insert(table)
+        statement = statement.on_duplicate_key_update(
+            total=table.c.total + statement.inserted.total
+        )
+    elif dialect in ("sqlite", "postgresql"):
+        statement = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=_UNIQUE_COLUMNS,
+            set_={"total": table.c.total + statement.excluded.total},
+        )
+    else:
+        _increment_portable(session, values)
+        return len(values)
+
+    session.execute(statement, values)
+    return len(values)
+
+
+def _increment_portable(session, values) -> None:
+    """不支持upsert的数据库：先更新，没有命中的行再插入."""
+    table = DailyEmotionCount.__table__
+    for value in values:
+        result = session.execute(
+            update(table)
+            .where(*(table.c[name] == value[name] for name in _UNIQUE_COLUMNS))
+            .values(total=table.c.total + value["total"])
+        )
+        if result.rowcount == 0:
+            session.execute(insert(table), [value])
+
+
+def get_trend(
+    user_id: int,
+    days: int = DEFAULT_TREND_DAYS,
+    dimension: str = "emotion",
+    today: Optional[dt.date] = None,
+) -> Dict:
+    """
+    读取用户最近若干天的每日计数.
+
+    Args:
+        user_id: 用户ID
+        days: 天数（包括今天）
+        dimension: emotion、core_issue 或 turn_emotion
+        today: 截止日期（UTC），默认今天
+
+    Returns:
+        Dict: 每天一项（没有数据的天为空计数）以及区间合计
+    """
+    if dimension not in DIMENSIONS:
+        return {
+            "error": f"参数错误: dimension必须是{'/'.join(DIMENSIONS)}之一",
+            "code": 400,
+        }
+    if not 1 <= days <= MAX_TREND_DAYS:
+        return {"error": f"参数错误: days必须在1-{MAX_TREND_DAYS}之间", "code": 400}
+
+    end = today or dt.datetime.now(dt.timezone.utc).date()
+    start = end - dt.timedelta(days=days - 1)
+    try:
+        rows = db.session.execute(
+            select(
+                DailyEmotionCount.day, DailyEmotionCount.label, DailyEmotionCount.total
+            )
+            .where(
+                DailyEmotionCount.user_id == user_id,
+                DailyEmotionCount.dimension == dimension,
+                DailyEmotionCount.day >= start,
+                DailyEmotionCount.day <= end,
+                DailyEmotionCount.total > 0,
+            )
+            .order_by(DailyEmotionCount.day, DailyEmotionCount.label)
+        ).all()
+    except SQLAlchemyError as exc:
+        return {"error": f"数据库查询失败: {str(exc)}", "code": 500}
+
+    per_day: Dict[dt.date, Dict[str, int]] = {}
+    totals: Counter = Counter()
+    for day, label, total in rows:
+        per_day.setdefault(day, {})[label] = total
+        totals[label] += total
+
+    timeline = []
+    for offset in range(days):
+        day = start + dt.timedelta(days=offset)
+        timeline.append({"date": day.isoformat(), "counts": per_day.get(day, {})})
+
+    return {
+        "code": 200,
+        "message": "获取趋势成功",
+        "data": {
+            "dimension": dimension,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": timeline,
+            "totals": dict(totals.most_common()),
+        },
+    }
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""引导问题索引 (GuideQuestionIndex) - 进程内按场景分组的引导问题.
+
+引导问题只在首次使用、TTL到期或版本号变化时从数据库整体加载一次，
+请求路径上只做字典查找和一次O(1)的别名法（alias method）加权抽样，
+权重为 ``GuideQuestion.priority``。
+
+``GuideQuestion`` 的增删改在事务提交后会自动调用 ``invalidate()``：
+本进程立即标记过期，并通过 Flask-Caching 的 ``cache`` 写入新的版本号，
+其他worker在下一次版本检查时发现变化后重新加载。
+"""
+import random
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from flask import has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, object_session
+
+from psyas.database import db
+from psyas.extensions import CACHE_ERRORS, cache
+from psyas.models.guide_question import GuideQuestion
+
+DEFAULT_TTL = 300
+DEFAULT_VERSION_CHECK_INTERVAL = 5
+VERSION_KEY = "guide_questions:version"
+
+
+class AliasSampler:
+    """Walker/Vose别名法加权抽样器，构建O(n)，每次抽样O(1)."""
+
+    __slots__ = ("items", "_prob", "_alias")
+
+    def __init__(self, items: Sequence, weights: Sequence[float]):
+        """构建抽样表.
+
+        Args:
+            items: 候选项
+            weights: 与候选项一一对应的非负权重；全部为0时等概率抽样
+        """
+        if not items:
+            raise ValueError("候选项不能为空")
+        if len(items) != len(weights):
+            raise ValueError("候选项和权重数量不一致")
+
+        n = len(items)
+        total = float(sum(weights))
+        if total <= 0:
+            weights = [1.0] * n
+            total = float(n)
+
+        self.items = list(items)
+        self._prob = [0.0] * n
+        self._alias = list(range(n))
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # 剩余项（含浮点误差导致的残留）概率为1
+        for i in large + small:
+            self._prob[i] = 1.0
+
+    def __len__(self):
+        """候选项数量."""
+        return len(self.items)
+
+    def sample(self, rng=random):
+        """按权重随机返回一个候选项."""
+        i = int(rng.random() * len(self.items))
+        if rng.random() < self._prob[i]:
+            return self.items[i]
+        return self.items[self._alias[i]]
+
+
+def _priority_weight(priority: Optional[int]) -> float:
+    """把priority列转换为抽样权重（空值按默认值1处理，负数视为0）."""
+    if priority is None:
+        return 1.0
+    return float(max(priority, 0))
+
+
+class GuideQuestionIndex:
+    """按场景分组、带TTL和版本号刷新的引导问题索引."""
+
+    def __init__(
+        self,
+        ttl: int = DEFAULT_TTL,
+        version_check_interval: int = DEFAULT_VERSION_CHECK_INTERVAL,
+    ):
+        """初始化索引.
+
+        Args:
+            ttl: 索引有效期（秒），到期后重新加载
+            version_check_interval: 检查共享版本号的最小间隔（秒），0表示每次都检查
+        """
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+
+        self._samplers: Optional[Dict[str, AliasSampler]] = None
+        self._expires_at = 0.0
+        self._next_version_check = 0.0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def init_app(self, app):
+        """从应用配置读取刷新参数."""
+        self.ttl = app.config.get("GUIDE_QUESTION_INDEX_TTL", DEFAULT_TTL)
+        self.version_check_interval = app.config.get(
+            "GUIDE_QUESTION_VERSION_CHECK_INTERVAL", DEFAULT_VERSION_CHECK_INTERVAL
+        )
+        self.clear()
+
+    def choose(self, scene: str, rng=random) -> Optional[str]:
+        """按优先级加权随机返回该场景的一个引导问题，没有时返回None."""
+        samplers = self._current()
+        sampler = samplers.get(scene)
+        if sampler is None:
+            return None
+        return sampler.sample(rng)
+
+    def questions(self, scene: str) -> List[str]:
+        """返回该场景的全部引导问题."""
+        sampler = self._current().get(scene)
+        return list(sampler.items) if sampler is not None else []
+
+    def preload(self) -> None:
+        """立即加载索引（gunicorn预加载时在master进程中调用）."""
+        self._current()
+
+    def invalidate(self) -> None:
+        """标记索引过期，并通知其他worker重新加载."""
+        if has_app_context():
+            try:
+                cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=0)
+            except CACHE_ERRORS as e:
+                print(f"警告：引导问题版本号更新失败: {str(e)}")
+        with self._lock:
+            self._expires_at = 0.0
+
+    def clear(self) -> None:
+        """丢弃已加载的索引."""
+        with self._lock:
+            self._samplers = None
+            self._expires_at = 0.0
+            self._next_version_check = 0.0
+            self._version = None
+
+    def _current(self) -> Dict[str, AliasSampler]:
+        """返回当前索引，必要时重新加载."""
+        samplers = self._samplers
+        if samplers is not None and not self._is_stale():
+            return samplers
+
+        # 过期检查只做一次：检查本身会推迟下一次版本检查，加锁后不能再检查；
+        # 等锁期间其他线程已重新加载（索引对象已替换）时直接使用新索引
+        with self._lock:
+            if self._samplers is samplers:
+                self._reload()
+            return self._samplers
+
+    def _is_stale(self) -> bool:
+        """判断是否需要重新加载（TTL到期或共享版本号变化）."""
+        now = time.monotonic()
+        if now >= self._expires_at:
+            return True
+        if now < self._next_version_check:
+            return False
+        self._next_version_check = now + self.version_check_interval
+        return self._shared_version(self._version) != self._version
+
+    def _shared_version(self, default: Optional[str]) -> Optional[str]:
+        """读取共享版本号，缓存不可用时返回default（视为未变化，依赖TTL刷新）."""
+        try:
+            return cache.get(VERSION_KEY)
+        except CACHE_ERRORS as e:
+            print(f"警告：引导问题版本号读取失败: {str(e)}")
+            return default
+
+    def _reload(self) -> None:
+        """从数据库加载全部引导问题并重建抽样表（调用方持有锁）."""
+        version = self._shared_version(self._version)
+        try:
+            rows = db.session.execute(
+                select(
+                    GuideQuestion.scene,
+                    GuideQuestion.question_text,
+                    GuideQuestion.priority,
+                )
+            ).all()
+        except SQLAlchemyError as e:
+            print(f"警告：引导问题加载失败，继续使用旧数据: {str(e)}")
+            if self._samplers is None:
+                self._samplers = {}
+            self._expires_at = time.monotonic() + min(self.ttl, 30)
+            return
+
+        grouped: Dict[str, tuple] = {}
+        for scene, question_text, priority in rows:
+            texts, weights = grouped.setdefault(scene, ([], []))
+            texts.append(question_text)
+            weights.append(_priority_weight(priority))
+
+        self._samplers = {
+            scene: AliasSampler(texts, weights)
+            for scene, (texts, weights) in grouped.items()
+        }
+        now = time.monotonic()
+        self._version = version
+        self._expires_at = now + self.ttl
+        self._next_version_check = now + self.version_check_interval
+        self.loads += 1
+
+
+guide_question_index = GuideQuestionIndex()
+
+
+def _mark_changed(mapper, connection, target):
+    """记录当前会话修改过引导问题."""
+    session = object_session(target)
+    if session is not None:
+        session.info["guide_questions_changed"] = True
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(GuideQuestion, _event_name, _mark_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    """引导问题的修改提交后刷新索引."""
+    if session.info.pop("guide_questions_changed", False):
+        guide_question_index.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    """回滚后丢弃修改标记."""
+    session.info.pop("guide_questions_changed", None)
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""历史导出 (history export) - 以NDJSON流式导出用户的全部对话和分析结果.
+
+先按id升序导出对话，再按id升序导出分析结果，每行一条记录::
+
+    {"type": "conversation", "cursor": "...", "data": {...}}
+    {"type": "analysis", "cursor": "...", "data": {...}}
+    {"type": "end", "complete": true, "exported": 2, "next_cursor": null}
+
+每条记录都带有游标，下载中断时用最后收到的一行的游标继续导出即可；
+给出limit时最后一行 ``complete`` 为false，用 ``next_cursor`` 取下一段。
+查询只读取需要的列并用 ``yield_per`` 分批取回（MySQL等驱动使用服务端游标），
+gzip压缩也是逐段进行，内存占用与历史记录总数无关。
+"""
+import base64
+import binascii
+import json
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from psyas.database import db
+from psyas.models.analysis import Analysis
+from psyas.models.conversation import Conversation
+from psyas.pagination import InvalidCursor
+
+DEFAULT_EXPORT_BATCH_SIZE = 500
+# 每次合并写出（以及gzip刷新）的行数
+EXPORT_CHUNK_ROWS = 100
+
+# 导出顺序：(记录类型, 模型, 导出的列)
+EXPORT_TABLES = (
+    (
+        "conversation",
+        Conversation,
+        (
+            "id",
+            "user_input",
+            "assistant_response",
+            "created_at",
+            "is_analyzed",
+            "emotion",
+            "confidence",
+            "response_source",
+        ),
+    ),
+    (
+        "analysis",
+        Analysis,
+        (
+            "id",
+            "conversation_id",
+            "core_issue",
+            "emotion",
+            "simple_conclusion",
+            "analyzed_at",
+        ),
+    ),
+)
+EXPORT_TYPES = tuple(kind for kind, _, _ in EXPORT_TABLES)
+
+
+def encode_export_cursor(kind: str, record_id: int) -> str:
+    """把 ``(记录类型, id)`` 编码为不透明的导出游标."""
+    raw = f"{kind}|{record_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_export_cursor(cursor: str) -> Tuple[str, int]:
+    """解析导出游标，格式错误时抛出 InvalidCursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        kind, record_id = raw.rsplit("|", 1)
+        record_id = int(record_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise InvalidCursor(f"无效的导出游标: {cursor}") from exc
+    if kind not in EXPORT_TYPES or record_id < 0:
+        raise InvalidCursor(f"无效的导出游标: {cursor}")
+    return kind, record_id
+
+
+def iter_history(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+) -> Iterator[Dict]:
+    """
+    按导出顺序逐条读取用户的历史记录，最后是一条 ``type=end`` 的结尾记录.
+
+    游标在调用时立即校验，查询在开始迭代后才执行；读取中途出错时结尾记录包含
+    error，``next_cursor`` 指向最后一条成功导出的记录。
+
+    Args:
+        user_id: 用户ID
+        cursor: 上一次导出的 ``next_cursor`` 或最后一条记录的游标，None表示从头导出
+        limit: 本次最多导出的记录数，None表示全部
+        batch_size: 每批取回的行数
+
+    Returns:
+        Iterator[Dict]: 导出记录
+
+    Raises:
+        InvalidCursor: 游标格式错误
+    """
+    position = decode_export_cursor(cursor) if cursor else (EXPORT_TYPES[0], 0)
+    return _iter_records(user_id, position, cursor, limit, batch_size)
+
+
+def _iter_records(user_id, position, cursor, limit, batch_size) -> Iterator[Dict]:
+    """依次从每张表读取游标之后的记录，写满limit条后用下一行判断是否导完."""
+    start = EXPORT_TYPES.index(position[0])
+    exported = 0
+    end: Dict = {"type": "end", "complete": True}
+    try:
+        for index, (kind, model, columns) in enumerate(EXPORT_TABLES):
+            if index < start:
+                continue
+            after_id = position[1] if index == start else 0
+            remaining = None if limit is None else limit - exported + 1
+            rows = _select_rows(
+                user_id, model, columns, after_id, remaining, batch_size
+            )
+            try:
+                for row in rows:
+                    if exported == limit:
+                        end["complete"] = False
+                        break
+                    cursor = encode_export_cursor(kind, row.id)
+                    exported += 1
+                    yield {"type": kind, "cursor": cursor, "data": _record(row)}
+            finally:
+                rows.close()
+            if not end["complete"]:
+                break
+    except SQLAlchemyError as exc:
+        end.update(complete=False, error=f"数据库查询失败: {str(exc)}")
+
+    end["exported"] = exported
+    end["next_cursor"] = None if end["complete"] else cursor
+    yield end
+
+
+def _select_rows(user_id, model, columns, after_id, limit, batch_size):
+    """按id升序分批读取一张表中id大于after_id的记录."""
+    query = (
+        select(*(getattr(model, name) for name in columns))
+        .where(model.user_id == user_id, model.id > after_id)
+        .order_by(model.id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return db.session.execute(query.execution_options(yield_per=batch_size))
+
+
+def _record(row) -> Dict:
+    """把一行转为可JSON序列化的字典（时间转为ISO格式）."""
+    record = row._asdict()
+    for name, value in record.items():
+        if hasattr(value, "isoformat"):
+            record[name] = value.isoformat()
+    return record
+
+
+def ndjson_chunks(
+    records: Iterable[Dict], chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[str]:
+    """把记录序列化为NDJSON，每chunk_rows行合并为一段."""
+    chunk = []
+    for record in records:
+        chunk.append(json.dumps(record, ensure_ascii=False))
+        if len(chunk) >= chunk_rows:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """
+    逐段gzip压缩.
+
+    每段之后做一次同步刷新，客户端收到的数据随时可以解压，
+    连接中断时已收到的部分仍然可用。
+    """
+    compressor = zlib.compressobj(level=6, wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""关键词自动机 (KeywordAutomaton) - 基于Aho-Corasick的多模式关键词匹配."""
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+
+@dataclass(frozen=True)
+class KeywordHit:
+    """单个关键词命中记录."""
+
+    category: str
+    issue: str
+    keyword: str
+    end: int
+
+
+class KeywordHits:
+    """一次扫描得到的全部命中，提供按类别/问题查询的便捷方法."""
+
+    def __init__(self, hits: List[KeywordHit]):
+        """根据命中列表建立索引."""
+        self.hits = hits
+        self.keywords: FrozenSet[str] = frozenset(hit.keyword for hit in hits)
+        self.issues: FrozenSet[Tuple[str, str]] = frozenset(
+            (hit.category, hit.issue) for hit in hits
+        )
+
+    def has_issue(self, category: str, issue: str) -> bool:
+        """判断某个类别下的某个问题是否被命中."""
+        return (category, issue) in self.issues
+
+    def count_keywords(self, keywords: Iterable[str]) -> int:
+        """统计给定关键词列表中被命中的个数（与逐个 ``in`` 判断结果一致）."""
+        return sum(1 for keyword in keywords if keyword in self.keywords)
+
+    def __bool__(self) -> bool:
+        """是否存在任何命中."""
+        return bool(self.hits)
+
+    def __len__(self) -> int:
+        """命中次数（同一关键词多次出现会重复计数）."""
+        return len(self.hits)
+
+
+class KeywordAutomaton:
+    """Aho-Corasick多模式匹配自动机.
+
+    构建一次后可重复使用：每次扫描只需遍历文本一遍，
+    即可返回所有关键词命中及其所属的类别和问题标签。
+    """
+
+    def __init__(self):
+        """初始化空的自动机."""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, str, str]]] = [[]]
+        self._empty_tags: List[Tuple[str, str, str]] = []
+        self._tags: Set[Tuple[str, str, str]] = set()
+        self._built = False
+
+    def add(self, keyword: str, category: str, issue: str) -> None:
+        """添加一个带标签的关键词（必须在 ``build`` 之前调用）."""
+        if self._built:
+            raise RuntimeError("自动机已构建，不能再添加关键词")
+
+        tag = (category, issue, keyword)
+        if tag in self._tags:
+            return
+        self._tags.add(tag)
+
+        if not keyword:
+            # 空关键词与 ``"" in text`` 语义一致：总是命中
+            self._empty_tags.append(tag)
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(tag)
+
+    def build(self) -> "KeywordAutomaton":
+        """广度优先计算失败指针并合并输出."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+        self._built = True
+        return self
+
+    def search(self, text: str) -> KeywordHits:
+        """扫描文本一遍，返回全部命中."""
+        if not self._built:
+            self.build()
+
+        hits = [
+            KeywordHit(category, issue, keyword, 0)
+            for category, issue, keyword in self._empty_tags
+        ]
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for category, issue, keyword in output[state]:
+                hits.append(KeywordHit(category, issue, keyword, index + 1))
+        return KeywordHits(hits)
+
+    @property
+    def state_count(self) -> int:
+        """自动机状态数."""
+        return len(self._goto)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""关键词关联矩阵 (KeywordMatrix) - 批量统计文本命中各类别的关键词个数.
+
+构建时把 ``{类别: [关键词...]}`` 展开为 关键词×类别 的0/1关联矩阵。
+统计一批文本时，先把整批文本用NUL字符拼接成一个字符串，每个关键词只在
+拼接串上查找一遍（``str.find`` 在C中扫描），按偏移量定位命中属于哪条文本，
+得到 文本×关键词 的命中矩阵；再与关联矩阵相乘得到 文本×类别 的命中个数。
+
+有NumPy时矩阵运算用NumPy完成，否则使用纯Python实现，两者结果一致：
+与逐条 ``sum(1 for keyword in keywords if keyword in text)`` 相同，
+同一关键词在一条文本中出现多次只计一次。
+"""
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence
+
+# NumPy 可选：没有安装时使用纯Python实现
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 拼接文本时使用的分隔符（关键词中不会出现，命中不会跨越两条文本）
+SEPARATOR = "\x00"
+
+
+class KeywordMatrix:
+    """关键词×类别关联矩阵，按批统计每条文本命中各类别的关键词个数."""
+
+    def __init__(
+        self, categories: Dict[str, Sequence[str]], use_numpy: Optional[bool] = None
+    ):
+        """构建关联矩阵.
+
+        Args:
+            categories: 类别到关键词列表的映射（类别顺序即并列时的优先顺序）
+            use_numpy: 是否使用NumPy，None时有NumPy就使用
+        """
+        self.categories: List[str] = list(categories)
+        self.keywords: List[str] = []
+        # 每个关键词所属类别的列号
+        self.keyword_columns: List[List[int]] = []
+        columns_by_keyword: Dict[str, List[int]] = {}
+        for column, keywords in enumerate(categories.values()):
+            for keyword in keywords:
+                if keyword not in columns_by_keyword:
+                    columns_by_keyword[keyword] = []
+                    self.keywords.append(keyword)
+                    self.keyword_columns.append(columns_by_keyword[keyword])
+                if column not in columns_by_keyword[keyword]:
+                    columns_by_keyword[keyword].append(column)
+
+        self.use_numpy = NUMPY_AVAILABLE if use_numpy is None else use_numpy
+        if self.use_numpy and not NUMPY_AVAILABLE:
+            raise RuntimeError("未安装NumPy")
+        self._incidence = None
+        if self.use_numpy:
+            incidence = np.zeros((len(self.keywords), len(self.categories)), np.int32)
+            for row, columns in enumerate(self.keyword_columns):
+                incidence[row, columns] = 1
+            self._incidence = incidence
+
+    def counts(self, texts: Sequence[str]):
+        """
+        统计每条文本命中各类别的关键词个数.
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            文本×类别的计数矩阵：使用NumPy时为 ``numpy.ndarray``，
+            否则为嵌套列表
+        """
+        pairs = self._hit_pairs(texts)
+        if self.use_numpy:
+            present = np.zeros((len(texts), len(self.keywords)), np.int32)
+            if pairs:
+                rows, columns = zip(*pairs)
+                present[list(rows), list(columns)] = 1
+            return present @ self._incidence
+
+        counts = [[0] * len(self.categories) for _ in texts]
+        keyword_columns = self.keyword_columns
+        for text_index, keyword_index in pairs:
+            row = counts[text_index]
+            for column in keyword_columns[keyword_index]:
+                row[column] += 1
+        return counts
+
+    def best(self, texts: Sequence[str]) -> List[Optional[str]]:
+        """
+        返回每条文本命中关键词最多的类别.
+
+        并列时取类别顺序靠前的一个（与 ``Counter.most_common`` 一致），
+        没有任何命中时为None。
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            List[Optional[str]]: 与 ``texts`` 一一对应
+        """
+        counts = self.counts(texts)
+        categories = self.categories
+        if self.use_numpy:
+            if not len(texts) or not categories:
+                return [None] * len(texts)
+            columns = counts.argmax(axis=1).tolist()
+            matched = (counts.max(axis=1) > 0).tolist()
+            return [
+                categories[column] if hit else None
+                for column, hit in zip(columns, matched)
+            ]
+
+        result = []
+        for row in counts:
+            top = max(row, default=0)
+            result.append(categories[row.index(top)] if top > 0 else None)
+        return result
+
+    def _hit_pairs(self, texts: Sequence[str]) -> List[tuple]:
+        """在拼接后的整批文本上逐个查找关键词，返回 (文本编号, 关键词编号)."""
+        if not texts:
+            return []
+        starts = []
+        position = 0
+        for text in texts:
+            starts.append(position)
+            position += len(text) + 1
+        joined = SEPARATOR.join(texts)
+
+        pairs = []
+        for keyword_index, keyword in enumerate(self.keywords):
+            found = joined.find(keyword)
+            while found >= 0:
+                text_index = bisect_right(starts, found) - 1
+                pairs.append((text_index, keyword_index))
+                # 只需知道是否命中，直接跳到下一条文本
+                if text_index + 1 >= len(starts):
+                    break
+                found = joined.find(keyword, starts[text_index + 1])
+        return pairs
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""心理学知识库数据 (KnowledgeBase) - 每个进程只加载一次的只读知识数据.
+
+``psyas/data`` 下的JSON文件在进程内只读取和解析一次，
+所有服务、MCP服务器和路由通过 ``get_knowledge_base()`` 共享同一份数据；
+数据文件更新后可调用 ``reload_knowledge_base()`` 显式重新加载。
+修改数据文件后可用 ``flask kb check`` 校验数据结构。
+
+gunicorn预加载应用（``GUNICORN_PRELOAD``）时知识库在master进程中加载并
+``gc.freeze()``，worker通过fork共享这些内存页，见 ``psyas.prefork``。
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from psyas.services.keyword_automaton import KeywordAutomaton
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+FRAMEWORKS_FILE = "psychology_frameworks.json"
+ISSUES_FILE = "psychological_issues.json"
+
+# 问题条目中必须是字符串列表的字段
+ISSUE_LIST_FIELDS = ("keywords", "immediate_responses", "follow_up_questions")
+
+# 直接危机关键词
+CRISIS_KEYWORDS = [
+    "自杀",
+    "伤害自己",
+    "想死",
+    "结束生命",
+    "轻生",
+    "自残",
+    "不想活",
+    "活着没意思",
+]
+
+# 间接危机组合词：生活相关词 + 痛苦词 + 结束词
+CRISIS_COMBINATION_WORDS = {
+    "生活": ["活着", "人生", "生活", "存在"],
+    "痛苦": ["痛苦", "难受", "煎熬", "折磨"],
+    "结束": ["结束", "解脱", "逃离", "放弃"],
+}
+
+# 特殊组合规则：(话题标签, 话题关键词, 情绪标签, 情绪关键词, 情绪类型, 建议框架)
+SPECIAL_COMBINATIONS = [
+    (
+        "工作",
+        ["工作", "上班", "职场"],
+        "焦虑",
+        ["焦虑", "担心", "紧张"],
+        "焦虑",
+        "正念疗法",
+    ),
+    (
+        "恋爱",
+        ["分手", "男朋友", "女朋友", "恋人"],
+        "抑郁",
+        ["难过", "绝望", "沮丧", "抑郁"],
+        "抑郁",
+        "CBT",
+    ),
+]
+
+# 自动机中使用的内部类别标签
+CRISIS_CATEGORY = "危机"
+CRISIS_DIRECT_ISSUE = "直接"
+COMBINATION_CATEGORY = "组合"
+
+
+class KnowledgeBaseError(ValueError):
+    """知识数据无法读取或校验失败."""
+
+
+@dataclass(frozen=True)
+class KnowledgeBase:
+    """只读知识库：框架数据、问题分类数据及编译好的关键词自动机.
+
+    实例在进程内共享，调用方不得修改其中的字典和列表。
+    """
+
+    frameworks: Dict
+    issues: Dict
+    automaton: KeywordAutomaton
+
+    @classmethod
+    def load(cls, data_dir: str = DATA_DIR) -> "KnowledgeBase":
+        """从数据目录读取JSON文件并构建知识库."""
+        frameworks = _load_json(os.path.join(data_dir, FRAMEWORKS_FILE), "框架文件")
+        issues = _load_json(os.path.join(data_dir, ISSUES_FILE), "问题分类文件")
+        return cls(
+            frameworks=frameworks,
+            issues=issues,
+            automaton=build_keyword_automaton(issues),
+        )
+
+
+def _load_json(path: str, description: str) -> Dict:
+    """读取JSON数据文件，文件缺失或格式错误时返回空字典."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"警告：找不到{description} {path}")
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"警告：{description}格式错误 {e}")
+        return {}
+
+
+def check_data_dir(data_dir: str = DATA_DIR) -> Dict:
+    """
+    严格读取并校验数据目录中的JSON文件（加载时的容错不适用于此）.
+
+    Args:
+        data_dir: 数据目录
+
+    Returns:
+        Dict: 框架数、问题数和自动机状态数
+
+    Raises:
+        KnowledgeBaseError: 文件缺失、JSON格式错误或数据校验失败
+    """
+    try:
+        with open(os.path.join(data_dir, FRAMEWORKS_FILE), encoding="utf-8") as f:
+            frameworks = json.load(f)
+        with open(os.path.join(data_dir, ISSUES_FILE), encoding="utf-8") as f:
+            issues = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise KnowledgeBaseError(f"无法读取知识数据: {e}") from e
+
+    errors = validate_knowledge_data(frameworks, issues)
+    if errors:
+        raise KnowledgeBaseError("知识数据校验失败:\n" + "\n".join(errors))
+    return {
+        "frameworks": len(frameworks),
+        "issues": sum(len(category) for category in issues.values()),
+        "states": build_keyword_automaton(issues).state_count,
+    }
+
+
+def validate_knowledge_data(frameworks: Dict, issues: Dict) -> List[str]:
+    """
+    校验知识数据结构.
+
+    Returns:
+        List[str]: 错误描述，为空表示校验通过
+    """
+    errors = []
+    if not isinstance(frameworks, dict) or not frameworks:
+        errors.append("框架数据必须是非空对象")
+        frameworks = {}
+    if not isinstance(issues, dict) or not issues:
+        errors.append("问题分类数据必须是非空对象")
+        issues = {}
+
+    for key, framework in frameworks.items():
+        errors.extend(_validate_framework(key, framework))
+
+    for category_name, category in issues.items():
+        if not isinstance(category, dict):
+            errors.append(f"问题类别 {category_name} 必须是对象")
+            continue
+        for issue_name, issue in category.items():
+            errors.extend(
+                _validate_issue(f"{category_name}/{issue_name}", issue, frameworks)
+            )
+    return errors
+
+
+def _validate_framework(key: str, framework: Dict) -> List[str]:
+    """校验单个框架条目."""
+    if not isinstance(framework, dict):
+        return [f"框架 {key} 必须是对象"]
+
+    errors = []
+    if not isinstance(framework.get("name"), str) or not framework["name"]:
+        errors.append(f"框架 {key} 缺少name")
+    for technique in framework.get("intervention_techniques", []):
+        if not isinstance(technique, dict) or not technique.get("name"):
+            errors.append(f"框架 {key} 的干预技术缺少name")
+    return errors
+
+
+def _validate_issue(where: str, issue: Dict, frameworks: Dict) -> List[str]:
+    """校验单个问题条目."""
+    if not isinstance(issue, dict):
+        return [f"问题 {where} 必须是对象"]
+
+    errors = []
+    for field in ISSUE_LIST_FIELDS:
+        values = issue.get(field, [])
+        if not isinstance(values, list) or not all(
+            isinstance(value, str) and value for value in values
+        ):
+            errors.append(f"问题 {where} 的 {field} 必须是非空字符串列表")
+    if not issue.get("keywords"):
+        errors.append(f"问题 {where} 没有关键词")
+    framework = issue.get("suggested_framework")
+    if framework is not None and framework not in frameworks:
+        errors.append(f"问题 {where} 建议的框架 {framework} 不存在")
+    return errors
+
+
+def build_keyword_automaton(issues: Dict) -> KeywordAutomaton:
+    """构建覆盖问题、危机和组合规则关键词的自动机."""
+    automaton = KeywordAutomaton()
+
+    for category_name, category_data in issues.items():
+        for issue_name, issue_data in category_data.items():
+            for keyword in issue_data.get("keywords", []):
+                automaton.add(keyword, category_name, issue_name)
+
+    for keyword in CRISIS_KEYWORDS:
+        automaton.add(keyword, CRISIS_CATEGORY, CRISIS_DIRECT_ISSUE)
+    for group_name, words in CRISIS_COMBINATION_WORDS.items():
+        for word in words:
+            automaton.add(word, CRISIS_CATEGORY, group_name)
+
+    for topic, topic_keywords, mood, mood_keywords, _, _ in SPECIAL_COMBINATIONS:
+        for keyword in topic_keywords:
+            automaton.add(keyword, COMBINATION_CATEGORY, topic)
+        for keyword in mood_keywords:
+            automaton.add(keyword, COMBINATION_CATEGORY, mood)
+
+    return automaton.build()
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """获取进程内共享的知识库（首次调用时加载）."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase.load()
+    return _knowledge_base
+
+
+def reload_knowledge_base(data_dir: str = DATA_DIR) -> KnowledgeBase:
+    """重新加载知识库并替换共享实例，已有服务在下一次调用时即使用新数据."""
+    global _knowledge_base
+    knowledge_base = KnowledgeBase.load(data_dir)
+    with _lock:
+        _knowledge_base = knowledge_base
+    return knowledge_base
@@ -1,10 +1,21 @@
 # -*- coding: utf-8 -*-
 """心理学知识库服务 (KnowledgeService) - 提供专业心理学知识支持."""
-import json
-import os
+import threading
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
+from psyas.services.keyword_automaton import KeywordAutomaton, KeywordHits
+from psyas.services.knowledge_base import (
+    COMBINATION_CATEGORY,
+    CRISIS_CATEGORY,
+    CRISIS_COMBINATION_WORDS,
+    CRISIS_DIRECT_ISSUE,
+    CRISIS_KEYWORDS,
+    SPECIAL_COMBINATIONS,
+    KnowledgeBase,
+    get_knowledge_base,
+)
+
 
 @dataclass
 class KnowledgeMatch:
@@ -21,52 +32,43 @@ class KnowledgeMatch:
 class KnowledgeService:
     """心理学知识库服务类，负责匹配心理学知识并提供专业建议."""
 
-    def __init__(self):
-        """初始化知识库服务."""
-        self.frameworks = self._load_frameworks()
-        self.issues = self._load_issues()
+    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None):
+        """初始化知识库服务.
+
+        Args:
+            knowledge_base: 指定使用的知识库；为None时使用进程内共享的知识库，
+                并在 ``reload_knowledge_base()`` 之后自动使用新数据
+        """
+        self._knowledge_base = knowledge_base
 
         # 危机关键词检测
-        self.crisis_keywords = [
-            "自杀",
-            "伤害自己",
-            "想死",
-            "结束生命",
-            "轻生",
-            "自残",
-            "不想活",
-            "活着没意思",
-        ]
-
-    def _load_frameworks(self) -> Dict:
-        """加载心理学框架数据."""
-        frameworks_path = os.path.join(
-            os.path.dirname(__file__), "../data/psychology_frameworks.json"
-        )
-        try:
-            with open(frameworks_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"警告：找不到框架文件 {frameworks_path}")
-            return {}
-        except json.JSONDecodeError as e:
-            print(f"警告：框架文件格式错误 {e}")
-            return {}
-
-    def _load_issues(self) -> Dict:
-        """加载心理问题分类数据."""
-        issues_path = os.path.join(
-            os.path.dirname(__file__), "../data/psychological_issues.json"
-        )
-        try:
-            with open(issues_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"警告：找不到问题分类文件 {issues_path}")
-            return {}
-        except json.JSONDecodeError as e:
-            print(f"警告：问题分类文件格式错误 {e}")
-            return {}
+        self.crisis_keywords = list(CRISIS_KEYWORDS)
+
+    @property
+    def knowledge_base(self) -> KnowledgeBase:
+        """当前使用的知识库."""
+        if self._knowledge_base is not None:
+            return self._knowledge_base
+        return get_knowledge_base()
+
+    @property
+    def frameworks(self) -> Dict:
+        """心理学框架数据."""
+        return self.knowledge_base.frameworks
+
+    @property
+    def issues(self) -> Dict:
+        """心理问题分类数据."""
+        return self.knowledge_base.issues
+
+    @property
+    def keyword_automaton(self) -> KeywordAutomaton:
+        """覆盖问题、危机和组合关键词的自动机，一次扫描得到全部命中."""
+        return self.knowledge_base.automaton
+
+    def scan(self, user_input: str) -> KeywordHits:
+        """对用户输入做一次多模式扫描，返回全部关键词命中."""
+        return self.keyword_automaton.search(user_input.lower())
 
     def analyze_user_input(
         self, user_input: str, detected_emotion: str = None
@@ -81,13 +83,22 @@ class KnowledgeService:
         Returns:
             KnowledgeMatch: 匹配结果，如果没有匹配则返回None
         """
+        if self._knowledge_base is None:
+            # 固定本次分析使用的知识库版本，分析中途reload时不会混用新旧数据
+            pinned = KnowledgeService(self.knowledge_base)
+            return pinned.analyze_user_input(user_input, detected_emotion)
+
+        # 0. 一次扫描得到全部关键词命中，后续判断都基于命中集合
+        hits = self.scan(user_input)
 
         # 1. 危机检测
-        if self._is_crisis_situation(user_input):
+        if self._is_crisis_situation(user_input, hits):
             return self._get_crisis_response()
 
         # 2. 匹配心理问题
-        matched_issue = self._match_psychological_issue(user_input, detected_emotion)
+        matched_issue = self._match_psychological_issue(
+            user_input, detected_emotion, hits
+        )
         if not matched_issue:
             return self._get_default_response(detected_emotion)
 
@@ -99,7 +110,7 @@ class KnowledgeService:
         framework = self.frameworks[framework_name]
 
         # 4. 计算匹配度
-        confidence = self._calculate_confidence(user_input, matched_issue)
+        confidence = self._calculate_confidence(user_input, matched_issue, hits)
 
         # 5. 选择合适的回应模板
         response_template = self._select_response_template(matched_issue, framework)
@@ -122,41 +133,22 @@ class KnowledgeService:
             immediate_response=immediate_response,
         )
 
-    def _is_crisis_situation(self, user_input: str) -> bool:
+    def _is_crisis_situation(
+        self, user_input: str, hits: Optional[KeywordHits] = None
+    ) -> bool:
         """检测是否为危机情况."""
-        user_input_lower = user_input.lower()
-
-        # 直接危机关键词
-        direct_crisis = [
-            "自杀",
-            "伤害自己",
-            "想死",
-            "结束生命",
-            "轻生",
-            "自残",
-            "不想活",
-            "活着没意思",
-        ]
-
-        # 间接危机组合词
-        pain_words = ["痛苦", "难受", "煎熬", "折磨"]
-        life_words = ["活着", "人生", "生活", "存在"]
-        end_words = ["结束", "解脱", "逃离", "放弃"]
+        hits = hits if hits is not None else self.scan(user_input)
 
         # 检查直接危机关键词
-        if any(keyword in user_input_lower for keyword in direct_crisis):
+        if hits.has_issue(CRISIS_CATEGORY, CRISIS_DIRECT_ISSUE):
             return True
 
         # 检查间接危机组合：生活相关词 + 痛苦词 + 结束词
-        has_life = any(word in user_input_lower for word in life_words)
-        has_pain = any(word in user_input_lower for word in pain_words)
-        has_end = any(word in user_input_lower for word in end_words)
-
         # 如果同时包含生活词、痛苦词和结束词，判定为危机
-        if has_life and has_pain and has_end:
-            return True
-
-        return False
+        return all(
+            hits.has_issue(CRISIS_CATEGORY, group_name)
+            for group_name in CRISIS_COMBINATION_WORDS
+        )
 
     def _get_crisis_response(self) -> KnowledgeMatch:
         """获取危机情况的回应."""
@@ -180,7 +172,10 @@ class KnowledgeService:
         )
 
     def _match_psychological_issue(
-        self, user_input: str, detected_emotion: str = None
+        self,
+        user_input: str,
+        detected_emotion: str = None,
+        hits: Optional[KeywordHits] = None,
     ) -> Optional[Dict]:
         """
         匹配心理问题类型.
@@ -190,35 +185,27 @@ class KnowledgeService:
         2. 问题类（具体问题领域）
         3. 情绪类（情绪状态）
         """
+        hits = hits if hits is not None else self.scan(user_input)
+
         # 检查特殊组合规则
-        special_match = self._check_special_combinations(user_input)
+        special_match = self._check_special_combinations(user_input, hits)
         if special_match:
             return special_match
 
         # 标准匹配流程
-        return self._standard_issue_matching(user_input, detected_emotion)
-
-    def _check_special_combinations(self, user_input: str) -> Optional[Dict]:
-        """检查特殊组合规则."""
-        user_input_lower = user_input.lower()
+        return self._standard_issue_matching(user_input, detected_emotion, hits)
 
-        # 特殊组合规则：工作压力+焦虑情绪 -> 正念疗法
-        work_keywords = ["工作", "上班", "职场"]
-        anxiety_keywords = ["焦虑", "担心", "紧张"]
-
-        if any(kw in user_input_lower for kw in work_keywords) and any(
-            kw in user_input_lower for kw in anxiety_keywords
-        ):
-            return self._create_modified_issue_data("焦虑", "正念疗法")
-
-        # 特殊组合规则：分手+抑郁情绪 -> CBT
-        relationship_keywords = ["分手", "男朋友", "女朋友", "恋人"]
-        depression_keywords = ["难过", "绝望", "沮丧", "抑郁"]
+    def _check_special_combinations(
+        self, user_input: str, hits: Optional[KeywordHits] = None
+    ) -> Optional[Dict]:
+        """检查特殊组合规则（工作压力+焦虑 -> 正念疗法，分手+抑郁 -> CBT）."""
+        hits = hits if hits is not None else self.scan(user_input)
 
-        if any(kw in user_input_lower for kw in relationship_keywords) and any(
-            kw in user_input_lower for kw in depression_keywords
-        ):
-            return self._create_modified_issue_data("抑郁", "CBT")
+        for topic, _, mood, _, emotion_type, framework in SPECIAL_COMBINATIONS:
+            if hits.has_issue(COMBINATION_CATEGORY, topic) and hits.has_issue(
+                COMBINATION_CATEGORY, mood
+            ):
+                return self._create_modified_issue_data(emotion_type, framework)
 
         return None
 
@@ -234,18 +221,21 @@ class KnowledgeService:
         return None
 
     def _standard_issue_matching(
-        self, user_input: str, detected_emotion: str = None
+        self,
+        user_input: str,
+        detected_emotion: str = None,
+        hits: Optional[KeywordHits] = None,
     ) -> Optional[Dict]:
         """标准问题匹配流程."""
-        user_input_lower = user_input.lower()
+        hits = hits if hits is not None else self.scan(user_input)
 
         # 优先匹配问题类
-        issue_match = self._match_issue_category(user_input_lower, "问题类")
+        issue_match = self._match_issue_category(hits, "问题类")
         if issue_match:
             return issue_match
 
         # 其次匹配情绪类
-        emotion_match = self._match_issue_category(user_input_lower, "情绪类")
+        emotion_match = self._match_issue_category(hits, "情绪类")
         if emotion_match:
             return emotion_match
 
@@ -258,29 +248,25 @@ class KnowledgeService:
         return None
 
     def _match_issue_category(
-        self, user_input_lower: str, category_name: str
+        self, hits: KeywordHits, category_name: str
     ) -> Optional[Dict]:
-        """匹配特定类别的问题."""
+        """匹配特定类别的问题（按数据文件中的顺序返回第一个命中的问题）."""
         category_data = self.issues.get(category_name, {})
         for issue_name, issue_data in category_data.items():
-            keywords = issue_data.get("keywords", [])
-            for keyword in keywords:
-                if keyword in user_input_lower:
-                    return issue_data
+            if hits.has_issue(category_name, issue_name):
+                return issue_data
         return None
 
-    def _calculate_confidence(self, user_input: str, issue_data: Dict) -> float:
+    def _calculate_confidence(
+        self, user_input: str, issue_data: Dict, hits: Optional[KeywordHits] = None
+    ) -> float:
         """计算匹配置信度."""
         keywords = issue_data.get("keywords", [])
         if not keywords:
             return 0.0
 
-        matched_keywords = 0
-        user_input_lower = user_input.lower()
-
-        for keyword in keywords:
-            if keyword in user_input_lower:
-                matched_keywords += 1
+        hits = hits if hits is not None else self.scan(user_input)
+        matched_keywords = hits.count_keywords(keywords)
 
         confidence = matched_keywords / len(keywords)
 
@@ -424,3 +410,17 @@ class KnowledgeService:
                 "不替代专业治疗",
             ],
         }
+
+
+_shared_service: Optional[KnowledgeService] = None
+_shared_lock = threading.Lock()
+
+
+def get_knowledge_service() -> KnowledgeService:
+    """获取进程内共享的知识库服务实例."""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = KnowledgeService()
+    return _shared_service
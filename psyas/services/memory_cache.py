@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""Agent记忆缓存 (MemoryCache) - 带容量上限和过期时间的对话记忆缓存.
+
+默认使用进程内LRU缓存；开启 ``AGENT_MEMORY_SHARED_CACHE`` 后改为通过
+Flask-Caching 的 ``cache`` 扩展读写（本地为SimpleCache，生产环境可配置为
+Redis），使多个gunicorn worker共享同一份最近对话记忆。
+
+开启 ``versioned`` 的进程内缓存在 ``cache`` 中为每个键保存一个版本号：
+``replace``/``invalidate`` 写入新版本号，其他worker读取时发现版本号变化就
+丢弃自己的副本，下次从数据库重新读取。
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from flask import has_app_context
+
+from psyas.extensions import CACHE_ERRORS, cache
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 300
+DEFAULT_KEY_PREFIX = "agent_memory:"
+
+
+class MemoryCache:
+    """按用户ID缓存最近对话记忆，支持LRU淘汰、TTL过期和命中统计."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: int = DEFAULT_TTL,
+        shared: bool = False,
+        key_prefix: str = DEFAULT_KEY_PREFIX,
+        versioned: bool = False,
+    ):
+        """初始化记忆缓存.
+
+        Args:
+            max_entries: 本地缓存最多保留的用户数
+            ttl: 每条记忆的有效期（秒）
+            shared: 是否使用Flask-Caching共享后端
+            key_prefix: 共享后端中的键前缀
+            versioned: 进程内模式下是否通过共享版本号使其他worker的副本失效
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self.key_prefix = key_prefix
+        self.versioned = versioned
+
+        # user_id -> (过期时间, 写入时的版本号, 记忆)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def init_app(self, app):
+        """从应用配置读取缓存参数."""
+        self.max_entries = app.config.get(
+            "AGENT_MEMORY_CACHE_SIZE", DEFAULT_MAX_ENTRIES
+        )
+        self.ttl = app.config.get("AGENT_MEMORY_CACHE_TTL", DEFAULT_TTL)
+        self.shared = app.config.get("AGENT_MEMORY_SHARED_CACHE", False)
+        self.clear()
+
+    def get(self, user_id: int) -> Optional[List[Dict]]:
+        """获取用户的记忆，未命中或已过期时返回None."""
+        if self.shared:
+            memory = cache.get(self._key(user_id))
+        else:
+            memory = self._get_local(user_id, touch=True)
+
+        with self._lock:
+            if memory is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return memory
+
+    def peek(self, user_id: int) -> Optional[List[Dict]]:
+        """获取用户的记忆（不影响统计和LRU顺序），未命中时返回None."""
+        if self.shared:
+            return cache.get(self._key(user_id))
+        return self._get_local(user_id, touch=False)
+
+    def set(self, user_id: int, memory: List[Dict]) -> None:
+        """写入用户的记忆."""
+        if self.shared:
+            cache.set(self._key(user_id), memory, timeout=self.ttl)
+            return
+        self._set_local(user_id, memory, self._shared_version(user_id))
+
+    def replace(self, user_id: int, memory: List[Dict]) -> None:
+        """
+        用户有新对话后写入更新过的记忆，并使其他worker缓存的旧记忆失效.
+
+        共享模式下是"读取-修改-写入"：两个worker同时为同一用户保存对话时，
+        后写入的一方会覆盖另一方新加的那条记忆，直到TTL到期或下一次失效后
+        从数据库重新读取才会补上。同一用户的请求很少并发，这里不加分布式锁。
+        """
+        if self.shared:
+            self.set(user_id, memory)
+            return
+        self._set_local(user_id, memory, self._bump_version(user_id))
+
+    def invalidate(self, user_id: int) -> None:
+        """删除用户的记忆（开启versioned时同时通知其他worker）."""
+        if self.shared:
+            cache.delete(self._key(user_id))
+            return
+
+        self._bump_version(user_id)
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """清空本地缓存和统计数据."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> Dict:
+        """返回缓存统计信息."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "shared" if self.shared else "local",
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __contains__(self, user_id: int) -> bool:
+        """判断用户记忆是否在缓存中（不影响统计和LRU顺序）."""
+        if self.shared:
+            return cache.has(self._key(user_id))
+        return self.peek(user_id) is not None
+
+    def _get_local(self, user_id: int, touch: bool) -> Optional[List[Dict]]:
+        """从本地LRU读取，过期或版本号已变化的条目会被删除."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, version, memory = entry
+        expired = expires_at <= time.monotonic()
+        if not expired and version == self._shared_version(user_id, version):
+            if touch:
+                with self._lock:
+                    if user_id in self._entries:
+                        self._entries.move_to_end(user_id)
+            return memory
+
+        with self._lock:
+            # 只删除读到的那一条，期间其他线程写入的新记忆保留
+            if self._entries.get(user_id) is entry:
+                del self._entries[user_id]
+                if expired and touch:
+                    self.expirations += 1
+        return None
+
+    def _set_local(self, user_id: int, memory: List[Dict], version) -> None:
+        """写入本地LRU，超过容量时淘汰最久未使用的用户."""
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, version, memory)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _shared_version(self, user_id: int, default=None):
+        """读取共享版本号，未开启或缓存不可用时返回default（视为未变化）."""
+        if not self.versioned or not has_app_context():
+            return default
+        try:
+            return cache.get(self._version_key(user_id))
+        except CACHE_ERRORS as e:
+            print(f"警告：读取记忆版本号失败: {str(e)}")
+            return default
+
+    def _bump_version(self, user_id: int):
+        """写入新的共享版本号并返回，未开启或缓存不可用时返回None."""
+        if not self.versioned or not has_app_context():
+            return None
+        version = uuid.uuid4().hex
+        try:
+            # 版本号比记忆多保留一个TTL，保证所有旧副本过期前都能看到变化
+            cache.set(self._version_key(user_id), version, timeout=2 * self.ttl)
+        except CACHE_ERRORS as e:
+            print(f"警告：更新记忆版本号失败: {str(e)}")
+            return None
+        return version
+
+    def _key(self, user_id: int) -> str:
+        """共享后端中的缓存键."""
+        return f"{self.key_prefix}{user_id}"
+
+    def _version_key(self, user_id: int) -> str:
+        """共享后端中的版本号键."""
+        return f"{self.key_prefix}version:{user_id}"
+
+
+# 进程内共享的Agent记忆缓存，在 create_app 中通过 init_app 读取配置
+agent_memory_cache = MemoryCache(versioned=True)
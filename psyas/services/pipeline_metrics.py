@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Agent流程耗时统计 (PipelineMetrics) - 记录各阶段延迟和命中的回复分支.
+
+每个阶段按固定分桶累计耗时直方图（与Prometheus histogram格式一致），
+记录一次只需一次二分查找和一次加锁计数，可常驻开启。统计数据保存在
+进程内，多worker部署时每个worker分别统计。
+"""
+import bisect
+import threading
+import time
+from typing import Dict, Optional
+
+# 直方图分桶上界（秒）
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+METRIC_PREFIX = "psyas_agent"
+
+
+class _StageHistogram:
+    """单个阶段的耗时直方图."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self, bucket_count: int):
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (bucket_count + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class _StageTimer:
+    """``with metrics.stage(name):`` 使用的计时器."""
+
+    __slots__ = ("_metrics", "_name", "_started")
+
+    def __init__(self, metrics: "PipelineMetrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe(self._name, time.perf_counter() - self._started)
+        return False
+
+
+class PipelineMetrics:
+    """按阶段统计耗时，并统计各回复来源（分支）和错误次数."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """初始化统计.
+
+        Args:
+            buckets: 直方图分桶上界（秒），需递增
+        """
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _StageHistogram] = {}
+        self._branches: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def stage(self, name: str) -> _StageTimer:
+        """返回记录一个阶段耗时的上下文管理器."""
+        return _StageTimer(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        """记录一个阶段的耗时."""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._stages.get(name)
+            if histogram is None:
+                histogram = self._stages[name] = _StageHistogram(len(self.buckets))
+            histogram.counts[index] += 1
+            histogram.count += 1
+            histogram.total += seconds
+            if seconds > histogram.max:
+                histogram.max = seconds
+
+    def record_branch(self, source: str) -> None:
+        """记录最终生成回复的分支（AgentResult.source）."""
+        with self._lock:
+            self._branches[source] = self._branches.get(source, 0) + 1
+
+    def record_error(self, kind: str) -> None:
+        """记录一次失败的请求."""
+        with self._lock:
+            self._errors[kind] = self._errors.get(kind, 0) + 1
+
+    def reset(self) -> None:
+        """清空全部统计."""
+        with self._lock:
+            self._stages.clear()
+            self._branches.clear()
+            self._errors.clear()
+
+    def snapshot(self) -> Dict:
+        """返回统计快照（JSON友好，耗时单位为毫秒）."""
+        with self._lock:
+            stages = {
+                name: self._summarize(histogram)
+                for name, histogram in self._stages.items()
+            }
+            return {
+                "stages": stages,
+                "branches": dict(self._branches),
+                "errors": dict(self._errors),
+            }
+
+    def render_prometheus(self) -> str:
+        """按Prometheus文本格式输出统计."""
+        duration = f"{METRIC_PREFIX}_stage_duration_seconds"
+        branches = f"{METRIC_PREFIX}_response_source_total"
+        errors = f"{METRIC_PREFIX}_errors_total"
+        lines = [
+            f"# HELP {duration} Agent pipeline stage latency.",
+            f"# TYPE {duration} histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{duration}_bucket{{stage="{name}",le="{bound:g}"}} '
+                        f"{cumulative}"
+                    )
+                lines.append(
+                    f'{duration}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f'{duration}_sum{{stage="{name}"}} {histogram.total:.6f}')
+                lines.append(f'{duration}_count{{stage="{name}"}} {histogram.count}')
+
+            lines.append(f"# HELP {branches} Replies produced by each pipeline branch.")
+            lines.append(f"# TYPE {branches} counter")
+            for source, count in sorted(self._branches.items()):
+                lines.append(f'{branches}{{source="{source}"}} {count}')
+
+            lines.append(f"# HELP {errors} Failed agent requests.")
+            lines.append(f"# TYPE {errors} counter")
+            for kind, count in sorted(self._errors.items()):
+                lines.append(f'{errors}{{kind="{kind}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def _summarize(self, histogram: _StageHistogram) -> Dict:
+        """汇总单个阶段（调用方持有锁）."""
+        return {
+            "count": histogram.count,
+            "total_ms": round(histogram.total * 1000, 3),
+            "mean_ms": round(histogram.total * 1000 / histogram.count, 3),
+            "max_ms": round(histogram.max * 1000, 3),
+            "p50_ms": self._quantile_ms(histogram, 0.5),
+            "p95_ms": self._quantile_ms(histogram, 0.95),
+            "p99_ms": self._quantile_ms(histogram, 0.99),
+        }
+
+    def _quantile_ms(self, histogram: _StageHistogram, q: float) -> Optional[float]:
+        """按分桶估算分位数（返回所在桶的上界，超出最大分桶时返回最大值）."""
+        if not histogram.count:
+            return None
+        target = q * histogram.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, histogram.counts):
+            cumulative += count
+            if cumulative >= target:
+                return round(min(bound, histogram.max) * 1000, 3)
+        return round(histogram.max * 1000, 3)
+
+
+agent_metrics = PipelineMetrics()
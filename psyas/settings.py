@@ -32,6 +32,11 @@ SECRET_KEY = env.str(
     "SECRET_KEY", default="dev-secret-key"
 )  # 开发环境默认密钥（生产环境必须通过 .env 设置）
 BCRYPT_LOG_ROUNDS = env.int("BCRYPT_LOG_ROUNDS", default=13)  # 密码加密强度
+# 设置后启动时按单次哈希的目标耗时（毫秒）自动选择强度，覆盖 BCRYPT_LOG_ROUNDS
+BCRYPT_TARGET_MS = env.int("BCRYPT_TARGET_MS", default=0)
+# 执行bcrypt的线程数和最大排队数（超出时登录接口返回503）
+BCRYPT_POOL_SIZE = env.int("BCRYPT_POOL_SIZE", default=4)
+BCRYPT_QUEUE_DEPTH = env.int("BCRYPT_QUEUE_DEPTH", default=64)
 
 # JWT配置
 JWT_SECRET_KEY = env.str(
@@ -43,6 +48,10 @@ JWT_ACCESS_TOKEN_EXPIRES = timedelta(
 JWT_REFRESH_TOKEN_EXPIRES = timedelta(
     days=env.int("JWT_REFRESH_TOKEN_DAYS", default=30)
 )  # 刷新令牌过期时间，默认30天
+# 用户身份缓存：每个worker最多缓存的用户数、有效期（秒），是否跨worker共享
+USER_CACHE_SIZE = env.int("USER_CACHE_SIZE", default=4096)
+USER_CACHE_TTL = env.int("USER_CACHE_TTL", default=60)
+USER_CACHE_SHARED = env.bool("USER_CACHE_SHARED", default=False)
 JWT_BLACKLIST_ENABLED = env.bool(
     "JWT_BLACKLIST_ENABLED", default=True
 )  # 启用令牌黑名单
@@ -69,6 +78,28 @@ CACHE_TYPE = env.str(
 CACHE_REDIS_URL = env.str(
     "CACHE_REDIS_URL", default=""
 )  # 若用 Redis，通过环境变量配置地址
+# Agent记忆缓存：每个worker最多缓存的用户数、记忆有效期（秒）
+AGENT_MEMORY_CACHE_SIZE = env.int("AGENT_MEMORY_CACHE_SIZE", default=1024)
+AGENT_MEMORY_CACHE_TTL = env.int("AGENT_MEMORY_CACHE_TTL", default=300)
+# 是否通过上面的 cache 扩展跨worker共享记忆（多worker部署时配合 RedisCache 使用）
+AGENT_MEMORY_SHARED_CACHE = env.bool("AGENT_MEMORY_SHARED_CACHE", default=False)
+# 引导问题索引的有效期（秒）和检查共享版本号的间隔（秒）
+GUIDE_QUESTION_INDEX_TTL = env.int("GUIDE_QUESTION_INDEX_TTL", default=300)
+GUIDE_QUESTION_VERSION_CHECK_INTERVAL = env.int(
+    "GUIDE_QUESTION_VERSION_CHECK_INTERVAL", default=5
+)
+# 窗口分析：默认窗口轮数、每个worker缓存的窗口数、窗口整体重建间隔（秒）
+ANALYSIS_WINDOW_TURNS = env.int("ANALYSIS_WINDOW_TURNS", default=20)
+ANALYSIS_WINDOW_CACHE_SIZE = env.int("ANALYSIS_WINDOW_CACHE_SIZE", default=1024)
+ANALYSIS_WINDOW_TTL = env.int("ANALYSIS_WINDOW_TTL", default=600)
+# 对话批量延迟写入（write-behind）：默认关闭，每次对话同步写库
+CONVERSATION_WRITE_BEHIND = env.bool("CONVERSATION_WRITE_BEHIND", default=False)
+# 刷新间隔（毫秒）、每批最多行数、队列上限（超过后同步写入）
+CONVERSATION_FLUSH_INTERVAL_MS = env.int("CONVERSATION_FLUSH_INTERVAL_MS", default=50)
+CONVERSATION_FLUSH_BATCH_SIZE = env.int("CONVERSATION_FLUSH_BATCH_SIZE", default=200)
+CONVERSATION_QUEUE_SIZE = env.int("CONVERSATION_QUEUE_SIZE", default=5000)
+# 数据库暂时不可用时同一批记录最多重试的次数，超过后转入死信
+CONVERSATION_FLUSH_MAX_RETRIES = env.int("CONVERSATION_FLUSH_MAX_RETRIES", default=20)
 
 
 # 7. 跨域配置（前后端分离新增）
@@ -76,3 +107,11 @@ CACHE_REDIS_URL = env.str(
 CORS_ORIGINS = env.list("CORS_ORIGINS", default=["http://localhost:5000"])
 # 生产环境可通过 .env 文件设置为自己的前端域名，例如：
 # CORS_ORIGINS=["https://your-frontend.com"]
+
+
+# 8. MCP工具配置
+# 同步请求中等待MCP工具结果的超时时间（秒），超时后回退到知识库/基础回复
+MCP_TOOL_TIMEOUT = env.float("MCP_TOOL_TIMEOUT", default=5.0)
+# 数据库工具线程池大小和最大排队数；线程数不应超过数据库连接池大小
+MCP_DB_POOL_SIZE = env.int("MCP_DB_POOL_SIZE", default=4)
+MCP_DB_QUEUE_DEPTH = env.int("MCP_DB_QUEUE_DEPTH", default=32)
@@ -4,10 +4,11 @@ import datetime as dt
 
 from flask_jwt_extended import create_access_token, create_refresh_token
 from flask_login import UserMixin
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from psyas.database import Column, PkModel, db, reference_col, relationship
-from psyas.extensions import bcrypt
+from psyas.passwords import PasswordHasherBusy, password_hasher
 
 
 class Role(PkModel):
@@ -50,11 +51,31 @@ class User(UserMixin, PkModel):
     @password.setter
     def password(self, value):
         """Set password."""
-        self._password = bcrypt.generate_password_hash(value)
+        self._password = password_hasher.hash(value)
 
     def check_password(self, value):
         """Check password."""
-        return bcrypt.check_password_hash(self._password, value)
+        return password_hasher.verify(self._password, value)
+
+    def verify_password(self, value):
+        """登录时校验密码，成功且哈希强度低于当前配置时重新哈希并保存.
+
+        重新哈希只是顺带升级：线程池繁忙或保存失败时跳过，密码正确仍返回True。
+        """
+        if not self._password or not self.check_password(value):
+            return False
+        if password_hasher.needs_rehash(self._password):
+            try:
+                self.password = value
+                self.save()
+            except PasswordHasherBusy as e:
+                print(f"警告：跳过密码重新哈希: {str(e)}")
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                print(f"警告：保存重新哈希的密码失败: {str(e)}")
+            else:
+                password_hasher.record_rehash()
+        return True
 
     @property
     def full_name(self):
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Analysis service tests."""
+import pytest
+from sqlalchemy import event
+
+from psyas.commands import analyze_all
+from psyas.models.analysis import Analysis
+from psyas.models.conversation import BACKFILL_SOURCE, Conversation
+from psyas.services.analysis_service import AnalysisService
+from psyas.services.keyword_matrix import NUMPY_AVAILABLE, KeywordMatrix
+
+INPUTS = [
+    "最近工作压力很大，老板总是让我加班",
+    "和父母吵架了，很难过",
+    "考试没考好，很担心",
+    "今天很开心",
+]
+
+
+def add_conversations(db, user, count, analyzed=False):
+    """Insert conversations cycling through INPUTS."""
+    for i in range(count):
+        db.session.add(
+            Conversation(
+                user_id=user.id,
+                user_input=INPUTS[i % len(INPUTS)],
+                assistant_response="回复",
+                is_analyzed=analyzed,
+            )
+        )
+    db.session.commit()
+
+
+@pytest.mark.usefixtures("db")
+class TestBatchAnalysis:
+    """Batch analysis of unanalysed conversations."""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_matches_single_analysis(self, db, user, workers):
+        """Batch results match per-conversation analysis and flip is_analyzed."""
+        add_conversations(db, user, 11)
+        add_conversations(db, user, 2, analyzed=True)
+
+        service = AnalysisService()
+        result = service.analyze_unanalyzed_conversations(chunk_size=4, workers=workers)
+
+        assert result["code"] == 200
+        assert result["data"]["analyzed"] == 11
+        assert result["data"]["chunks"] == 3
+        assert Conversation.query.filter_by(is_analyzed=False).count() == 0
+        assert Analysis.query.count() == 11
+        for analysis in Analysis.query:
+            expected = service._perform_analysis(analysis.conversation)
+            assert analysis.emotion == expected["emotion"]
+            assert analysis.core_issue == expected["core_issue"]
+            assert analysis.simple_conclusion == expected["conclusion"]
+
+    def test_limit_and_rerun(self, db, user):
+        """A limited run leaves the rest for the next run."""
+        add_conversations(db, user, 5)
+        service = AnalysisService()
+
+        first = service.analyze_unanalyzed_conversations(
+            chunk_size=2, workers=0, limit=3
+        )
+        assert first["data"]["analyzed"] == 3
+        second = service.analyze_unanalyzed_conversations(chunk_size=2, workers=0)
+        assert second["data"]["analyzed"] == 2
+        assert Analysis.query.count() == 5
+
+    def test_cli(self, app, db, user):
+        """The analyze-all command reports throughput."""
+        add_conversations(db, user, 3)
+        result = app.test_cli_runner().invoke(
+            analyze_all, ["--chunk-size", "2", "--workers", "0"]
+        )
+        assert result.exit_code == 0, result.output
+        assert "Analysed 3 conversations in 2 chunks" in result.output
+        assert Conversation.query.filter_by(is_analyzed=False).count() == 0
+
+    def test_uses_stored_emotion(self, db, user):
+        """The emotion detected during the conversation is reused."""
+        Conversation.create(
+            user_id=user.id,
+            user_input="今天和同事吃饭",
+            assistant_response="回复",
+            emotion="焦虑",
+            response_source="basic_enhanced",
+        )
+        AnalysisService().analyze_unanalyzed_conversations(workers=0)
+        assert Analysis.query.one().emotion == "焦虑"
+
+    def test_backfilled_emotion_is_reanalysed(self, db, user):
+        """Backfilled rows are analysed as they were before the backfill."""
+        Conversation.create(
+            user_id=user.id,
+            user_input="考试没考好，很担心",
+            assistant_response="回复",
+            emotion="快乐",
+            response_source=BACKFILL_SOURCE,
+        )
+        AnalysisService().analyze_unanalyzed_conversations(workers=0)
+        assert Analysis.query.one().emotion == "焦虑"
+
+
+@pytest.mark.usefixtures("db")
+class TestSingleAnalysis:
+    """Analysis of a single conversation."""
+
+    def test_one_transaction(self, db, user):
+        """Saving the analysis and flagging the conversation commit once."""
+        add_conversations(db, user, 1)
+        commits = []
+
+        def count(session):
+            commits.append(session)
+
+        event.listen(db.session, "after_commit", count)
+        try:
+            result = AnalysisService().analyze_user_conversations(user.id)
+        finally:
+            event.remove(db.session, "after_commit", count)
+
+        assert result["code"] == 200
+        assert len(commits) == 1
+        assert result["data"]["analysis_id"] == Analysis.query.one().id
+        assert Conversation.query.one().is_analyzed
+
+
+BACKENDS = [
+    False,
+    pytest.param(
+        True,
+        marks=pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy not installed"),
+    ),
+]
+
+
+class TestAnalyzeMany:
+    """Bulk analysis through the keyword incidence matrix."""
+
+    TEXTS = INPUTS + [
+        "",
+        "压力好大，好累，又紧张又担心",
+        "不知道怎么办",
+        "这是一段很长的日常记录" * 12,
+        "今天和朋友一起学习，又开心又紧张",
+    ]
+
+    @pytest.mark.parametrize("use_numpy", BACKENDS)
+    def test_matches_single_analysis(self, use_numpy):
+        """Results equal analysing each text on its own."""
+        service = AnalysisService()
+        service._emotion_matrix = KeywordMatrix(
+            service.emotion_keywords, use_numpy=use_numpy
+        )
+        service._issue_matrix = KeywordMatrix(
+            service.issue_keywords, use_numpy=use_numpy
+        )
+
+        expected = [service._analyze_text(text) for text in self.TEXTS]
+        assert service.analyze_many(self.TEXTS) == expected
+
+    def test_saved_emotion_wins(self):
+        """A stored emotion is kept instead of being re-detected."""
+        service = AnalysisService()
+        results = service.analyze_many(["今天很开心", "今天很开心"], ["焦虑", None])
+        assert [result["emotion"] for result in results] == ["焦虑", "快乐"]
+
+    @pytest.mark.parametrize("use_numpy", BACKENDS)
+    def test_keyword_counted_once_per_text(self, use_numpy):
+        """Repeated keywords count once; ties go to the first category."""
+        matrix = KeywordMatrix({"a": ["甲", "乙"], "b": ["乙", "丙"]}, use_numpy)
+        counts = matrix.counts(["甲甲乙", "丙", "丁", "乙"])
+        assert [list(row) for row in counts] == [[2, 1], [0, 1], [0, 0], [1, 1]]
+        assert matrix.best(["甲甲乙", "丙", "丁", "乙"]) == ["a", "b", None, "a"]
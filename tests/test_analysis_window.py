@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Windowed (multi-turn) analysis tests."""
+import datetime as dt
+
+import pytest
+
+from psyas.models.conversation import Conversation
+from psyas.services.analysis_service import AnalysisService
+from psyas.services.analysis_window import AnalysisWindows
+
+
+def add_turn(db, user, text, days_ago=0):
+    """Insert one conversation turn."""
+    conversation = Conversation(
+        user_id=user.id,
+        user_input=text,
+        assistant_response="回复",
+        created_at=dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days_ago),
+    )
+    db.session.add(conversation)
+    db.session.commit()
+    return conversation
+
+
+@pytest.fixture
+def service():
+    """An analysis service with its own window cache."""
+    service = AnalysisService()
+    service._windows = AnalysisWindows(default_turns=3)
+    return service
+
+
+@pytest.mark.usefixtures("db")
+class TestWindowAnalysis:
+    """AnalysisService.analyze_window tests."""
+
+    def test_aggregates_last_turns(self, db, user, service):
+        """Keyword hits are summed over the last N turns only."""
+        add_turn(db, user, "今天很开心")
+        add_turn(db, user, "工作压力很大，很担心")
+        add_turn(db, user, "老板让我加班，好紧张")
+        add_turn(db, user, "和同事沟通很担心")
+
+        data = service.analyze_window(user.id, turns=3)["data"]
+        assert data["turns"] == 3
+        assert data["emotion_counts"] == {"焦虑": 3, "压力": 1}
+        assert data["emotion"] == "焦虑"
+        assert data["core_issue"] == "工作压力"
+
+    def test_new_turn_is_scanned_incrementally(self, db, user, service):
+        """Only turns added since the last call are read and scanned."""
+        for text in ["很担心", "很开心", "很开心"]:
+            add_turn(db, user, text)
+        service.analyze_window(user.id, turns=3)
+        assert service._windows.scanned_turns == 3
+
+        add_turn(db, user, "很孤独")
+        data = service.analyze_window(user.id, turns=3)["data"]
+        assert service._windows.scanned_turns == 4
+        # The oldest turn left the window and its hits were subtracted
+        assert data["emotion_counts"] == {"快乐": 2, "孤独": 1}
+
+    def test_days_window(self, db, user, service):
+        """Turns older than the day limit are excluded."""
+        add_turn(db, user, "很担心", days_ago=10)
+        recent = add_turn(db, user, "很开心", days_ago=1)
+
+        data = service.analyze_window(user.id, days=7)["data"]
+        assert data["turns"] == 1
+        assert data["first_conversation_id"] == recent.id
+        assert data["emotion"] == "快乐"
+
+    def test_empty_window(self, user, service):
+        """A user without turns gets the neutral defaults."""
+        data = service.analyze_window(user.id)["data"]
+        assert data["turns"] == 0
+        assert (data["emotion"], data["core_issue"]) == ("中性", "日常分享")
+
+    def test_invalid_window(self, user, service):
+        """Out-of-range windows are rejected."""
+        assert service.analyze_window(user.id, turns=0)["code"] == 400
+        assert service.analyze_window(user.id, days=10_000)["code"] == 400
+
+    def test_endpoint(self, db, testapp, user):
+        """GET /api/analysis/window returns the aggregate."""
+        add_turn(db, user, "考试快到了，很担心")
+        token = user.generate_tokens()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        res = testapp.get("/api/analysis/window?turns=5", headers=headers)
+        assert res.json["data"]["core_issue"] == "学习问题"
+
+        res = testapp.get(
+            "/api/analysis/window?turns=0", headers=headers, expect_errors=True
+        )
+        assert res.status_int == 400
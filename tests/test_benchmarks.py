@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Hot path benchmark suite tests."""
+import json
+
+import pytest
+from sqlalchemy import inspect, text
+
+from benchmarks import load_test
+from benchmarks.db_indexes import INDEXED_TABLES, MIGRATION_INDEXES, set_indexes
+from benchmarks.hot_paths import CORPUS_KINDS, generate_corpus
+from benchmarks.load_test import parse_mix
+from psyas.commands import bench
+from psyas.services.knowledge_service import KnowledgeService
+
+
+class TestCorpus:
+    """Synthetic corpus generator tests."""
+
+    def test_deterministic(self):
+        """The same seed produces the same corpus."""
+        for kind in CORPUS_KINDS:
+            assert generate_corpus(kind, 20, seed=1) == generate_corpus(
+                kind, 20, seed=1
+            )
+
+    def test_kinds(self):
+        """Crisis inputs are detected and no-match inputs hit no keyword."""
+        service = KnowledgeService()
+        crisis = generate_corpus("crisis", 50)
+        assert all(service._is_crisis_situation(text) for text in crisis)
+        no_match = generate_corpus("no_match", 50)
+        assert not any(service.scan(text) for text in no_match)
+        long_texts = generate_corpus("long", 50)
+        short_texts = generate_corpus("short", 50)
+        assert min(map(len, long_texts)) > max(map(len, short_texts))
+
+
+def test_bench_command(app, tmp_path):
+    """The bench command runs every hot path and saves a baseline."""
+    output = tmp_path / "baseline.json"
+    runner = app.test_cli_runner()
+    result = runner.invoke(bench, ["-n", "5", "--size", "5", "-o", str(output)])
+    assert result.exit_code == 0, result.output
+
+    saved = json.loads(output.read_text(encoding="utf-8"))
+    assert set(saved["results"]["knowledge.analyze_user_input"]) == set(CORPUS_KINDS)
+
+    result = runner.invoke(
+        bench, ["-n", "5", "--size", "5", "-k", "analysis", "--compare", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "analysis.analyze_emotion" in result.output
+
+
+@pytest.mark.usefixtures("db")
+class TestLoadTest:
+    """Load test harness tests."""
+
+    def test_parse_mix(self):
+        """Request mixes are parsed and validated."""
+        assert parse_mix("chat=6,history=3") == {"chat": 6, "history": 3}
+        with pytest.raises(ValueError):
+            parse_mix("unknown=1")
+        with pytest.raises(ValueError):
+            parse_mix("chat=0")
+
+    def test_run_in_process(self, app):
+        """The harness drives authenticated traffic and summarises it."""
+        result = load_test.run(
+            app,
+            concurrency=1,
+            duration=60,
+            weights={"chat": 2, "history": 1, "analyze": 1},
+            users=3,
+            requests=30,
+            warmup=2,
+        )
+        assert result["requests"] == 30
+        assert result["error_rate"] == 0
+        for operation in result["operations"].values():
+            assert sum(count for _, count in operation["histogram"]) == (
+                operation["requests"]
+            )
+
+
+@pytest.mark.usefixtures("db")
+def test_set_indexes_only_toggles_migration_indexes(db):
+    """Indexes outside the migration stay in place while the others toggle."""
+    db.session.execute(text("CREATE INDEX ix_bench_other ON conversations (emotion)"))
+    db.session.commit()
+
+    def index_names():
+        inspector = inspect(db.engine)
+        return {
+            index["name"]
+            for table in INDEXED_TABLES
+            for index in inspector.get_indexes(table.name)
+        }
+
+    set_indexes(False)
+    assert index_names() & MIGRATION_INDEXES == set()
+    assert "ix_bench_other" in index_names()
+
+    set_indexes(True)
+    assert MIGRATION_INDEXES <= index_names()
+    assert "ix_bench_other" in index_names()
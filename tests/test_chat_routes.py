@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Streamed /api/chat/get-analysis tests."""
+import datetime as dt
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from psyas.models.analysis import Analysis
+from psyas.models.conversation import Conversation
+from psyas.routes import chat_routes
+
+
+@pytest.fixture
+def chat_app(app, testapp):
+    """The test app with the chat blueprint mounted."""
+    app.register_blueprint(chat_routes.chat_bp)
+    return testapp
+
+
+@pytest.fixture
+def headers(user):
+    """Authorization header for the user."""
+    token = user.generate_tokens()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def analyses(db, user):
+    """25 analyses; the newest first in the returned ids."""
+    conversation = Conversation(
+        user_id=user.id, user_input="最近很累", assistant_response="回复"
+    )
+    db.session.add(conversation)
+    db.session.flush()
+    started = dt.datetime(2025, 1, 1)
+    for i in range(25):
+        db.session.add(
+            Analysis(
+                user_id=user.id,
+                conversation_id=conversation.id,
+                core_issue="工作压力",
+                emotion="压力",
+                simple_conclusion=f"结论{i}",
+                # Pairs share a timestamp so the id breaks ties
+                analyzed_at=started + dt.timedelta(minutes=i // 2),
+            )
+        )
+    db.session.commit()
+    rows = Analysis.query.order_by(Analysis.analyzed_at.desc(), Analysis.id.desc())
+    return [row.id for row in rows]
+
+
+@pytest.mark.usefixtures("db")
+class TestGetAnalysisStream:
+    """GET /api/chat/get-analysis."""
+
+    def test_full_history_as_json(self, chat_app, headers, analyses, monkeypatch):
+        """Without a limit every row is streamed in the original envelope."""
+        monkeypatch.setattr(chat_routes, "STREAM_CHUNK_ROWS", 10)
+        res = chat_app.get("/api/chat/get-analysis", headers=headers)
+
+        body = json.loads(res.text)
+        assert body["code"] == 200
+        assert body["next_cursor"] is None
+        assert [row["analysis_id"] for row in body["data"]] == analyses
+        assert body["data"][0]["analyzed_at"] == "2025-01-01 00:12:00"
+
+    def test_ndjson_pages(self, chat_app, headers, analyses):
+        """limit/cursor pages cover the history once, in order."""
+        seen, cursor = [], None
+        while True:
+            url = "/api/chat/get-analysis?format=ndjson&limit=10"
+            if cursor:
+                url += f"&cursor={cursor}"
+            res = chat_app.get(url, headers=headers)
+            assert res.content_type == "application/x-ndjson"
+
+            lines = [json.loads(line) for line in res.text.splitlines()]
+            cursor = lines[-1].get("next_cursor")
+            if cursor:
+                lines = lines[:-1]
+            seen.extend(line["analysis_id"] for line in lines)
+            if not cursor:
+                break
+
+        assert seen == analyses
+
+    def test_empty_history(self, chat_app, headers):
+        """No analyses still yields valid JSON."""
+        res = chat_app.get("/api/chat/get-analysis", headers=headers)
+        assert json.loads(res.text)["data"] == []
+
+    @pytest.mark.parametrize(
+        "query", ["limit=0", "limit=5000", "format=xml", "cursor=not-a-cursor"]
+    )
+    def test_bad_parameters(self, chat_app, headers, query):
+        """Invalid parameters are rejected before streaming starts."""
+        res = chat_app.get(
+            f"/api/chat/get-analysis?{query}", headers=headers, expect_errors=True
+        )
+        assert res.status_int == 400
+
+
+class FailingRows:
+    """Query result that fails after yielding some rows."""
+
+    def __init__(self, count):
+        """Yield count rows, then raise a database error."""
+        self.count = count
+        self.closed = False
+
+    def __iter__(self):
+        """Iterate the rows, then fail."""
+        for i in range(self.count):
+            yield SimpleNamespace(
+                id=i + 1,
+                core_issue="工作压力",
+                emotion="压力",
+                simple_conclusion="结论",
+                analyzed_at=dt.datetime(2025, 1, 1),
+            )
+        raise OperationalError("SELECT", {}, Exception("connection lost"))
+
+    def close(self):
+        """Record that the result was closed."""
+        self.closed = True
+
+
+@pytest.mark.usefixtures("db")
+@pytest.mark.parametrize("count", [0, 3])
+def test_mid_stream_error_is_not_a_complete_document(
+    chat_app, headers, monkeypatch, count
+):
+    """A failure after the headers leaves JSON unparsable and ends NDJSON with error."""
+    rows = FailingRows(count)
+    monkeypatch.setattr(
+        chat_routes.analysis_service, "iter_user_analyses", lambda *a, **kw: rows
+    )
+    res = chat_app.get("/api/chat/get-analysis", headers=headers)
+    with pytest.raises(ValueError):
+        json.loads(res.text)
+    assert "数据库查询失败" in json.loads(res.text.splitlines()[-1])["error"]
+    assert rows.closed
+
+    res = chat_app.get("/api/chat/get-analysis?format=ndjson", headers=headers)
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert len(lines) == count + 1
+    assert "数据库查询失败" in lines[-1]["error"]
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Conversation service tests."""
+import json
+
+import pytest
+
+from psyas.commands import backfill_emotions
+from psyas.models.conversation import Conversation
+from psyas.services.conversation_service import BACKFILL_SOURCE, ConversationService
+
+
+@pytest.mark.usefixtures("db")
+class TestStoredEmotion:
+    """Agent results persisted on conversations."""
+
+    def test_turn_stores_agent_result(self, user):
+        """Emotion, confidence and source are saved with the turn."""
+        result = ConversationService().process_user_input(user.id, "我最近很担心考试")
+        agent_info = result["data"]["agent_info"]
+
+        conversation = Conversation.get_by_id(result["data"]["conversation_id"])
+        assert conversation.emotion == agent_info["detected_emotion"]
+        assert conversation.confidence == agent_info["confidence"]
+        assert conversation.response_source == agent_info["response_source"]
+
+    def test_carried_emotion_is_not_stored(self, db, user):
+        """A neutral turn after an emotional one stores no emotion."""
+        service = ConversationService()
+        ids = [
+            service.process_user_input(user.id, text)["data"]["conversation_id"]
+            for text in [
+                "我很焦虑",
+                "今天去了超市",
+                "买了些水果",
+                "然后回家了",
+                "晚上看书",
+            ]
+        ]
+
+        stored = [Conversation.get_by_id(i).emotion for i in ids]
+        assert stored == ["焦虑", None, None, None, None]
+
+    def test_memory_reads_stored_emotion(self, db, user):
+        """Memory uses the stored emotion and only re-detects legacy rows."""
+        Conversation.create(
+            user_id=user.id,
+            user_input="我很担心",
+            assistant_response="回复",
+            emotion="快乐",
+            confidence=0.9,
+            response_source="basic_enhanced",
+        )
+        Conversation.create(
+            user_id=user.id, user_input="我很生气", assistant_response="回复"
+        )
+
+        service = ConversationService()
+        service._memory_cache.clear()
+        emotions = {
+            m["user_input"]: m["emotion"] for m in service._agent_get_memory(user.id)
+        }
+        assert emotions == {"我很担心": "快乐", "我很生气": "愤怒"}
+
+    def test_backfill(self, app, user):
+        """The backfill command fills legacy rows only."""
+        legacy = Conversation.create(
+            user_id=user.id, user_input="压力好大", assistant_response="回复"
+        )
+        current = Conversation.create(
+            user_id=user.id,
+            user_input="今天很开心",
+            assistant_response="回复",
+            emotion="快乐",
+            confidence=0.7,
+            response_source="mcp_enhanced",
+        )
+
+        result = app.test_cli_runner().invoke(backfill_emotions, ["--chunk-size", "1"])
+        assert result.exit_code == 0, result.output
+        assert "Backfilled 1 conversations" in result.output
+
+        legacy = Conversation.get_by_id(legacy.id)
+        assert legacy.emotion == "压力"
+        assert legacy.confidence is None
+        assert legacy.response_source == BACKFILL_SOURCE
+        assert Conversation.get_by_id(current.id).response_source == "mcp_enhanced"
+
+
+def parse_sse(text):
+    """Split an SSE body into (event, data) pairs."""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.usefixtures("db")
+class TestStreamingChat:
+    """Streaming variant of the agent pipeline."""
+
+    def test_event_order(self, user):
+        """The immediate response comes first and the turn is saved last."""
+        events = list(
+            ConversationService().stream_user_input(user.id, "最近工作压力很大")
+        )
+        names = [name for name, _ in events]
+        assert names[0] == "response"
+        assert names[-1] == "metadata"
+
+        data = dict(events)
+        metadata = data["metadata"]
+        expected = data["response"]["text"]
+        if "follow_up" in data:
+            expected += f" {data['follow_up']['question']}"
+        assert metadata["assistant_response"] == expected
+        conversation = Conversation.get_by_id(metadata["conversation_id"])
+        assert conversation.assistant_response == expected
+
+    def test_first_event_before_persistence(self, user):
+        """Nothing is written until the first event has been consumed."""
+        stream = ConversationService().stream_user_input(user.id, "我很担心")
+        name, _ = next(stream)
+        assert name == "response"
+        assert Conversation.query.count() == 0
+
+        # 客户端在第一个事件后断开，对话仍然保存
+        stream.close()
+        assert Conversation.query.count() == 1
+
+    def test_unknown_user(self, db):
+        """An unknown user produces a single error event."""
+        events = list(ConversationService().stream_user_input(999, "你好"))
+        assert events == [("error", {"error": "用户不存在", "code": 404})]
+
+    def test_endpoint(self, testapp, user):
+        """The endpoint streams Server-Sent Events."""
+        token = user.generate_tokens()["access_token"]
+        res = testapp.post_json(
+            "/api/conversation/chat/stream",
+            {"message": "和父母吵架了，很难过"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert res.content_type == "text/event-stream"
+        events = parse_sse(res.text)
+        assert events[0][0] == "response"
+        assert events[-1][0] == "metadata"
+        assert events[-1][1]["user_input"] == "和父母吵架了，很难过"
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Write-behind conversation persistence tests."""
+import datetime as dt
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from psyas.models.conversation import Conversation
+from psyas.services.conversation_service import ConversationService
+from psyas.services.conversation_writer import ConversationWriter
+
+
+def _row(user_id, text, offset=0):
+    return {
+        "user_id": user_id,
+        "user_input": text,
+        "assistant_response": f"回复{text}",
+        "is_analyzed": False,
+        "emotion": None,
+        "confidence": None,
+        "response_source": "basic_enhanced",
+        "created_at": dt.datetime(2025, 1, 1, tzinfo=dt.timezone.utc)
+        + dt.timedelta(seconds=offset),
+    }
+
+
+@pytest.fixture
+def writer(app):
+    """A write-behind writer whose background thread never flushes on its own."""
+    app.config["CONVERSATION_WRITE_BEHIND"] = True
+    app.config["CONVERSATION_FLUSH_INTERVAL_MS"] = 60_000
+    app.config["CONVERSATION_FLUSH_BATCH_SIZE"] = 100
+    app.config["CONVERSATION_QUEUE_SIZE"] = 100
+    writer = ConversationWriter()
+    writer.init_app(app)
+    yield writer
+    writer.drain()
+
+
+@pytest.mark.usefixtures("db")
+class TestConversationWriter:
+    """ConversationWriter tests."""
+
+    def test_flush_keeps_submission_order(self, writer, user):
+        """Queued turns are inserted in batches, in submission order."""
+        writer.batch_size = 2
+        for i in range(5):
+            writer.submit(_row(user.id, str(i), i))
+        writer.flush()
+
+        rows = Conversation.query.order_by(Conversation.id).all()
+        assert [row.user_input for row in rows] == ["0", "1", "2", "3", "4"]
+        assert writer.flushes == 3
+        assert writer.pending_count() == 0
+
+    def test_saturated_queue_writes_synchronously(self, writer, user):
+        """Going over the queue limit flushes in the caller's thread."""
+        writer.max_queue = 2
+        for i in range(3):
+            writer.submit(_row(user.id, str(i), i))
+
+        assert writer.sync_flushes == 1
+        assert writer.pending_count() == 0
+        assert Conversation.query.count() == 3
+
+    def test_drain_flushes_remaining_rows(self, writer, user):
+        """Shutdown drains the queue."""
+        writer.submit(_row(user.id, "a"))
+        writer.drain()
+        assert Conversation.query.count() == 1
+
+    def test_pending_for_user(self, writer, user):
+        """Pending turns are visible per user until flushed."""
+        writer.submit(_row(user.id, "a"))
+        writer.submit(_row(user.id + 1, "b"))
+        assert [row["user_input"] for row in writer.pending_for(user.id)] == ["a"]
+
+    def test_bad_row_is_dead_lettered(self, writer, user):
+        """A row the database rejects does not block the rows around it."""
+        writer.batch_size = 3
+        for i in range(6):
+            row = _row(user.id, str(i), i)
+            if i == 1:
+                row["user_input"] = None
+            writer.submit(row)
+
+        assert writer.flush() == 5
+        assert writer.pending_count() == 0
+        assert writer.dropped_rows == 1
+        assert writer.dead_letters[0][0]["assistant_response"] == "回复1"
+        rows = Conversation.query.order_by(Conversation.id).all()
+        assert [row.user_input for row in rows] == ["0", "2", "3", "4", "5"]
+
+    def test_transient_errors_retry_then_give_up(self, writer, user, monkeypatch):
+        """Transient failures requeue the batch until the retry cap."""
+        insert = writer._insert
+
+        def unavailable(rows):
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+
+        writer.max_retries = 2
+        writer.flush_interval_ms = 50
+        monkeypatch.setattr(writer, "_insert", unavailable)
+        writer.submit(_row(user.id, "a"))
+        for _ in range(2):
+            assert writer.flush() == 0
+            assert writer.pending_count() == 1
+        assert writer._flush_delay() > writer.flush_interval_ms / 1000
+
+        monkeypatch.setattr(writer, "_insert", insert)
+        writer.submit(_row(user.id, "b", 1))
+        assert writer.flush() == 2
+        assert writer.pending_count() == 0
+        assert [row.user_input for row in Conversation.query.all()] == ["a", "b"]
+
+        monkeypatch.setattr(writer, "_insert", unavailable)
+        writer.submit(_row(user.id, "c", 2))
+        for _ in range(3):
+            writer.flush()
+        assert writer.pending_count() == 0
+        assert writer.dropped_rows == 1
+
+
+@pytest.mark.usefixtures("db")
+class TestWriteBehindConversation:
+    """ConversationService in write-behind mode."""
+
+    def test_turn_is_queued_then_flushed(self, writer, user):
+        """The turn is answered before it is stored."""
+        service = ConversationService()
+        service._writer = writer
+        result = service.process_user_input(user.id, "最近压力很大")
+
+        assert result["code"] == 200
+        assert result["data"]["conversation_id"] is None
+        assert Conversation.query.count() == 0
+
+        writer.flush()
+        conversation = Conversation.query.one()
+        assert conversation.user_input == "最近压力很大"
+        assert conversation.response_source == (
+            result["data"]["agent_info"]["response_source"]
+        )
+
+    def test_memory_includes_pending_turns(self, writer, user):
+        """Memory on a cache miss includes turns that are still queued."""
+        service = ConversationService()
+        service._writer = writer
+        writer.submit(_row(user.id, "还没入库"))
+        service._memory_cache.clear()
+
+        memory = service._agent_get_memory(user.id)
+        assert [m["user_input"] for m in memory] == ["还没入库"]
@@ -2,10 +2,10 @@
 """Database unit tests."""
 import pytest
 from flask_login import UserMixin
-from sqlalchemy import text
+from sqlalchemy import event, text
 from sqlalchemy.orm.exc import ObjectDeletedError
 
-from psyas.database import Column, PkModel, db
+from psyas.database import Column, PkModel, db, in_unit_of_work, unit_of_work
 
 
 class ExampleUserModel(UserMixin, PkModel):
@@ -61,6 +61,54 @@ class TestCRUDMixin:
         assert retrieved.username == expected
 
 
+@pytest.fixture
+def commits(db):
+    """Count commits on the scoped session."""
+    counted = []
+
+    def count(session):
+        counted.append(session)
+
+    event.listen(db.session, "after_commit", count)
+    yield counted
+    event.remove(db.session, "after_commit", count)
+
+
+@pytest.mark.usefixtures("db")
+class TestUnitOfWork:
+    """unit_of_work tests."""
+
+    def test_commits_once(self, commits):
+        """CRUD commits inside the block only flush; the block commits once."""
+        with unit_of_work():
+            user = ExampleUserModel.create(username="foo", email="foo@bar.com")
+            assert user.id is not None
+            ExampleUserModel.create(commit=False, username="bar", email="bar@bar.com")
+            user.update(username="baz")
+            assert in_unit_of_work()
+        assert not in_unit_of_work()
+        assert len(commits) == 1
+        assert ExampleUserModel.query.count() == 2
+
+    def test_nested_blocks_join_outer_transaction(self, commits):
+        """Only the outermost block commits."""
+        with unit_of_work():
+            with unit_of_work():
+                ExampleUserModel.create(username="foo", email="foo@bar.com")
+            assert len(commits) == 0
+        assert len(commits) == 1
+
+    def test_exception_rolls_back(self, commits):
+        """An exception discards the whole block."""
+        with pytest.raises(RuntimeError):
+            with unit_of_work():
+                ExampleUserModel.create(username="foo", email="foo@bar.com")
+                raise RuntimeError("boom")
+        assert not commits
+        assert ExampleUserModel.query.count() == 0
+        assert not in_unit_of_work()
+
+
 class TestPkModel:
     """PkModel tests."""
 
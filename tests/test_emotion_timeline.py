@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Per-user daily emotion rollup tests."""
+import datetime as dt
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy import text as sql
+
+from psyas.database import unit_of_work
+from psyas.models.conversation import Conversation
+from psyas.models.emotion_timeline import DailyEmotionCount
+from psyas.services.analysis_service import AnalysisService
+from psyas.services.conversation_service import ConversationService
+from psyas.services.emotion_timeline import (
+    get_trend,
+    record_analyses,
+    record_conversations,
+)
+
+
+def rollup(db, dimension):
+    """Return {label: total} summed over all days for one dimension."""
+    rows = db.session.execute(
+        select(DailyEmotionCount.label, DailyEmotionCount.total).where(
+            DailyEmotionCount.dimension == dimension, DailyEmotionCount.total > 0
+        )
+    ).all()
+    totals = {}
+    for label, total in rows:
+        totals[label] = totals.get(label, 0) + total
+    return totals
+
+
+def add_conversation(db, user, text, emotion=None, source=None):
+    """Insert a conversation without going through the service."""
+    conversation = Conversation(
+        user_id=user.id,
+        user_input=text,
+        assistant_response="回复",
+        emotion=emotion,
+        response_source=source,
+    )
+    db.session.add(conversation)
+    db.session.commit()
+    return conversation
+
+
+@pytest.mark.usefixtures("db")
+class TestRollupUpdates:
+    """The rollup is updated together with analyses and conversations."""
+
+    def test_single_analysis(self, db, user):
+        """Analysing one turn counts its emotion and core issue."""
+        add_conversation(db, user, "工作压力很大，老板总是让我加班")
+        AnalysisService().analyze_user_conversations(user.id)
+
+        assert rollup(db, "emotion") == {"压力": 1}
+        assert rollup(db, "core_issue") == {"工作压力": 1}
+
+    def test_batch_analysis(self, db, user):
+        """The batch job upserts the same rows repeatedly."""
+        for _ in range(3):
+            add_conversation(db, user, "考试没考好，很担心")
+        AnalysisService().analyze_unanalyzed_conversations(chunk_size=2, workers=0)
+
+        assert rollup(db, "emotion") == {"焦虑": 3}
+        assert db.session.query(DailyEmotionCount).count() == 2
+
+    def test_conversation_turn(self, db, user):
+        """A chat turn counts the emotion detected by the agent."""
+        result = ConversationService().process_user_input(user.id, "我很焦虑，很担心")
+        emotion = db.session.get(
+            Conversation, result["data"]["conversation_id"]
+        ).emotion
+
+        assert rollup(db, "turn_emotion") == {emotion: 1}
+
+    def test_neutral_turns_not_counted(self, db, user):
+        """Live counts match the migration backfill and skip neutral turns."""
+        service = ConversationService()
+        for message in ["我很焦虑", "今天去了超市", "然后回家了"]:
+            service.process_user_input(user.id, message)
+
+        assert rollup(db, "turn_emotion") == {"焦虑": 1}
+        # 与迁移 3b7e91c4d2a5 回填时使用的统计方式一致
+        backfilled = db.session.execute(
+            sql(
+                "SELECT emotion, COUNT(*) FROM conversations "
+                "WHERE emotion IS NOT NULL GROUP BY user_id, DATE(created_at), emotion"
+            )
+        ).all()
+        assert dict(backfilled) == rollup(db, "turn_emotion")
+
+    def test_backfill_moves_counts(self, db, user):
+        """Re-detected emotions are moved, not double counted."""
+        conversation = add_conversation(db, user, "今天很开心", emotion="旧情绪")
+        with unit_of_work() as session:
+            record_conversations(session, [conversation])
+        assert rollup(db, "turn_emotion") == {"旧情绪": 1}
+
+        ConversationService().backfill_conversation_emotions()
+
+        totals = rollup(db, "turn_emotion")
+        assert "旧情绪" not in totals
+        assert sum(totals.values()) == 1
+
+    def test_rolled_back_with_transaction(self, db, user):
+        """A failed unit of work leaves no rollup rows behind."""
+        analysis = {
+            "user_id": user.id,
+            "analyzed_at": dt.datetime.now(dt.timezone.utc),
+            "emotion": "焦虑",
+            "core_issue": "学习问题",
+        }
+        with pytest.raises(RuntimeError):
+            with unit_of_work() as session:
+                record_analyses(session, [analysis])
+                raise RuntimeError("boom")
+
+        assert db.session.query(DailyEmotionCount).count() == 0
+
+
+@pytest.mark.usefixtures("db")
+class TestTrend:
+    """Trend reads."""
+
+    def test_dense_days_and_totals(self, db, user):
+        """Every day in the range is listed; totals sum the range."""
+        today = dt.date(2025, 8, 28)
+        with unit_of_work() as session:
+            record_analyses(
+                session,
+                [
+                    {
+                        "user_id": user.id,
+                        "analyzed_at": dt.datetime(2025, 8, day, 12),
+                        "emotion": emotion,
+                        "core_issue": "工作压力",
+                    }
+                    for day, emotion in [(26, "焦虑"), (28, "焦虑"), (28, "快乐")]
+                ],
+            )
+
+        data = get_trend(user.id, days=3, today=today)["data"]
+        assert [day["date"] for day in data["days"]] == [
+            "2025-08-26",
+            "2025-08-27",
+            "2025-08-28",
+        ]
+        assert data["days"][1]["counts"] == {}
+        assert data["days"][2]["counts"] == {"快乐": 1, "焦虑": 1}
+        assert data["totals"] == {"焦虑": 2, "快乐": 1}
+
+    def test_endpoint(self, db, testapp, user):
+        """GET /api/analysis/trend validates its parameters."""
+        token = user.generate_tokens()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        res = testapp.get("/api/analysis/trend?days=7", headers=headers)
+        assert len(res.json["data"]["days"]) == 7
+
+        res = testapp.get(
+            "/api/analysis/trend?dimension=bogus", headers=headers, expect_errors=True
+        )
+        assert res.status_int == 400
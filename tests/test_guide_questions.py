@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Guide question index tests."""
+import random
+from collections import Counter
+
+import pytest
+
+from psyas.models.guide_question import GuideQuestion
+from psyas.services import guide_question_index as guide_index_module
+from psyas.services.conversation_service import ConversationService
+from psyas.services.guide_question_index import (
+    AliasSampler,
+    GuideQuestionIndex,
+    guide_question_index,
+)
+
+
+class TestAliasSampler:
+    """AliasSampler tests."""
+
+    def test_follows_weights(self):
+        """Samples follow the given weights."""
+        sampler = AliasSampler(["a", "b", "c"], [1, 3, 6])
+        rng = random.Random(0)
+        counts = Counter(sampler.sample(rng) for _ in range(60000))
+        assert counts["a"] / 60000 == pytest.approx(0.1, abs=0.01)
+        assert counts["b"] / 60000 == pytest.approx(0.3, abs=0.01)
+        assert counts["c"] / 60000 == pytest.approx(0.6, abs=0.01)
+
+    def test_zero_weight_never_sampled(self):
+        """Items with zero weight are never returned."""
+        sampler = AliasSampler(["a", "b"], [0, 2])
+        rng = random.Random(1)
+        assert {sampler.sample(rng) for _ in range(1000)} == {"b"}
+
+    def test_all_zero_weights_are_uniform(self):
+        """All-zero weights fall back to uniform sampling."""
+        sampler = AliasSampler(["a", "b"], [0, 0])
+        rng = random.Random(2)
+        assert {sampler.sample(rng) for _ in range(1000)} == {"a", "b"}
+
+    def test_empty(self):
+        """An empty sampler is rejected."""
+        with pytest.raises(ValueError):
+            AliasSampler([], [])
+
+
+@pytest.mark.usefixtures("db")
+class TestGuideQuestionIndex:
+    """GuideQuestionIndex tests."""
+
+    def test_loads_once_grouped_by_scene(self, db):
+        """Questions are grouped by scene and loaded only once."""
+        GuideQuestion.create(scene="焦虑", question_text="什么让你担心？", priority=1)
+        GuideQuestion.create(scene="焦虑", question_text="担心多久了？", priority=1)
+        GuideQuestion.create(scene="压力", question_text="压力来自哪里？", priority=1)
+
+        index = GuideQuestionIndex()
+        assert sorted(index.questions("焦虑")) == ["什么让你担心？", "担心多久了？"]
+        assert index.choose("压力") == "压力来自哪里？"
+        assert index.choose("快乐") is None
+        assert index.loads == 1
+
+    def test_priority_weighting(self, db):
+        """Higher priority questions are chosen more often."""
+        GuideQuestion.create(scene="焦虑", question_text="高", priority=9)
+        GuideQuestion.create(scene="焦虑", question_text="低", priority=1)
+
+        index = GuideQuestionIndex()
+        rng = random.Random(3)
+        counts = Counter(index.choose("焦虑", rng) for _ in range(10000))
+        assert counts["高"] / 10000 == pytest.approx(0.9, abs=0.02)
+
+    def test_commit_invalidates(self, db):
+        """Committed changes to guide questions refresh the shared index."""
+        guide_question_index.clear()
+        assert guide_question_index.choose("孤独") is None
+
+        GuideQuestion.create(scene="孤独", question_text="最近和谁联系过？")
+        assert guide_question_index.choose("孤独") == "最近和谁联系过？"
+
+    def test_version_signal_from_other_worker(self, db, monkeypatch):
+        """A version bump published by another index triggers a reload."""
+        clock = [1000.0]
+        monkeypatch.setattr(guide_index_module.time, "monotonic", lambda: clock[0])
+        index = GuideQuestionIndex(version_check_interval=1)
+        assert index.choose("愤怒") is None
+
+        # 绕过ORM写入，不会触发提交时的自动刷新
+        db.session.execute(
+            GuideQuestion.__table__.insert(),
+            {"scene": "愤怒", "question_text": "发生了什么？", "priority": 1},
+        )
+        db.session.commit()
+        assert index.choose("愤怒") is None
+
+        GuideQuestionIndex().invalidate()
+        # 版本检查间隔内仍使用旧索引，间隔过后发现新版本并重新加载
+        assert index.choose("愤怒") is None
+        clock[0] += 1
+        assert index.choose("愤怒") == "发生了什么？"
+        assert index.loads == 2
+
+    def test_unreachable_cache_falls_back_to_ttl(self, db, monkeypatch):
+        """Version reads that fail keep the index until the TTL runs out."""
+        clock = [1000.0]
+        monkeypatch.setattr(guide_index_module.time, "monotonic", lambda: clock[0])
+        index = GuideQuestionIndex(ttl=60, version_check_interval=0)
+
+        def unavailable(*args, **kwargs):
+            raise OSError("connection refused")
+
+        monkeypatch.setattr(guide_index_module.cache, "get", unavailable)
+        assert index.choose("愤怒") is None
+
+        db.session.execute(
+            GuideQuestion.__table__.insert(),
+            {"scene": "愤怒", "question_text": "发生了什么？", "priority": 1},
+        )
+        db.session.commit()
+        assert index.choose("愤怒") is None
+        assert index.loads == 1
+
+        clock[0] += 60
+        assert index.choose("愤怒") == "发生了什么？"
+        assert index.loads == 2
+
+    def test_service_uses_index(self, db):
+        """The conversation service picks guide questions from the index."""
+        GuideQuestion.create(scene="抑郁", question_text="这种感觉持续多久了？")
+        assert (
+            ConversationService()._get_guide_question("抑郁") == "这种感觉持续多久了？"
+        )
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Streaming history export tests."""
+import gzip
+import json
+
+import pytest
+
+from psyas.commands import export_history
+from psyas.models.analysis import Analysis
+from psyas.models.conversation import Conversation
+from psyas.pagination import InvalidCursor
+from psyas.services.history_export import (
+    encode_export_cursor,
+    gzip_chunks,
+    iter_history,
+    ndjson_chunks,
+)
+
+
+@pytest.fixture
+def history(db, user):
+    """Five conversations with an analysis for each of the first three."""
+    conversations = []
+    for i in range(5):
+        conversation = Conversation(
+            user_id=user.id, user_input=f"第{i}句", assistant_response="回复"
+        )
+        db.session.add(conversation)
+        conversations.append(conversation)
+    db.session.flush()
+    for conversation in conversations[:3]:
+        db.session.add(
+            Analysis(
+                user_id=user.id,
+                conversation_id=conversation.id,
+                core_issue="工作压力",
+                emotion="压力",
+            )
+        )
+    db.session.commit()
+    return conversations
+
+
+def keys(records):
+    """(type, id) of every data record."""
+    return [(r["type"], r["data"]["id"]) for r in records if r["type"] != "end"]
+
+
+def export_all(user_id, limit):
+    """Follow next_cursor until the export is complete."""
+    records, cursor = [], None
+    while True:
+        page = list(iter_history(user_id, cursor=cursor, limit=limit))
+        records.extend(page[:-1])
+        cursor = page[-1]["next_cursor"]
+        if page[-1]["complete"]:
+            return records
+
+
+@pytest.mark.usefixtures("db")
+class TestIterHistory:
+    """iter_history tests."""
+
+    def test_full_export(self, user, history):
+        """Conversations come first, then analyses, each in id order."""
+        records = list(iter_history(user.id))
+        assert [r["type"] for r in records[:-1]] == ["conversation"] * 5 + [
+            "analysis"
+        ] * 3
+        assert records[0]["data"]["user_input"] == "第0句"
+        assert records[-1] == {
+            "type": "end",
+            "complete": True,
+            "exported": 8,
+            "next_cursor": None,
+        }
+
+    @pytest.mark.parametrize("limit", [1, 3, 5, 8])
+    def test_limited_pages_cover_history_once(self, user, history, limit):
+        """Pages split anywhere, including at the table boundary."""
+        assert keys(export_all(user.id, limit)) == keys(iter_history(user.id))
+
+    def test_resume_from_record_cursor(self, user, history):
+        """Any record's cursor resumes right after that record."""
+        records = list(iter_history(user.id))
+        resumed = list(iter_history(user.id, cursor=records[4]["cursor"]))
+        assert keys(resumed) == keys(records[5:])
+
+    def test_other_users_excluded(self, db, user, history):
+        """Only the requested user's rows are exported."""
+        records = list(iter_history(user.id + 1))
+        assert records == [
+            {"type": "end", "complete": True, "exported": 0, "next_cursor": None}
+        ]
+
+    @pytest.mark.parametrize(
+        "cursor", ["not-a-cursor", encode_export_cursor("user", 1)]
+    )
+    def test_invalid_cursor(self, user, cursor):
+        """Bad cursors are rejected before any query runs."""
+        with pytest.raises(InvalidCursor):
+            iter_history(user.id, cursor=cursor)
+
+
+def test_gzip_chunks_round_trip():
+    """Sync-flushed chunks decompress to the original NDJSON."""
+    records = [{"type": "conversation", "data": {"id": i}} for i in range(250)]
+    text = "".join(ndjson_chunks(records, chunk_rows=100))
+    compressed = b"".join(gzip_chunks(ndjson_chunks(records, chunk_rows=100)))
+    assert gzip.decompress(compressed).decode("utf-8") == text
+    assert len(text.splitlines()) == 250
+
+
+@pytest.mark.usefixtures("db")
+class TestExportEndpoint:
+    """GET /api/conversation/export."""
+
+    @pytest.fixture
+    def headers(self, user):
+        """Authorization header for the user."""
+        token = user.generate_tokens()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_ndjson(self, testapp, headers, history):
+        """The plain export is an NDJSON attachment ending with the trailer."""
+        res = testapp.get("/api/conversation/export?limit=6", headers=headers)
+        assert res.content_type == "application/x-ndjson"
+        assert "attachment" in res.headers["Content-Disposition"]
+
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert len(lines) == 7
+        assert lines[-1]["next_cursor"] == lines[-2]["cursor"]
+
+        res = testapp.get(
+            f"/api/conversation/export?cursor={lines[-1]['next_cursor']}",
+            headers=headers,
+        )
+        assert [json.loads(line)["type"] for line in res.text.splitlines()] == [
+            "analysis",
+            "analysis",
+            "end",
+        ]
+
+    def test_gzip(self, testapp, headers, history):
+        """ndjson.gz returns the same lines gzip-compressed."""
+        res = testapp.get("/api/conversation/export?format=ndjson.gz", headers=headers)
+        assert res.content_type == "application/gzip"
+        lines = gzip.decompress(res.body).decode("utf-8").splitlines()
+        assert json.loads(lines[-1])["exported"] == 8
+
+    @pytest.mark.parametrize("query", ["format=csv", "limit=0", "cursor=bogus"])
+    def test_bad_parameters(self, testapp, headers, query):
+        """Invalid parameters are rejected before streaming starts."""
+        res = testapp.get(
+            f"/api/conversation/export?{query}", headers=headers, expect_errors=True
+        )
+        assert res.status_int == 400
+
+
+@pytest.mark.usefixtures("db")
+def test_cli_export(app, user, history, tmp_path):
+    """The export-history command writes a gzip file and reports the count."""
+    output = tmp_path / "history.ndjson.gz"
+    result = app.test_cli_runner().invoke(
+        export_history, ["--user-id", str(user.id), "--output", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Exported 8 records" in result.stderr
+    lines = gzip.decompress(output.read_bytes()).decode("utf-8").splitlines()
+    assert len(lines) == 9
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Request identity loading and user cache tests."""
+import pytest
+from sqlalchemy import delete, event
+
+from psyas.auth.identity import invalidate_user, load_user, user_cache
+from psyas.user.models import User
+
+
+@pytest.fixture
+def user_selects(db):
+    """Count SELECT statements against the users table."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "users" in statement:
+            statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def auth_headers(user):
+    """Authorization header for the user."""
+    token = user.generate_tokens()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.usefixtures("db")
+class TestUserIdentity:
+    """User identity loading tests."""
+
+    def test_chat_checks_user_once(self, testapp, user, user_selects):
+        """A chat request loads the user at most once."""
+        headers = auth_headers(user)
+        user_cache.clear()
+        user_selects.clear()
+        res = testapp.post_json(
+            "/api/conversation/chat", {"message": "最近压力很大"}, headers=headers
+        )
+        assert res.json["code"] == 200
+        assert len(user_selects) == 1
+
+        user_selects.clear()
+        testapp.get("/api/conversation/history", headers=headers)
+        assert user_selects == []
+
+    def test_cache_survives_requests(self, db, user):
+        """The cached snapshot is used until it expires or is invalidated."""
+        user_cache.clear()
+        user_id, username = user.id, user.username
+        assert load_user(user_id).username == username
+
+        # 批量删除不触发失效，仍读取缓存
+        db.session.execute(delete(User).where(User.id == user_id))
+        assert load_user(user_id).username == username
+
+        invalidate_user(user_id)
+        assert load_user(user_id) is None
+
+    def test_deactivation_invalidates(self, db, testapp, user):
+        """Deactivated users are rejected on their next request."""
+        headers = auth_headers(user)
+        testapp.get("/api/conversation/history", headers=headers)
+
+        user.active = False
+        db.session.commit()
+        res = testapp.get(
+            "/api/conversation/history", headers=headers, expect_errors=True
+        )
+        assert res.status_code == 401
+        assert res.json["message"] == "用户不存在"
+
+    def test_unknown_user(self, db, testapp, user):
+        """Tokens of deleted users are rejected."""
+        headers = auth_headers(user)
+        db.session.delete(user)
+        db.session.commit()
+        res = testapp.get(
+            "/api/conversation/history", headers=headers, expect_errors=True
+        )
+        assert res.status_code == 401
+
+
+@pytest.mark.usefixtures("db")
+class TestRejectedUsers:
+    """Deleted and deactivated users get the same 401 on every protected route."""
+
+    @pytest.fixture(params=["deleted", "deactivated"])
+    def rejected_headers(self, request, db, user):
+        """Headers of a token whose user no longer passes the lookup."""
+        headers = auth_headers(user)
+        if request.param == "deleted":
+            db.session.delete(user)
+        else:
+            user.active = False
+        db.session.commit()
+        return headers
+
+    @pytest.mark.parametrize(
+        "method, url",
+        [
+            ("post_json", "/api/conversation/chat"),
+            ("get", "/api/conversation/history"),
+            ("get", "/api/analysis/results"),
+            ("get", "/users/"),
+        ],
+    )
+    def test_uniform_401(self, testapp, rejected_headers, method, url):
+        """The user lookup error replaces the per-route checks."""
+        args = ({"message": "你好"},) if method == "post_json" else ()
+        res = getattr(testapp, method)(
+            url, *args, headers=rejected_headers, expect_errors=True
+        )
+        assert res.status_code == 401
+        assert res.json == {"code": 401, "message": "用户不存在"}
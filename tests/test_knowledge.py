@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Knowledge service unit tests."""
+import shutil
+
+import pytest
+
+from psyas.commands import kb
+from psyas.services import knowledge_service as knowledge_service_module
+from psyas.services.keyword_automaton import KeywordAutomaton
+from psyas.services.knowledge_base import (
+    DATA_DIR,
+    FRAMEWORKS_FILE,
+    ISSUES_FILE,
+    KnowledgeBase,
+    get_knowledge_base,
+    reload_knowledge_base,
+    validate_knowledge_data,
+)
+from psyas.services.knowledge_service import KnowledgeService, get_knowledge_service
+
+
+@pytest.fixture(scope="module")
+def knowledge_service():
+    """Knowledge service backed by the bundled JSON data."""
+    return KnowledgeService()
+
+
+class TestKeywordAutomaton:
+    """KeywordAutomaton tests."""
+
+    def test_finds_overlapping_keywords(self):
+        """Every keyword contained in the text is reported, including overlaps."""
+        automaton = KeywordAutomaton()
+        automaton.add("活着", "危机", "生活")
+        automaton.add("活着没意思", "危机", "直接")
+        automaton.add("意思", "其他", "词")
+        automaton.build()
+
+        hits = automaton.search("感觉活着没意思")
+        assert hits.keywords == {"活着", "活着没意思", "意思"}
+        assert hits.has_issue("危机", "直接")
+        assert not hits.has_issue("危机", "痛苦")
+
+    def test_matches_substring_semantics(self):
+        """Hit set agrees with plain ``in`` checks for every keyword."""
+        keywords = ["he", "she", "his", "hers", "累", "压力"]
+        automaton = KeywordAutomaton()
+        for keyword in keywords:
+            automaton.add(keyword, "c", keyword)
+        automaton.build()
+
+        for text in ["ushers", "hishe", "压力好大好累", "", "nothing"]:
+            hits = automaton.search(text)
+            assert hits.keywords == {kw for kw in keywords if kw in text}
+
+    def test_add_after_build_raises(self):
+        """Keywords cannot be added once the automaton is built."""
+        automaton = KeywordAutomaton().build()
+        with pytest.raises(RuntimeError):
+            automaton.add("焦虑", "情绪类", "焦虑")
+
+
+class TestKnowledgeService:
+    """KnowledgeService matching tests."""
+
+    @pytest.mark.parametrize(
+        "text,framework",
+        [
+            ("我最近工作压力特别大，每天都感觉很焦虑", "正念疗法"),
+            ("和男朋友分手了，感觉很难过很绝望", "CBT"),
+            ("今天升职了，特别开心！", "积极心理学"),
+            ("我不想活了，感觉没有意义", "危机干预"),
+            ("活着太痛苦了，想要结束", "危机干预"),
+        ],
+    )
+    def test_framework_matching(self, knowledge_service, text, framework):
+        """Inputs are matched to the expected framework."""
+        assert knowledge_service.analyze_user_input(text).framework == framework
+
+    def test_confidence_counts_matched_keywords(self, knowledge_service):
+        """Confidence is the share of the issue's keywords present in the text."""
+        issue = knowledge_service.issues["情绪类"]["焦虑"]
+        expected = 2 / len(issue["keywords"])
+        assert knowledge_service._calculate_confidence(
+            "有点担心又紧张", issue
+        ) == pytest.approx(expected)
+
+    def test_no_match_returns_default(self, knowledge_service):
+        """Input without keywords falls back to the generic response."""
+        result = knowledge_service.analyze_user_input("今天天气不错")
+        assert result.framework == "通用支持"
+
+
+class TestSharedKnowledgeBase:
+    """Process-wide knowledge base tests."""
+
+    def test_services_share_one_knowledge_base(self):
+        """Every service reads from the same loaded knowledge base."""
+        assert KnowledgeService().knowledge_base is get_knowledge_base()
+        assert get_knowledge_service() is get_knowledge_service()
+
+    def test_reload_replaces_shared_instance(self):
+        """Services pick up the reloaded knowledge base."""
+        service = get_knowledge_service()
+        before = service.knowledge_base
+        reloaded = reload_knowledge_base()
+        assert reloaded is not before
+        assert service.knowledge_base is reloaded
+        assert service.issues == before.issues
+
+    def test_analysis_uses_one_snapshot(self, monkeypatch):
+        """A reload during an analysis does not mix knowledge base versions."""
+        calls = []
+
+        def versioned():
+            calls.append(1)
+            return get_knowledge_base()
+
+        monkeypatch.setattr(knowledge_service_module, "get_knowledge_base", versioned)
+        service = KnowledgeService()
+        assert service.analyze_user_input("工作压力很大，很焦虑").framework
+        assert len(calls) == 1
+
+    def test_explicit_knowledge_base_is_pinned(self, tmp_path):
+        """A service built with its own knowledge base ignores the shared one."""
+        empty = KnowledgeBase.load(str(tmp_path))
+        service = KnowledgeService(empty)
+        assert service.issues == {}
+        assert service.analyze_user_input("我很焦虑").framework == "通用支持"
+
+
+class TestKnowledgeDataCheck:
+    """Knowledge JSON validation tests."""
+
+    def test_bundled_data_is_valid(self):
+        """The shipped JSON passes validation."""
+        knowledge_base = KnowledgeBase.load()
+        assert (
+            validate_knowledge_data(knowledge_base.frameworks, knowledge_base.issues)
+            == []
+        )
+
+    def test_validation(self):
+        """Broken issues and unknown frameworks are reported."""
+        errors = validate_knowledge_data(
+            {"CBT": {"name": "认知行为疗法"}},
+            {"情绪类": {"焦虑": {"keywords": [], "suggested_framework": "未知"}}},
+        )
+        assert any("没有关键词" in error for error in errors)
+        assert any("未知" in error for error in errors)
+
+    def test_cli(self, app, tmp_path):
+        """The kb check command passes on the bundled data and fails on bad data."""
+        for name in (FRAMEWORKS_FILE, ISSUES_FILE):
+            shutil.copy(f"{DATA_DIR}/{name}", tmp_path / name)
+        runner = app.test_cli_runner()
+        result = runner.invoke(kb, ["check", "--data-dir", str(tmp_path)])
+        assert result.exit_code == 0, result.output
+        assert "Knowledge data OK" in result.output
+
+        (tmp_path / ISSUES_FILE).write_text("{}", encoding="utf-8")
+        result = runner.invoke(kb, ["check", "--data-dir", str(tmp_path)])
+        assert result.exit_code != 0
+        assert "校验失败" in result.output
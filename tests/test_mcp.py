@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""MCP tool registry tests."""
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from psyas.mcp.database_server import DatabaseMCPServer
+from psyas.mcp.loop_runner import BackgroundLoop
+from psyas.mcp.psychology_server import MCPToolResult
+from psyas.mcp.tool_registry import get_tool_registry
+
+
+class TestBackgroundLoop:
+    """BackgroundLoop tests."""
+
+    def test_run_returns_result(self):
+        """Coroutines submitted from sync code run on the background loop."""
+        background_loop = BackgroundLoop()
+
+        async def add(a, b):
+            return a + b
+
+        assert background_loop.run(add(1, 2), timeout=1) == 3
+        assert background_loop.is_running
+        background_loop.stop()
+        assert not background_loop.is_running
+
+    def test_run_timeout_cancels(self):
+        """A coroutine exceeding the timeout raises and is cancelled."""
+        background_loop = BackgroundLoop()
+        with pytest.raises(concurrent.futures.TimeoutError):
+            background_loop.run(asyncio.sleep(10), timeout=0.05)
+        background_loop.stop()
+
+    def test_loop_is_reused(self):
+        """The same loop serves every submission."""
+        background_loop = BackgroundLoop()
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = background_loop.run(current_loop())
+        second = background_loop.run(current_loop())
+        assert first is second
+        background_loop.stop()
+
+
+class TestToolRegistrySync:
+    """Synchronous MCP tool calls."""
+
+    def test_call_tool_sync(self):
+        """Psychology tools can be called from synchronous code."""
+        result = get_tool_registry().call_tool_sync(
+            "emotion_analysis", {"text": "我不想活了", "context": {}}
+        )
+        assert result.success
+        assert result.data["emotion"] == "危机干预"
+
+    def test_call_tool_sync_inside_running_loop(self):
+        """Sync calls work even when the caller already runs an event loop."""
+
+        async def handler():
+            return get_tool_registry().call_tool_sync("get_safety_guidelines", {})
+
+        result = asyncio.run(handler())
+        assert result.success
+        assert "crisis_hotline" in result.data
+
+    def test_call_multiple_tools_sync(self):
+        """Several tools can be called in one batch."""
+        results = get_tool_registry().call_multiple_tools_sync(
+            [
+                {"tool_name": "get_safety_guidelines", "parameters": {}},
+                {"tool_name": "unknown_tool", "parameters": {}},
+            ]
+        )
+        assert results[0].success
+        assert not results[1].success
+
+
+@pytest.mark.usefixtures("db")
+class TestDatabaseTools:
+    """Database MCP tools running on the executor."""
+
+    def test_tools_run_in_pool(self, user):
+        """DB tools return results computed in their own app context."""
+        registry = get_tool_registry()
+        results = registry.call_multiple_tools_sync(
+            [
+                {"tool_name": "get_user_info", "parameters": {"user_id": user.id}},
+                {
+                    "tool_name": "save_conversation",
+                    "parameters": {
+                        "user_id": user.id,
+                        "user_input": "我有点焦虑",
+                        "assistant_response": "我在这里倾听你。",
+                    },
+                },
+            ]
+        )
+        assert results[0].success
+        assert results[0].data["username"] == user.username
+        assert results[1].success
+
+        history = registry.call_tool_sync(
+            "get_user_conversations", {"user_id": user.id}
+        )
+        assert history.data["total"] == 1
+
+    def test_queue_depth_rejects_excess_calls(self, user):
+        """Calls beyond the configured queue depth fail fast."""
+        registry = get_tool_registry()
+        registry.configure_database_pool(pool_size=1, queue_depth=1)
+        try:
+            assert registry.database_pool_size == 1
+            assert registry.database_queue_depth == 1
+            registry.database_server._slots.acquire()
+            result = registry.call_tool_sync("get_user_info", {"user_id": user.id})
+            registry.database_server._slots.release()
+            assert not result.success
+            assert "繁忙" in result.error
+        finally:
+            registry.configure_database_pool()
+
+    def test_reconfigure_during_call(self, app):
+        """A call releases the slot it acquired even if the pool was replaced."""
+        server = DatabaseMCPServer(app=app, pool_size=1, queue_depth=2)
+
+        def reconfigure():
+            server.configure_pool(pool_size=1, queue_depth=2)
+            return MCPToolResult(success=True, data=None)
+
+        result = asyncio.run(server._run_db(reconfigure))
+        assert result.success
+        # The new semaphore is untouched and still has every slot free
+        assert server._slots.acquire(blocking=False)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Agent memory cache tests."""
+from psyas.extensions import cache
+from psyas.services.memory_cache import MemoryCache
+
+
+class TestMemoryCache:
+    """MemoryCache tests."""
+
+    def test_hit_and_miss_counters(self):
+        """Lookups are counted as hits or misses."""
+        memory_cache = MemoryCache()
+        assert memory_cache.get(1) is None
+        memory_cache.set(1, [{"user_input": "你好"}])
+        assert memory_cache.get(1) == [{"user_input": "你好"}]
+
+        stats = memory_cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction(self):
+        """The least recently used user is evicted past the size cap."""
+        memory_cache = MemoryCache(max_entries=2)
+        memory_cache.set(1, [])
+        memory_cache.set(2, [])
+        memory_cache.get(1)
+        memory_cache.set(3, [])
+
+        assert 1 in memory_cache
+        assert 2 not in memory_cache
+        assert 3 in memory_cache
+        assert memory_cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Entries older than the TTL are treated as misses."""
+        memory_cache = MemoryCache(ttl=0)
+        memory_cache.set(1, [])
+        assert memory_cache.get(1) is None
+        assert memory_cache.stats()["expirations"] == 1
+
+    def test_invalidate(self):
+        """Invalidated users are removed."""
+        memory_cache = MemoryCache()
+        memory_cache.set(1, [])
+        memory_cache.invalidate(1)
+        assert memory_cache.get(1) is None
+
+    def test_shared_backend(self, app):
+        """The shared backend goes through the Flask-Caching extension."""
+        memory_cache = MemoryCache(shared=True)
+        memory_cache.set(7, [{"user_input": "焦虑"}])
+
+        other_worker = MemoryCache(shared=True)
+        assert other_worker.get(7) == [{"user_input": "焦虑"}]
+
+        memory_cache.invalidate(7)
+        assert other_worker.get(7) is None
+
+    def test_peek_is_not_counted(self):
+        """Peek reads the memory without touching the statistics."""
+        memory_cache = MemoryCache()
+        assert memory_cache.peek(1) is None
+        memory_cache.set(1, [])
+        assert memory_cache.peek(1) == []
+        assert memory_cache.stats()["hits"] == 0
+        assert memory_cache.stats()["misses"] == 0
+
+    def test_replace_drops_other_workers_copies(self, app):
+        """A versioned replace makes the other workers re-read the memory."""
+        memory_cache = MemoryCache(versioned=True)
+        other_worker = MemoryCache(versioned=True)
+        memory_cache.set(7, [{"user_input": "旧"}])
+        other_worker.set(7, [{"user_input": "旧"}])
+
+        memory_cache.replace(7, [{"user_input": "新"}, {"user_input": "旧"}])
+        assert memory_cache.get(7) == [{"user_input": "新"}, {"user_input": "旧"}]
+        assert other_worker.get(7) is None
+
+        other_worker.set(7, [{"user_input": "新"}, {"user_input": "旧"}])
+        assert other_worker.get(7) is not None
+
+        memory_cache.invalidate(7)
+        assert other_worker.get(7) is None
+
+    def test_version_check_survives_cache_errors(self, app, monkeypatch):
+        """An unreachable cache keeps serving the local copy until the TTL."""
+        memory_cache = MemoryCache(versioned=True)
+        memory_cache.set(7, [])
+
+        def unavailable(*args, **kwargs):
+            raise OSError("connection refused")
+
+        monkeypatch.setattr(cache, "get", unavailable)
+        monkeypatch.setattr(cache, "set", unavailable)
+        assert memory_cache.get(7) == []
+        memory_cache.replace(7, [{"user_input": "新"}])
+        assert memory_cache.get(7) == [{"user_input": "新"}]
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Agent pipeline metrics tests."""
+import pytest
+from sqlalchemy import update
+
+from psyas.services.conversation_service import ConversationService
+from psyas.services.pipeline_metrics import PipelineMetrics, agent_metrics
+from psyas.user.models import User
+
+
+class TestPipelineMetrics:
+    """PipelineMetrics tests."""
+
+    def test_snapshot(self):
+        """Durations are summarised per stage."""
+        metrics = PipelineMetrics(buckets=(0.001, 0.01, 0.1))
+        for seconds in (0.0005, 0.005, 0.005, 0.05):
+            metrics.observe("reason", seconds)
+        metrics.record_branch("basic_enhanced")
+        metrics.record_branch("basic_enhanced")
+        metrics.record_error("database")
+
+        snapshot = metrics.snapshot()
+        reason = snapshot["stages"]["reason"]
+        assert reason["count"] == 4
+        assert reason["max_ms"] == 50.0
+        assert reason["p50_ms"] == 10.0
+        assert reason["p99_ms"] == 50.0
+        assert snapshot["branches"] == {"basic_enhanced": 2}
+        assert snapshot["errors"] == {"database": 1}
+
+    def test_prometheus_histogram_is_cumulative(self):
+        """Prometheus buckets are cumulative and end with +Inf."""
+        metrics = PipelineMetrics(buckets=(0.001, 0.01))
+        metrics.observe("save", 0.0005)
+        metrics.observe("save", 0.005)
+        metrics.observe("save", 1.0)
+
+        text = metrics.render_prometheus()
+        prefix = "psyas_agent_stage_duration_seconds"
+        assert f'{prefix}_bucket{{stage="save",le="0.001"}} 1' in text
+        assert f'{prefix}_bucket{{stage="save",le="0.01"}} 2' in text
+        assert f'{prefix}_bucket{{stage="save",le="+Inf"}} 3' in text
+        assert f'{prefix}_count{{stage="save"}} 3' in text
+
+    def test_stage_timer(self):
+        """The stage context manager records one observation."""
+        metrics = PipelineMetrics()
+        with metrics.stage("perceive"):
+            pass
+        assert metrics.snapshot()["stages"]["perceive"]["count"] == 1
+
+
+@pytest.mark.usefixtures("db")
+class TestPipelineInstrumentation:
+    """Instrumentation of the conversation pipeline and its endpoints."""
+
+    def test_process_user_input_records_stages(self, user):
+        """Every stage and the winning branch are recorded."""
+        agent_metrics.reset()
+        result = ConversationService().process_user_input(user.id, "最近压力很大")
+
+        snapshot = agent_metrics.snapshot()
+        for stage in ("total", "user_lookup", "perceive", "memory", "reason", "save"):
+            assert snapshot["stages"][stage]["count"] == 1
+        source = result["data"]["agent_info"]["response_source"]
+        assert snapshot["branches"] == {source: 1}
+
+    def test_prometheus_endpoint(self, testapp):
+        """/metrics serves Prometheus text."""
+        agent_metrics.reset()
+        agent_metrics.observe("total", 0.01)
+        res = testapp.get("/metrics")
+        assert res.content_type == "text/plain"
+        assert 'psyas_agent_stage_duration_seconds_count{stage="total"} 1' in res.text
+
+    def test_admin_endpoint(self, db, testapp, user):
+        """Only admins can read the JSON metrics."""
+        token = user.generate_tokens()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        res = testapp.get("/api/admin/metrics", headers=headers, expect_errors=True)
+        assert res.status_code == 403
+
+        # 授予管理员后需要重新签发令牌（令牌中的is_admin声明仍为False）
+        user.is_admin = True
+        db.session.commit()
+        res = testapp.get("/api/admin/metrics", headers=headers, expect_errors=True)
+        assert res.status_code == 403
+
+        token = user.generate_tokens()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        res = testapp.get("/api/admin/metrics", headers=headers)
+        assert res.json["code"] == 200
+        assert "stages" in res.json["data"]
+
+        # 撤销管理员立即生效
+        user.is_admin = False
+        db.session.commit()
+        res = testapp.get("/api/admin/metrics", headers=headers, expect_errors=True)
+        assert res.status_code == 403
+
+        # 批量更新不会使用户缓存失效（相当于在其他worker中撤销），同样立即生效
+        user.is_admin = True
+        db.session.commit()
+        assert testapp.get("/api/admin/metrics", headers=headers).json["code"] == 200
+        db.session.execute(
+            update(User).where(User.id == user.id).values(is_admin=False)
+        )
+        db.session.commit()
+        res = testapp.get("/api/admin/metrics", headers=headers, expect_errors=True)
+        assert res.status_code == 403
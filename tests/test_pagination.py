@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Keyset pagination tests."""
+import datetime as dt
+
+import pytest
+
+from psyas.models.analysis import Analysis
+from psyas.models.conversation import Conversation
+from psyas.pagination import InvalidCursor, decode_cursor, encode_cursor
+from psyas.services.analysis_service import AnalysisService
+from psyas.services.conversation_service import ConversationService
+
+
+class TestCursor:
+    """Cursor encoding tests."""
+
+    def test_round_trip(self):
+        """Cursors decode to the timestamp and id they were built from."""
+        timestamp = dt.datetime(2025, 8, 28, 16, 37, 0, 123456)
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    def test_aware_timestamps_are_normalised_to_utc(self):
+        """Timezone-aware timestamps are stored as naive UTC."""
+        timestamp = dt.datetime(
+            2025, 8, 28, 16, 0, tzinfo=dt.timezone(dt.timedelta(hours=8))
+        )
+        decoded, _ = decode_cursor(encode_cursor(timestamp, 1))
+        assert decoded == dt.datetime(2025, 8, 28, 8, 0)
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "", "!!!", "MTIz"])
+    def test_invalid_cursor(self, cursor):
+        """Malformed cursors raise InvalidCursor."""
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor)
+
+
+@pytest.mark.usefixtures("db")
+class TestKeysetPagination:
+    """Service pagination tests."""
+
+    def test_conversation_pages_cover_history_once(self, db, user):
+        """Paging with next_cursor returns every conversation exactly once."""
+        same_time = dt.datetime(2025, 1, 1, 12, 0)
+        for i in range(25):
+            db.session.add(
+                Conversation(
+                    user_id=user.id,
+                    user_input=f"消息{i}",
+                    assistant_response="回复",
+                    # 一半记录时间相同，验证id打破平局
+                    created_at=same_time + dt.timedelta(minutes=i // 2),
+                )
+            )
+        db.session.commit()
+
+        service = ConversationService()
+        seen = []
+        cursor = None
+        while True:
+            data = service.get_user_conversations(user.id, limit=10, cursor=cursor)[
+                "data"
+            ]
+            seen.extend(conv["id"] for conv in data["conversations"])
+            cursor = data["next_cursor"]
+            assert data["has_more"] is (cursor is not None)
+            if cursor is None:
+                break
+
+        assert len(seen) == 25
+        assert len(set(seen)) == 25
+        expected = [
+            conv.id
+            for conv in Conversation.query.order_by(
+                Conversation.created_at.desc(), Conversation.id.desc()
+            )
+        ]
+        assert seen == expected
+
+    def test_analysis_pages(self, db, user):
+        """Analysis history pages follow analyzed_at order."""
+        conversation = Conversation.create(
+            user_id=user.id, user_input="焦虑", assistant_response="回复"
+        )
+        for i in range(5):
+            db.session.add(
+                Analysis(
+                    user_id=user.id,
+                    conversation_id=conversation.id,
+                    core_issue="工作压力",
+                    emotion="焦虑",
+                    analyzed_at=dt.datetime(2025, 1, 1) + dt.timedelta(days=i),
+                )
+            )
+        db.session.commit()
+
+        service = AnalysisService()
+        first = service.get_user_analysis_history(user.id, limit=3)["data"]
+        second = service.get_user_analysis_history(
+            user.id, limit=3, cursor=first["next_cursor"]
+        )["data"]
+
+        days = [a["analyzed_at"][:10] for a in first["analyses"] + second["analyses"]]
+        assert days == [f"2025-01-0{i}" for i in range(5, 0, -1)]
+        assert second["next_cursor"] is None
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Password hashing pool tests."""
+import threading
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from psyas.passwords import (
+    PasswordHasher,
+    PasswordHasherBusy,
+    hash_rounds,
+    password_hasher,
+    select_rounds,
+)
+from psyas.user.models import User
+
+from .factories import UserFactory
+
+
+@pytest.fixture
+def rounds():
+    """Restore the configured cost after the test."""
+    configured = password_hasher.rounds
+    yield
+    password_hasher.rounds = configured
+
+
+class TestPasswordHasher:
+    """PasswordHasher tests."""
+
+    def test_hash_and_verify(self):
+        """Hashes carry the configured cost and verify in the pool."""
+        hasher = PasswordHasher(pool_size=2, rounds=4)
+        pw_hash = hasher.hash("secret")
+        assert hash_rounds(pw_hash) == 4
+        assert hasher.verify(pw_hash, "secret")
+        assert not hasher.verify(pw_hash, "wrong")
+        assert not hasher.needs_rehash(pw_hash)
+        hasher.rounds = 5
+        assert hasher.needs_rehash(pw_hash)
+
+    def test_no_rehash_to_lower_cost(self):
+        """A hash stronger than the current cost is kept."""
+        hasher = PasswordHasher(rounds=5)
+        pw_hash = hasher.hash("secret")
+        hasher.rounds = 4
+        assert not hasher.needs_rehash(pw_hash)
+
+    def test_reset_during_call(self):
+        """A call releases the slot it acquired even if the pool was reset."""
+        hasher = PasswordHasher(queue_depth=2, rounds=4)
+        assert hasher._run(hasher._reset_pool) is None
+        assert hasher._slots.acquire(blocking=False)
+
+    def test_hash_rounds_unknown(self):
+        """Unrecognised hashes have no cost."""
+        assert hash_rounds(None) is None
+        assert hash_rounds(b"plain") is None
+
+    def test_queue_limit(self):
+        """Submissions beyond the queue depth are rejected."""
+        hasher = PasswordHasher(queue_depth=1, rounds=4)
+        hasher._slots = threading.BoundedSemaphore(1)
+        hasher._slots.acquire()
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash("secret")
+        assert hasher.rejected == 1
+
+    def test_select_rounds_bounds(self):
+        """The selected cost stays within the allowed range."""
+        assert select_rounds(0, min_rounds=4, max_rounds=6, samples=1) == 4
+        assert select_rounds(10**6, min_rounds=4, max_rounds=6, samples=1) == 6
+
+
+@pytest.mark.usefixtures("db", "rounds")
+class TestRehash:
+    """Rehashing on successful authentication."""
+
+    def test_rehash_when_cost_changes(self, db):
+        """A correct password is rehashed with the new cost."""
+        user = UserFactory(password="myprecious")
+        db.session.commit()
+        assert hash_rounds(user.password) == 4
+
+        password_hasher.rounds = 5
+        assert not user.verify_password("wrong")
+        assert hash_rounds(user.password) == 4
+
+        assert user.verify_password("myprecious")
+        db.session.refresh(user)
+        assert hash_rounds(user.password) == 5
+        assert user.check_password("myprecious")
+
+    def test_rehash_skipped_when_busy(self, db, monkeypatch):
+        """A saturated pool skips the rehash but still accepts the password."""
+        user = UserFactory(password="myprecious")
+        db.session.commit()
+        password_hasher.rounds = 5
+        rehashes = password_hasher.rehashes
+
+        def busy(password):
+            raise PasswordHasherBusy("busy")
+
+        monkeypatch.setattr(password_hasher, "hash", busy)
+        assert user.verify_password("myprecious")
+        assert hash_rounds(user.password) == 4
+        assert password_hasher.rehashes == rehashes
+
+    def test_rehash_skipped_on_database_error(self, db, monkeypatch):
+        """A failed save of the new hash is rolled back and ignored."""
+        user = UserFactory(password="myprecious")
+        db.session.commit()
+        password_hasher.rounds = 5
+
+        def broken_save(self, commit=True):
+            raise SQLAlchemyError("database is locked")
+
+        monkeypatch.setattr(User, "save", broken_save)
+        assert user.verify_password("myprecious")
+        db.session.refresh(user)
+        assert hash_rounds(user.password) == 4
+
+    def test_busy_auth_endpoint(self, testapp, user):
+        """The JSON auth endpoint answers 503 when the pool is saturated."""
+        slots = password_hasher._slots
+        password_hasher._slots = threading.BoundedSemaphore(1)
+        password_hasher._slots.acquire()
+        try:
+            res = testapp.post_json(
+                "/api/auth/login",
+                {"username": user.username, "password": "myprecious"},
+                expect_errors=True,
+            )
+        finally:
+            password_hasher._slots = slots
+        assert res.status_code == 503
+
+
+@pytest.fixture
+def saturated_pool():
+    """Take the only slot of the hashing pool for the duration of the test."""
+    slots = password_hasher._slots
+    password_hasher._slots = threading.BoundedSemaphore(1)
+    password_hasher._slots.acquire()
+    yield
+    password_hasher._slots = slots
+
+
+@pytest.mark.usefixtures("db", "saturated_pool")
+@pytest.mark.parametrize(
+    "url, post",
+    [
+        ("/api/auth/register", "post_json"),
+        ("/api/register/", "post"),
+    ],
+    ids=["json", "form"],
+)
+def test_busy_account_creation(testapp, url, post):
+    """Creating an account answers 503 when the pool is saturated."""
+    res = getattr(testapp, post)(
+        url,
+        {
+            "username": "newcomer",
+            "email": "newcomer@example.com",
+            "password": "myprecious",
+            "confirm": "myprecious",
+        },
+        expect_errors=True,
+    )
+    assert res.status_code == 503
+    assert User.query.filter_by(username="newcomer").first() is None
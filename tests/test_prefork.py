@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Gunicorn preload (fork preparation) tests."""
+import gc
+import os
+import runpy
+
+import pytest
+from sqlalchemy import select
+
+from psyas import prefork
+from psyas.app import create_app
+from psyas.database import db
+from psyas.services.guide_question_index import guide_question_index
+from psyas.user.models import User
+
+from . import settings
+
+
+@pytest.fixture
+def unfrozen():
+    """Undo gc.freeze() and the once-only flag after the test."""
+    prefork._frozen = False
+    yield
+    gc.unfreeze()
+    prefork._frozen = False
+
+
+@pytest.mark.usefixtures("db")
+class TestPrepareForFork:
+    """prepare_for_fork tests."""
+
+    def test_builds_shared_state_and_freezes_once(self, app, unfrozen):
+        """The first call warms caches and freezes the heap; later calls do nothing."""
+        guide_question_index.clear()
+
+        assert prefork.prepare_for_fork(app) is True
+        assert gc.get_freeze_count() > 0
+        assert guide_question_index._samplers is not None
+        assert prefork.prepare_for_fork(app) is False
+
+
+def test_after_fork_keeps_engine_usable(tmp_path):
+    """Inherited connections are dropped and the engine reconnects on demand."""
+    config = {key: value for key, value in vars(settings).items() if key.isupper()}
+    config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'prefork.db'}"
+    app = create_app(type("PreforkSettings", (), config))
+    with app.app_context():
+        db.create_all()
+        User.create(username="forked", email="forked@example.com", password="pw")
+        db.session.remove()
+
+    prefork.after_fork(app)
+    with app.app_context():
+        assert db.session.execute(select(User.username)).scalar_one() == "forked"
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/smaps_rollup"), reason="needs Linux /proc"
+)
+def test_memory_usage_reads_smaps_rollup():
+    """Per-process memory figures come from /proc."""
+    usage = prefork.memory_usage()
+    assert usage["rss"] > 0
+    assert usage["uss"] == usage["private_clean"] + usage["private_dirty"]
+
+
+def test_memory_usage_missing_process():
+    """Unknown processes report None."""
+    assert prefork.memory_usage(2**22 + 1) is None
+
+
+GUNICORN_CONF = os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py")
+
+
+@pytest.mark.parametrize(
+    "environ, preload, patched",
+    [
+        ({}, False, False),
+        ({"GUNICORN_WORKER_CLASS": "gevent"}, False, False),
+        ({"GUNICORN_PRELOAD": "1"}, True, False),
+        ({"GUNICORN_PRELOAD": "1", "GUNICORN_WORKER_CLASS": "gevent"}, True, True),
+        (
+            {
+                "GUNICORN_PRELOAD": "true",
+                "GUNICORN_WORKER_CLASS": "gunicorn.workers.ggevent.GeventWorker",
+            },
+            True,
+            True,
+        ),
+    ],
+    ids=["default", "gevent", "preload-sync", "preload-gevent", "preload-gevent-path"],
+)
+def test_gunicorn_conf_patches_master_only_for_preloaded_gevent(
+    monkeypatch, environ, preload, patched
+):
+    """Preload is opt-in and only a preloaded gevent master is monkey-patched."""
+    monkey = pytest.importorskip("gevent.monkey")
+    calls = []
+    monkeypatch.setattr(monkey, "patch_all", lambda: calls.append(True))
+    for name in ("GUNICORN_PRELOAD", "GUNICORN_WORKER_CLASS"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in environ.items():
+        monkeypatch.setenv(name, value)
+
+    conf = runpy.run_path(GUNICORN_CONF)
+    assert conf["preload_app"] is preload
+    assert bool(calls) is patched